@@ -0,0 +1,309 @@
+import math
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+# Numeric columns in the order Database.get_analytics_columns() returns them,
+# after player_id, team_id and position
+STORED_COLUMNS = ('age', 'height', 'weight', 'ranking', 'goals', 'assists', 'matches_played')
+# goals_per_match is derived the same way as in the player_stats view
+COLUMNS = STORED_COLUMNS + ('goals_per_match',)
+GROUP_BY = ('position', 'team')
+
+MAX_BINS = 1000
+
+
+def available():
+    """Whether numpy is installed"""
+    return np is not None
+
+
+def parse_columns(value, default=COLUMNS):
+    """Column names from a comma-separated query parameter; raises ValueError"""
+    if not value:
+        return list(default)
+    columns = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in columns if name not in COLUMNS]
+    if unknown or not columns:
+        raise ValueError(f'columns must be a comma-separated list of: {", ".join(COLUMNS)}')
+    return columns
+
+
+def parse_percentiles(value, default=(25, 50, 75, 90, 99)):
+    """Percentiles from a comma-separated query parameter; raises ValueError"""
+    if not value:
+        return list(default)
+    try:
+        percentiles = [float(p) for p in value.split(',')]
+    except ValueError:
+        percentiles = None
+    if not percentiles or any(not 0 <= p <= 100 for p in percentiles):
+        raise ValueError('p must be a comma-separated list of numbers between 0 and 100')
+    return percentiles
+
+
+def _number(value):
+    """numpy scalar -> JSON-safe float (None for NaN)"""
+    value = float(value)
+    return None if math.isnan(value) else value
+
+
+class PlayerColumns:
+    """Immutable columnar snapshot of the players table at one data version.
+
+    Rows are sorted by player_id. Numeric columns are float64 arrays with NaN
+    for NULL; team_ids holds -1 for players without a team and positions
+    holds indexes into position_names (-1 for NULL).
+    """
+
+    def __init__(self, version, player_ids, team_ids, positions, position_names, values):
+        self.version = version
+        self.player_ids = player_ids
+        self.team_ids = team_ids
+        self.positions = positions
+        self.position_names = position_names
+        matches = values['matches_played']
+        played = matches > 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            per_match = np.round(values['goals'] / np.where(played, matches, 1), 2)
+        values['goals_per_match'] = np.where(played, per_match, 0.0)
+        self.values = values
+
+    @classmethod
+    def from_rows(cls, version, rows, position_names=()):
+        """Build from Database.get_analytics_columns() rows"""
+        names = list(position_names)
+        codes = {name: code for code, name in enumerate(names)}
+
+        def code(position):
+            if position is None:
+                return -1
+            if position not in codes:
+                codes[position] = len(names)
+                names.append(position)
+            return codes[position]
+
+        columns = list(zip(*rows)) if rows else [()] * (3 + len(STORED_COLUMNS))
+        player_ids = np.array(columns[0], dtype=np.int64)
+        order = np.argsort(player_ids, kind='stable')
+        team_ids = np.array([-1 if team_id is None else team_id for team_id in columns[1]],
+                            dtype=np.int64)
+        positions = np.array([code(position) for position in columns[2]], dtype=np.int32)
+        values = {name: np.array(column, dtype=np.float64)[order]
+                  for name, column in zip(STORED_COLUMNS, columns[3:])}
+        return cls(version, player_ids[order], team_ids[order], positions[order], names, values)
+
+    def __len__(self):
+        return len(self.player_ids)
+
+    def replace(self, version, player_ids, rows):
+        """New snapshot with the players in player_ids replaced by rows.
+
+        Players in player_ids without a row have been deleted.
+        """
+        changed = np.isin(self.player_ids, np.fromiter(player_ids, dtype=np.int64))
+        keep = ~changed
+        fresh = PlayerColumns.from_rows(version, rows, self.position_names)
+        merged_ids = np.concatenate([self.player_ids[keep], fresh.player_ids])
+        order = np.argsort(merged_ids, kind='stable')
+
+        def merge(old, new):
+            return np.concatenate([old[keep], new])[order]
+
+        values = {name: merge(self.values[name], fresh.values[name]) for name in STORED_COLUMNS}
+        return PlayerColumns(version, merged_ids[order], merge(self.team_ids, fresh.team_ids),
+                             merge(self.positions, fresh.positions), fresh.position_names, values)
+
+    def mask(self, position=None, team_id=None):
+        """Boolean mask of the players matching the filters, or None for everyone"""
+        mask = None
+        if position is not None:
+            if position in self.position_names:
+                mask = self.positions == self.position_names.index(position)
+            else:
+                mask = np.zeros(len(self), dtype=bool)
+        if team_id is not None:
+            on_team = self.team_ids == team_id
+            mask = on_team if mask is None else mask & on_team
+        return mask
+
+    def column(self, name, mask=None):
+        values = self.values[name]
+        return values if mask is None else values[mask]
+
+
+class Analytics:
+    """Vectorized statistics over every player, from cached NumPy columns.
+
+    The columns are loaded on first use. A RowChangeTracker records which
+    players each local commit touched, and the next read re-reads just those
+    rows into a new snapshot. A players data version it never saw (a write
+    from another process) means a full reload instead. Queries run
+    against one immutable snapshot, so they never block each other or writers.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()  # guards _stats
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._columns = None
+        self._changes = db.track_changes('players')
+        self._teams = (None, {})  # (teams version, team_id -> team_name)
+        self._stats = {'loads': 0, 'patches': 0, 'load_time': 0.0}
+
+    def columns(self):
+        """Current PlayerColumns, refreshed first if the players table has changed"""
+        columns = self._columns
+        if columns is not None and columns.version == self.db.get_table_versions().get('players', 0):
+            return columns
+        with self._refresh_lock:
+            columns = self._columns
+            if columns is None or columns.version != self.db.get_table_versions().get('players', 0):
+                columns = self._refresh(columns)
+                self._changes.forget(columns.version)
+                self._columns = columns
+            return columns
+
+    def _refresh(self, columns):
+        if columns is not None:
+            patch = self._changes.catch_up(columns.version, len(columns),
+                                           self.db.get_analytics_columns)
+            if patch is not None:
+                with self._lock:
+                    self._stats['patches'] += 1
+                return columns.replace(*patch)
+        return self._load()
+
+    def _load(self):
+        self._changes.start()
+        started = time.perf_counter()
+        version, rows = self.db.get_analytics_columns()
+        columns = PlayerColumns.from_rows(version, rows)
+        with self._lock:
+            self._stats['loads'] += 1
+            self._stats['load_time'] += time.perf_counter() - started
+        return columns
+
+    def _team_names(self):
+        version = self.db.get_table_versions().get('teams', 0)
+        cached_version, names = self._teams
+        if cached_version != version:
+            names = {row['team_id']: row['team_name'] for row in self.db.get_all_teams()}
+            self._teams = (version, names)
+        return names
+
+    def _select(self, position, team_id):
+        columns = self.columns()
+        return columns, columns.mask(position, team_id)
+
+    def summary(self, names, position=None, team_id=None):
+        """Count, mean, standard deviation, min and max of each column"""
+        columns, mask = self._select(position, team_id)
+        result = {}
+        for name in names:
+            values = columns.column(name, mask)
+            values = values[~np.isnan(values)]
+            if not values.size:
+                result[name] = {'count': 0, 'mean': None, 'std': None, 'min': None, 'max': None}
+                continue
+            result[name] = {
+                'count': int(values.size),
+                'mean': _number(values.mean()),
+                'std': _number(values.std()),
+                'min': _number(values.min()),
+                'max': _number(values.max()),
+            }
+        return {'players': len(columns) if mask is None else int(mask.sum()), 'columns': result}
+
+    def percentiles(self, names, percentiles, position=None, team_id=None):
+        """Linear-interpolated percentiles of each column, NULLs ignored"""
+        columns, mask = self._select(position, team_id)
+        result = {}
+        for name in names:
+            values = columns.column(name, mask)
+            values = values[~np.isnan(values)]
+            if values.size:
+                points = [_number(v) for v in np.percentile(values, percentiles)]
+            else:
+                points = [None] * len(percentiles)
+            result[name] = {f'{p:g}': point for p, point in zip(percentiles, points)}
+        return {'players': len(columns) if mask is None else int(mask.sum()), 'columns': result}
+
+    def group_means(self, by, names, position=None, team_id=None):
+        """Player count and per-column means for each position or team"""
+        if by not in GROUP_BY:
+            raise ValueError(f'by must be one of: {", ".join(GROUP_BY)}')
+        columns, mask = self._select(position, team_id)
+        codes = columns.positions if by == 'position' else columns.team_ids
+        if mask is not None:
+            codes = codes[mask]
+        # Shifted by one so that -1 (no position/team) gets its own bucket
+        buckets = codes.astype(np.int64) + 1
+        length = int(buckets.max()) + 1 if buckets.size else 0
+        counts = np.bincount(buckets, minlength=length)
+        means = {}
+        for name in names:
+            values = columns.column(name, mask)
+            present = ~np.isnan(values)
+            sums = np.bincount(buckets, weights=np.where(present, values, 0.0), minlength=length)
+            present_counts = np.bincount(buckets, weights=present, minlength=length)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                means[name] = sums / present_counts
+        team_names = self._team_names() if by == 'team' else None
+        groups = []
+        for bucket in np.flatnonzero(counts):
+            code = int(bucket) - 1
+            if by == 'position':
+                group = {'position': columns.position_names[code] if code >= 0 else None}
+            else:
+                group = {'team_id': code if code >= 0 else None,
+                         'team_name': team_names.get(code)}
+            group['players'] = int(counts[bucket])
+            group['means'] = {name: _number(means[name][bucket]) for name in names}
+            groups.append(group)
+        return groups
+
+    def correlations(self, names, position=None, team_id=None):
+        """Pearson correlation matrix over the players with every column present"""
+        if len(names) < 2:
+            raise ValueError('correlations need at least two columns')
+        columns, mask = self._select(position, team_id)
+        matrix = np.vstack([columns.column(name, mask) for name in names])
+        matrix = matrix[:, ~np.isnan(matrix).any(axis=0)]
+        if matrix.shape[1] < 2:
+            result = [[None] * len(names) for _ in names]
+        else:
+            # A constant column has no correlation (NaN -> null)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = [[_number(v) for v in row] for row in np.corrcoef(matrix)]
+        return {'columns': list(names), 'players': int(matrix.shape[1]), 'matrix': result}
+
+    def histogram(self, name, bins, position=None, team_id=None):
+        """Equal-width histogram of one column, NULLs ignored"""
+        if not 1 <= bins <= MAX_BINS:
+            raise ValueError(f'bins must be between 1 and {MAX_BINS}')
+        columns, mask = self._select(position, team_id)
+        values = columns.column(name, mask)
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {'column': name, 'players': 0, 'edges': [], 'counts': []}
+        counts, edges = np.histogram(values, bins=bins)
+        return {'column': name, 'players': int(values.size),
+                'edges': edges.tolist(), 'counts': counts.tolist()}
+
+    def stats(self):
+        """Load/patch counters and size"""
+        columns = self._columns
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_versions'] = len(self._changes)
+        stats['load_time'] = round(stats['load_time'], 6)
+        stats['available'] = available()
+        stats['loaded'] = columns is not None
+        stats['players'] = len(columns) if columns is not None else 0
+        stats['version'] = columns.version if columns is not None else None
+        return stats
@@ -1,45 +1,374 @@
-from flask import Flask, render_template, request, jsonify
-from database import Database
+import argparse
+import atexit
+import hashlib
+import os
+import sqlite3
+from functools import wraps
+
+from flask import Flask, Response, g, render_template, request, jsonify
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+import analytics
+import asgi
+import bulk
+import changes
+import compression
+import events
+import export
+import leaderboard
+import metrics
+import replica
+from cache import ResponseCache
+from database import FORM_LAST, FORM_WINDOW, PLAYER_QUERY_RANGES, Database
+from serializers import FastJSONProvider, row_to_dict, rows_to_arrays, rows_to_columns, rows_to_dicts
 
 
 app = Flask(__name__)
-db = Database()
+app.json = FastJSONProvider(app)
+
+# Opt-in request/SQL/serialization timings for /metrics
+app_metrics = None
+if os.environ.get('SPORTS_MANAGEMENT_METRICS', '') not in ('', '0'):
+    app_metrics = metrics.Metrics(float(os.environ.get('SPORTS_MANAGEMENT_SLOW_QUERY_MS',
+                                                       metrics.SLOW_QUERY_MS)))
+    app_metrics.install(app)
+
+db = Database(os.environ.get('SPORTS_MANAGEMENT_DB', 'sports_management.db'),
+              connection_factory=app_metrics.connection_class if app_metrics else None)
+
+# Serialized GET responses, invalidated by the tables each write touches
+response_cache = ResponseCache()
+db.add_write_listener(lambda changes: response_cache.invalidate({table for table, op, ids in changes}))
+
+# In-memory ranking and goals_per_match leaderboards, kept in sync on writes
+leaderboards = leaderboard.Leaderboards(db)
+
+# Columnar (NumPy) copy of the numeric player columns for /api/analytics
+player_analytics = analytics.Analytics(db)
+
+# Live match stat increments, written behind in batches
+stat_events = events.StatEventQueue(db)
+
+# Row-level change feed for /api/changes/stream, read from change_log
+change_feed = changes.ChangeFeed(db)
+
+# Opt-in read-only copy for the statistics and export routes
+stats_replica = None
+if os.environ.get('SPORTS_MANAGEMENT_REPLICA', '') not in ('', '0'):
+    stats_replica = replica.Replica(
+        db, refresh_interval=float(os.environ.get('SPORTS_MANAGEMENT_REPLICA_REFRESH',
+                                                  replica.REFRESH_INTERVAL)),
+        max_staleness=float(os.environ.get('SPORTS_MANAGEMENT_REPLICA_MAX_STALENESS',
+                                           replica.MAX_STALENESS)))
+
+if app_metrics is not None:
+    app_metrics.add_collector('db_pool', db.pool_stats, counters={
+        'checkouts': 'checkouts', 'waits': 'waits', 'wait_time': 'wait_seconds',
+        'timeouts': 'timeouts', 'opened': 'connections_opened', 'closed': 'connections_closed',
+    }, gauges={'open': 'connections_open', 'in_use': 'connections_in_use', 'max_size': 'max_size'})
+    app_metrics.add_collector('response_cache', response_cache.stats, counters={
+        'hits': 'hits', 'misses': 'misses', 'evictions': 'evictions', 'expirations': 'expirations',
+        'invalidations': 'invalidations',
+    }, gauges={'entries': 'entries', 'bytes': 'bytes'})
+    app_metrics.add_collector('stat_events', stat_events.stats, counters={
+        'events': 'events', 'flushes': 'flushes', 'failed_flushes': 'failed_flushes',
+    }, gauges={'pending_events': 'pending'})
+    app_metrics.add_collector('change_feed', change_feed.stats, counters={
+        'streams': 'streams', 'events': 'events', 'resets': 'resets', 'polls': 'polls',
+    }, gauges={'open_streams': 'open_streams'})
+    if stats_replica is not None:
+        app_metrics.add_collector('replica', stats_replica.stats, counters={
+            'refreshes': 'refreshes', 'unchanged': 'unchanged_refreshes', 'reopens': 'reopens',
+            'failures': 'failures', 'refresh_time': 'refresh_seconds',
+            'replica_reads': 'reads', 'primary_reads': 'primary_reads',
+        }, gauges={'available': 'available', 'age': 'age_seconds',
+                   'max_staleness': 'max_staleness_seconds'})
+
+
+def shutdown():
+    """End open change streams, flush queued stat events and close the database"""
+    change_feed.close()
+    stat_events.close()
+    if stats_replica is not None:
+        stats_replica.close()
+    db.close()
+
+
+atexit.register(shutdown)
+
+
+def stats_db():
+    """Database for the current request's heavy reads.
+
+    The replica while it is fresh enough, else the primary; chosen once per
+    request, so the ETag and the body come from the same copy.
+    """
+    if 'stats_db' not in g:
+        g.stats_db = stats_replica.reader() if stats_replica is not None else db
+    return g.stats_db
+
+
+def make_etag(tables, source=None):
+    """Strong ETag for the current request, derived from the tables' data versions"""
+    versions = (source or db).get_table_versions()
+    path = hashlib.sha1(request.full_path.encode()).hexdigest()[:16]
+    return path + ''.join(f'.{versions.get(table, 0)}' for table in tables)
+
+
+def versioned(*tables, cache=True, source=None):
+    """Conditional GET (and optionally response caching) for a read route.
+
+    tables are the tables the route's data comes from, in the Database
+    source() returns (default: the primary). The response carries
+    an ETag built from their data versions and the negotiated content coding;
+    a matching If-None-Match is answered with 304 before the view runs. With
+    cache=True the body is also kept in response_cache, keyed by that ETag,
+    already compressed.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            encoding = compression.negotiate(request.accept_encodings)
+            etag = make_etag(tables, source() if source else db)
+            if encoding:
+                etag += f'.{encoding}'
+            if etag in request.if_none_match:
+                response = app.response_class(status=304)
+            else:
+                cached = response_cache.get(etag) if cache else None
+                if cached is not None:
+                    body, content_encoding = cached
+                    response = app.response_class(body, mimetype='application/json')
+                    if content_encoding:
+                        response.headers['Content-Encoding'] = content_encoding
+                else:
+                    generations = response_cache.generations(tables)
+                    response = app.make_response(view(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    compression.compress_response(response, encoding)
+                    if cache and response.mimetype == 'application/json':
+                        body = response.get_data()
+                        response_cache.set(etag, (body, response.headers.get('Content-Encoding')),
+                                           tables, generations, size=len(body))
+            response.vary.add('Accept-Encoding')
+            response.set_etag(etag)
+            # Let browsers keep the response but revalidate it on every use
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+@app.after_request
+def compress(response):
+    """Compress the responses versioned() has not already handled"""
+    return compression.compress_response(response, compression.negotiate(request.accept_encodings))
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Most IDs one ?ids= lookup may ask for
+MAX_IDS = 1000
+# Most sub-requests one /api/batch call may run
+MAX_BATCH_REQUESTS = 50
+
+
+def wants_page():
+    """Whether the client asked for a single page instead of the full list"""
+    return 'limit' in request.args or 'cursor' in request.args
+
+
+def pagination_args():
+    """Return (limit, cursor) from the query string; raises ValueError for a bad limit"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit, request.args.get('cursor') or None
+
+
+# ?format= for routes returning lists of rows
+ROW_FORMATS = {
+    'objects': rows_to_dicts,
+    'columns': rows_to_columns,
+    'arrays': rows_to_arrays,
+}
+
+
+def row_format():
+    """Row encoder for ?format=; raises ValueError for an unknown format"""
+    fmt = request.args.get('format') or 'objects'
+    if fmt not in ROW_FORMATS:
+        raise ValueError('format must be objects, columns or arrays')
+    return ROW_FORMATS[fmt]
+
+
+def listed_arg(name):
+    """Comma-separated or repeated query string values (?fields=a,b&fields=c)"""
+    return [value for arg in request.args.getlist(name) for value in arg.split(',') if value]
+
+
+def ids_arg():
+    """IDs from ?ids= (comma-separated or repeated); raises ValueError"""
+    try:
+        ids = [int(value) for value in listed_arg('ids')]
+    except ValueError:
+        raise ValueError('ids must be integers') from None
+    if len(ids) > MAX_IDS:
+        raise ValueError(f'At most {MAX_IDS} ids per request')
+    return ids
+
+
+def rows_response(fetch_rows):
+    """Run a Database query returning rows and encode them per ?format="""
+    try:
+        encode = row_format()
+        rows = fetch_rows()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(encode(rows))
+
+
+def player_query_args():
+    """Keyword arguments for Database.query_players from the query string.
+
+    Lists are comma-separated or repeated (?position=Forward,Midfielder);
+    ranges are ?<column>_min= and ?<column>_max=; sort keys take a leading
+    '-' for descending. Raises ValueError for a malformed value.
+    """
+    def number(name, value):
+        try:
+            return int(value)
+        except ValueError:
+            try:
+                return float(value)
+            except ValueError:
+                raise ValueError(f'{name} must be a number') from None
+
+    try:
+        team_ids = [int(value) for value in listed_arg('team_id')]
+    except ValueError:
+        raise ValueError('team_id must be an integer') from None
+    ranges = {}
+    for column in PLAYER_QUERY_RANGES:
+        low, high = (request.args.get(f'{column}_{bound}') or None for bound in ('min', 'max'))
+        if low is not None or high is not None:
+            ranges[column] = (low if low is None else number(f'{column}_min', low),
+                              high if high is None else number(f'{column}_max', high))
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit is None:
+        raise ValueError('limit must be an integer')
+    return {
+        'fields': listed_arg('fields') or None,
+        'positions': listed_arg('position'),
+        'team_ids': team_ids,
+        'ranges': ranges,
+        'sort': [(key.lstrip('-'), key.startswith('-')) for key in listed_arg('sort')] or None,
+        'limit': limit,
+    }
+
+
+def form_args():
+    """Keyword arguments for Database.get_*_form from ?last=, ?window=, ?since= and ?until="""
+    last = request.args.get('last', FORM_LAST, type=int)
+    window = request.args.get('window', min(FORM_WINDOW, last or FORM_WINDOW), type=int)
+    if last is None or window is None:
+        raise ValueError('last and window must be integers')
+    return {'last': last, 'window': window, 'since': request.args.get('since') or None,
+            'until': request.args.get('until') or None}
+
+
+def leaderboard_players(entries):
+    """Merge leaderboard entries with the players' rows"""
+    rows = {row['player_id']: row for row in db.get_players_by_ids([entry['player_id'] for entry in entries])}
+    players = []
+    for entry in entries:
+        if entry['player_id'] in rows:
+            player = row_to_dict(rows[entry['player_id']])
+            player.update(position=entry['position'], rank=entry['rank'], score=entry['score'])
+            players.append(player)
+    return players
+
+
+def run_subrequest(path):
+    """(status, JSON body) of one GET for /api/batch, run in this request.
+
+    The view runs without the before/after request hooks, so the
+    sub-request is neither compressed nor counted on its own in /metrics.
+    """
+    environ = EnvironBuilder(path=path, base_url=request.host_url).get_environ()
+    with app.request_context(environ):
+        try:
+            response = app.make_response(app.dispatch_request())
+        except HTTPException as e:
+            return e.code, app.json.dumps({'error': e.name}).encode()
+    if response.is_streamed:
+        response.close()
+        return 400, app.json.dumps({'error': 'Streamed responses cannot be batched'}).encode()
+    if response.mimetype == 'application/json':
+        return response.status_code, response.get_data().rstrip()
+    return response.status_code, app.json.dumps(response.get_data(as_text=True)).encode()
+
+
+def paginated(fetch_page):
+    """Run a keyset-paginated Database query and build the JSON response"""
+    try:
+        encode = row_format()
+        limit, cursor = pagination_args()
+        rows, next_cursor = fetch_page(limit, cursor)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': encode(rows), 'next_cursor': next_cursor})
+
+
+def analytics_response(compute):
+    """Run an analytics query with the request's filters and build the JSON response.
+
+    compute gets (position, team_id) from ?position= and ?team_id=, both optional.
+    """
+    if not analytics.available():
+        return jsonify({'error': 'Analytics need numpy (pip install numpy)'}), 501
+    position = request.args.get('position') or None
+    team_id = request.args.get('team_id', type=int)
+    if 'team_id' in request.args and team_id is None:
+        return jsonify({'error': 'team_id must be an integer'}), 400
+    try:
+        return jsonify(compute(position, team_id))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
 
 # HOME ROUTE
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# DASHBOARD ROUTE
+@app.route('/api/dashboard', methods=['GET'])
+@versioned('players', 'teams')
+def get_dashboard():
+    top_n = request.args.get('top', 5, type=int)
+    if top_n is None or not 0 <= top_n <= 100:
+        return jsonify({'error': 'top must be between 0 and 100'}), 400
+    summary = db.get_dashboard_summary(top_n)
+    summary['top_players'] = rows_to_dicts(summary['top_players'])
+    return jsonify(summary)
+
 # TEAM ROUTES
 @app.route('/api/teams', methods=['GET'])
+@versioned('teams')
 def get_teams():
+    if 'ids' in request.args:
+        return rows_response(lambda: db.get_teams_by_ids(ids_arg()))
     teams = db.get_all_teams()
-    teams_list = []
-    for team in teams:
-        teams_list.append({
-            'team_id': team[0],
-            'team_name': team[1],
-            'coach_name': team[2],
-            'founded_year': team[3],
-            'city': team[4],
-            'stadium': team[5],
-            'created_at': team[6]
-        })
-    return jsonify(teams_list)
+    return jsonify(rows_to_dicts(teams))
 
 @app.route('/api/teams/<int:team_id>', methods=['GET'])
+@versioned('teams', cache=False)
 def get_team(team_id):
     team = db.get_team_by_id(team_id)
     if team:
-        return jsonify({
-            'team_id': team[0],
-            'team_name': team[1],
-            'coach_name': team[2],
-            'founded_year': team[3],
-            'city': team[4],
-            'stadium': team[5],
-            'created_at': team[6]
-        })
+        return jsonify(row_to_dict(team))
     return jsonify({'error': 'Team not found'}), 404
 
 @app.route('/api/teams', methods=['POST'])
@@ -73,6 +402,16 @@ def update_team(team_id):
     )
     return jsonify(result)
 
+@app.route('/api/teams/bulk', methods=['POST'])
+def bulk_upsert_teams():
+    """Upsert teams from a JSON array, NDJSON or CSV request body"""
+    try:
+        fmt = bulk.detect_format(request.mimetype, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 415
+    rows = bulk.rows(bulk.iter_records(request.stream, fmt), 'teams')
+    return jsonify(db.bulk_upsert_teams(rows))
+
 @app.route('/api/teams/<int:team_id>', methods=['DELETE'])
 def delete_team(team_id):
     result = db.delete_team(team_id)
@@ -80,49 +419,21 @@ def delete_team(team_id):
 
 # PLAYER ROUTES
 @app.route('/api/players', methods=['GET'])
+@versioned('players', 'teams')
 def get_players():
-    players = db.get_all_players()
-    players_list = []
-    for player in players:
-        players_list.append({
-            'player_id': player[0],
-            'first_name': player[1],
-            'last_name': player[2],
-            'team_id': player[3],
-            'position': player[4],
-            'jersey_number': player[5],
-            'age': player[6],
-            'height': player[7],
-            'weight': player[8],
-            'ranking': player[9],
-            'goals': player[10],
-            'assists': player[11],
-            'matches_played': player[12],
-            'created_at': player[13],
-            'team_name': player[14] if len(player) > 14 else None
-        })
-    return jsonify(players_list)
+    if 'ids' in request.args:
+        return rows_response(lambda: db.get_players_by_ids(ids_arg()))
+    fields = listed_arg('fields') or None
+    if wants_page():
+        return paginated(lambda limit, cursor: db.get_players_page(limit, cursor, fields))
+    return rows_response(lambda: db.get_all_players(fields))
 
 @app.route('/api/players/<int:player_id>', methods=['GET'])
+@versioned('players', cache=False)
 def get_player(player_id):
     player = db.get_player_by_id(player_id)
     if player:
-        return jsonify({
-            'player_id': player[0],
-            'first_name': player[1],
-            'last_name': player[2],
-            'team_id': player[3],
-            'position': player[4],
-            'jersey_number': player[5],
-            'age': player[6],
-            'height': player[7],
-            'weight': player[8],
-            'ranking': player[9],
-            'goals': player[10],
-            'assists': player[11],
-            'matches_played': player[12],
-            'created_at': player[13]
-        })
+        return jsonify(row_to_dict(player))
     return jsonify({'error': 'Player not found'}), 404
 
 @app.route('/api/players', methods=['POST'])
@@ -170,119 +481,342 @@ def update_player(player_id):
     )
     return jsonify(result)
 
+@app.route('/api/players/bulk', methods=['POST'])
+def bulk_upsert_players():
+    """Upsert players from a JSON array, NDJSON or CSV request body"""
+    try:
+        fmt = bulk.detect_format(request.mimetype, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 415
+    rows = bulk.rows(bulk.iter_records(request.stream, fmt), 'players')
+    return jsonify(db.bulk_upsert_players(rows))
+
 @app.route('/api/players/<int:player_id>', methods=['DELETE'])
 def delete_player(player_id):
     result = db.delete_player(player_id)
     return jsonify(result)
 
+@app.route('/api/players/<int:player_id>/events', methods=['POST'])
+def add_player_events(player_id):
+    """Queue goals/assists/matches_played increments; they are written in batches"""
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({'success': False, 'message': 'No data provided'}), 400
+    try:
+        deltas = events.parse_deltas(payload)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    if not db.player_exists(player_id):
+        return jsonify({'success': False, 'message': 'Player not found'}), 404
+    stat_events.add(player_id, deltas)
+    return jsonify({'success': True, 'queued': len(deltas)}), 202
+
 # STATISTICS AND VIEWS ROUTES
 @app.route('/api/stats/players', methods=['GET'])
+@versioned('players', 'teams', source=stats_db)
 def get_player_stats():
-    stats = db.get_player_stats()
-    stats_list = []
-    for stat in stats:
-        stats_list.append({
-            'player_id': stat[0],
-            'player_name': stat[1],
-            'team_name': stat[2],
-            'position': stat[3],
-            'jersey_number': stat[4],
-            'age': stat[5],
-            'ranking': stat[6],
-            'goals': stat[7],
-            'assists': stat[8],
-            'matches_played': stat[9],
-            'goals_per_match': stat[10]
-        })
-    return jsonify(stats_list)
+    if wants_page():
+        return paginated(stats_db().get_player_stats_page)
+    return rows_response(stats_db().get_player_stats)
 
 @app.route('/api/stats/teams', methods=['GET'])
+@versioned('players', 'teams', source=stats_db)
 def get_team_stats():
-    stats = db.get_team_stats()
-    stats_list = []
-    for stat in stats:
-        stats_list.append({
-            'team_id': stat[0],
-            'team_name': stat[1],
-            'coach_name': stat[2],
-            'city': stat[3],
-            'total_players': stat[4],
-            'total_goals': stat[5],
-            'total_assists': stat[6]
-        })
-    return jsonify(stats_list)
+    stats = stats_db().get_team_stats()
+    return jsonify(rows_to_dicts(stats))
 
 @app.route('/api/players/top/<int:limit>', methods=['GET'])
+@versioned('players', 'teams')
 def get_top_players(limit):
     players = db.get_top_players_by_ranking(limit)
-    players_list = []
-    for player in players:
-        players_list.append({
-            'player_id': player[0],
-            'first_name': player[1],
-            'last_name': player[2],
-            'team_id': player[3],
-            'position': player[4],
-            'jersey_number': player[5],
-            'age': player[6],
-            'height': player[7],
-            'weight': player[8],
-            'ranking': player[9],
-            'goals': player[10],
-            'assists': player[11],
-            'matches_played': player[12],
-            'created_at': player[13],
-            'team_name': player[14] if len(player) > 14 else None
-        })
-    return jsonify(players_list)
+    return jsonify(rows_to_dicts(players))
+
+# LEADERBOARD ROUTES
+@app.route('/api/leaderboards/<metric>', methods=['GET'])
+@versioned('players', 'teams')
+def get_leaderboard(metric):
+    if metric not in leaderboard.METRICS:
+        return jsonify({'error': f'Unknown leaderboard: {metric}'}), 404
+    limit = request.args.get('limit', 10, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    if offset is None or offset < 0:
+        return jsonify({'error': 'offset must be 0 or more'}), 400
+    entries = leaderboards.top(metric, limit, offset)
+    return jsonify({'metric': metric, 'total': leaderboards.size(metric),
+                    'players': leaderboard_players(entries)})
+
+@app.route('/api/leaderboards/<metric>/players/<int:player_id>', methods=['GET'])
+@versioned('players')
+def get_leaderboard_rank(metric, player_id):
+    if metric not in leaderboard.METRICS:
+        return jsonify({'error': f'Unknown leaderboard: {metric}'}), 404
+    entry = leaderboards.lookup(metric, player_id)
+    if entry is None:
+        return jsonify({'error': 'Player not found'}), 404
+    entry.update(metric=metric, total=leaderboards.size(metric))
+    return jsonify(entry)
+
+@app.route('/api/leaderboards/<metric>/players/<int:player_id>/around', methods=['GET'])
+@versioned('players', 'teams')
+def get_leaderboard_around(metric, player_id):
+    if metric not in leaderboard.METRICS:
+        return jsonify({'error': f'Unknown leaderboard: {metric}'}), 404
+    radius = request.args.get('radius', 5, type=int)
+    if radius is None or not 0 <= radius <= 100:
+        return jsonify({'error': 'radius must be between 0 and 100'}), 400
+    entries = leaderboards.around(metric, player_id, radius)
+    if entries is None:
+        return jsonify({'error': 'Player not found'}), 404
+    return jsonify({'metric': metric, 'total': leaderboards.size(metric),
+                    'players': leaderboard_players(entries)})
+
+# ANALYTICS ROUTES
+@app.route('/api/analytics/summary', methods=['GET'])
+@versioned('players')
+def get_analytics_summary():
+    return analytics_response(lambda position, team_id: player_analytics.summary(
+        analytics.parse_columns(request.args.get('columns')), position, team_id))
+
+@app.route('/api/analytics/percentiles', methods=['GET'])
+@versioned('players')
+def get_analytics_percentiles():
+    return analytics_response(lambda position, team_id: player_analytics.percentiles(
+        analytics.parse_columns(request.args.get('columns')),
+        analytics.parse_percentiles(request.args.get('p')), position, team_id))
+
+@app.route('/api/analytics/groups/<by>', methods=['GET'])
+@versioned('players', 'teams')
+def get_analytics_groups(by):
+    if by not in analytics.GROUP_BY:
+        return jsonify({'error': f'Unknown grouping: {by}'}), 404
+    return analytics_response(lambda position, team_id: player_analytics.group_means(
+        by, analytics.parse_columns(request.args.get('columns')), position, team_id))
+
+@app.route('/api/analytics/correlations', methods=['GET'])
+@versioned('players')
+def get_analytics_correlations():
+    return analytics_response(lambda position, team_id: player_analytics.correlations(
+        analytics.parse_columns(request.args.get('columns')), position, team_id))
+
+@app.route('/api/analytics/histogram/<column>', methods=['GET'])
+@versioned('players')
+def get_analytics_histogram(column):
+    if column not in analytics.COLUMNS:
+        return jsonify({'error': f'Unknown column: {column}'}), 404
+    bins = request.args.get('bins', 10, type=int)
+    if bins is None:
+        return jsonify({'error': 'bins must be an integer'}), 400
+    return analytics_response(lambda position, team_id: player_analytics.histogram(
+        column, bins, position, team_id))
 
 @app.route('/api/players/search', methods=['GET'])
+@versioned('players', 'teams', cache=False)
 def search_players():
     search_term = request.args.get('q', '')
-    players = db.search_players(search_term)
-    players_list = []
-    for player in players:
-        players_list.append({
-            'player_id': player[0],
-            'first_name': player[1],
-            'last_name': player[2],
-            'team_id': player[3],
-            'position': player[4],
-            'jersey_number': player[5],
-            'age': player[6],
-            'height': player[7],
-            'weight': player[8],
-            'ranking': player[9],
-            'goals': player[10],
-            'assists': player[11],
-            'matches_played': player[12],
-            'created_at': player[13],
-            'team_name': player[14] if len(player) > 14 else None
-        })
-    return jsonify(players_list)
+    if wants_page():
+        return paginated(lambda limit, cursor: db.search_players_page(search_term, limit, cursor))
+    return rows_response(lambda: db.search_players(search_term))
+
+@app.route('/api/players/query', methods=['GET'])
+@versioned('players', 'teams', cache=False)
+def query_players():
+    """Filter, sort and project players in SQL; ?explain=1 shows the plan instead"""
+    try:
+        encode = row_format()
+        query = player_query_args()
+        if request.args.get('explain') in ('1', 'true'):
+            return jsonify(db.explain_player_query(**query))
+        players = db.query_players(**query)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'items': encode(players)})
 
 @app.route('/api/teams/<int:team_id>/players', methods=['GET'])
+@versioned('players', cache=False)
 def get_team_players(team_id):
-    players = db.get_players_by_team(team_id)
-    players_list = []
-    for player in players:
-        players_list.append({
-            'player_id': player[0],
-            'first_name': player[1],
-            'last_name': player[2],
-            'team_id': player[3],
-            'position': player[4],
-            'jersey_number': player[5],
-            'age': player[6],
-            'height': player[7],
-            'weight': player[8],
-            'ranking': player[9],
-            'goals': player[10],
-            'assists': player[11],
-            'matches_played': player[12],
-            'created_at': player[13]
-        })
-    return jsonify(players_list)
+    return rows_response(lambda: db.get_players_by_team(team_id))
+
+# MATCH HISTORY ROUTES
+# Every write to match_stats also writes (and versions) players, including
+# the adjustments recorded when a player's totals are edited directly
+@app.route('/api/matches', methods=['POST'])
+def add_match_stats():
+    """Append per-match player stats from a JSON array, NDJSON or CSV request body"""
+    try:
+        fmt = bulk.detect_format(request.mimetype, request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 415
+    rows = bulk.rows(bulk.iter_records(request.stream, fmt), 'matches')
+    return jsonify(db.add_match_stats(rows))
+
+@app.route('/api/players/<int:player_id>/form', methods=['GET'])
+@versioned('players', 'match_stats', cache=False)
+def get_player_form(player_id):
+    if not db.player_exists(player_id):
+        return jsonify({'error': 'Player not found'}), 404
+    return rows_response(lambda: db.get_player_form(player_id, **form_args()))
+
+@app.route('/api/teams/<int:team_id>/form', methods=['GET'])
+@versioned('players', 'match_stats', cache=False)
+def get_team_form(team_id):
+    if not db.get_team_by_id(team_id):
+        return jsonify({'error': 'Team not found'}), 404
+    return rows_response(lambda: db.get_team_form(team_id, **form_args()))
+
+@app.route('/api/players/<int:player_id>/seasons', methods=['GET'])
+@versioned('players', 'match_stats', cache=False)
+def get_player_seasons(player_id):
+    if not db.player_exists(player_id):
+        return jsonify({'error': 'Player not found'}), 404
+    return rows_response(lambda: db.get_player_seasons(player_id))
+
+@app.route('/api/teams/<int:team_id>/seasons', methods=['GET'])
+@versioned('players', 'match_stats', cache=False)
+def get_team_seasons(team_id):
+    if not db.get_team_by_id(team_id):
+        return jsonify({'error': 'Team not found'}), 404
+    return rows_response(lambda: db.get_team_seasons(team_id))
+
+@app.route('/api/seasons/<season>/players', methods=['GET'])
+@versioned('players', 'teams', 'match_stats')
+def get_season_leaders(season):
+    """A season's top scorers, ?limit= of them (default 10)"""
+    limit = request.args.get('limit', 10, type=int)
+    if limit is None or not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    return rows_response(lambda: db.get_season_leaders(season, limit))
+
+# BATCH ROUTE
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """Run several GET requests in one round trip, all reading one database snapshot"""
+    data = request.get_json(silent=True)
+    paths = data.get('requests') if isinstance(data, dict) else None
+    if (not isinstance(paths, list)
+            or not all(isinstance(path, str) and path.startswith('/') for path in paths)):
+        return jsonify({'error': 'requests must be a list of paths'}), 400
+    if len(paths) > MAX_BATCH_REQUESTS:
+        return jsonify({'error': f'At most {MAX_BATCH_REQUESTS} requests per batch'}), 400
+    # Sub-responses are spliced in as they are, rather than decoded and
+    # encoded again; keys in the order FastJSONProvider sorts them
+    parts = []
+    # Statistics too come from the snapshot rather than the replica
+    g.stats_db = db
+    with db.snapshot():
+        for path in paths:
+            status, body = run_subrequest(path)
+            parts.append(b'{"body":%s,"path":%s,"status":%d}'
+                         % (body, app.json.dumps(path).encode(), status))
+    return app.response_class(b'{"responses":[' + b','.join(parts) + b']}\n',
+                              mimetype='application/json')
+
+# EXPORT ROUTES
+EXPORT_DATASETS = {
+    'players': 'players',
+    'teams': 'teams',
+    'stats/players': 'player_stats',
+    'stats/teams': 'team_stats',
+}
+
+@app.route('/api/export/<path:dataset>', methods=['GET'])
+def export_dataset(dataset):
+    """Stream a whole table or view as NDJSON (default) or CSV"""
+    if dataset not in EXPORT_DATASETS:
+        return jsonify({'error': 'Unknown dataset'}), 404
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in export.FORMATS:
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    name = EXPORT_DATASETS[dataset]
+    body = export.encode(stats_db().iter_export(name), fmt)
+    extension = 'csv' if fmt == 'csv' else 'ndjson'
+    return Response(body, mimetype=export.FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={name}.{extension}'
+    })
+
+@app.route('/api/changes/stream', methods=['GET'])
+def stream_changes():
+    """Server-Sent Events feed of row-level changes, resuming after ?since= or Last-Event-ID"""
+    try:
+        since = changes.parse_since(request.headers.get('Last-Event-ID',
+                                                        request.args.get('since')))
+    except ValueError:
+        return jsonify({'error': 'since must be a non-negative integer'}), 400
+    stream = change_feed.stream(since)
+    if request.environ.get(asgi.NONBLOCKING_STREAMS):
+        stream.blocking = False
+        request.environ[asgi.STREAM_WAITER] = stream.add_waiter
+    return Response(stream, mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: the database answers a query on a pooled connection"""
+    try:
+        db.ping()
+    except sqlite3.Error as e:
+        return jsonify({'status': 'unavailable', 'pid': os.getpid(), 'error': str(e)}), 503
+    return jsonify({'status': 'ok', 'pid': os.getpid()})
+
+@app.route('/api/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """Connection pool statistics, useful for sizing the pool"""
+    return jsonify(db.pool_stats())
+
+@app.route('/api/leaderboards/stats', methods=['GET'])
+def get_leaderboard_stats():
+    """Leaderboard size and rebuild/update counters"""
+    return jsonify(leaderboards.stats())
+
+@app.route('/api/analytics/stats', methods=['GET'])
+def get_analytics_stats():
+    """Analytics column cache size and load/patch counters"""
+    return jsonify(player_analytics.stats())
+
+@app.route('/api/changes/stats', methods=['GET'])
+def get_change_feed_stats():
+    """Open change streams and change feed counters"""
+    return jsonify(change_feed.stats())
+
+@app.route('/api/replica/stats', methods=['GET'])
+def get_replica_stats():
+    """Read replica age, refresh counters and how many reads it served"""
+    if stats_replica is None:
+        return jsonify({'error': 'The read replica is disabled; set SPORTS_MANAGEMENT_REPLICA=1'}), 404
+    return jsonify(stats_replica.stats())
+
+@app.route('/api/events/stats', methods=['GET'])
+def get_event_stats():
+    """Stat event queue depth and flush counters"""
+    return jsonify(stat_events.stats())
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus scrape endpoint (SPORTS_MANAGEMENT_METRICS=1)"""
+    if app_metrics is None:
+        return jsonify({'error': 'Metrics are disabled; set SPORTS_MANAGEMENT_METRICS=1'}), 404
+    return Response(app_metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/metrics/slow-queries', methods=['GET'])
+def get_slow_queries():
+    """The most recent statements slower than SPORTS_MANAGEMENT_SLOW_QUERY_MS"""
+    if app_metrics is None:
+        return jsonify({'error': 'Metrics are disabled; set SPORTS_MANAGEMENT_METRICS=1'}), 404
+    return jsonify({'threshold_ms': app_metrics.slow_query_ms,
+                    'queries': app_metrics.slow_queries()})
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Response cache hit/miss/eviction counters"""
+    return jsonify(response_cache.stats())
 
 @app.route('/api/sample-data', methods=['POST'])
 def add_sample_data():
@@ -297,4 +831,20 @@ def clear_all_data():
     return jsonify(result)
 
 if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+    parser = argparse.ArgumentParser(description='Run the Player Management System server')
+    parser.add_argument('--asgi', action='store_true',
+                        help='serve on an asyncio event loop (needs uvicorn), see asgi.py')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--threads', type=int, default=None,
+                        help='ASGI mode: request threads (default: connection pool size)')
+    parser.add_argument('--no-debug', dest='debug', action='store_false',
+                        help='run the sync dev server without the debugger and reloader')
+    args = parser.parse_args()
+
+    # Refuse to start if a schema change left a hot query without an index
+    db.verify_query_plans()
+    if args.asgi:
+        asgi.serve(app, db, args.host, args.port, args.threads, on_shutdown=shutdown)
+    else:
+        app.run(debug=args.debug, host=args.host, port=args.port)
@@ -0,0 +1,237 @@
+"""Asyncio (ASGI) serving mode for the Flask app.
+
+The event loop owns every client connection, so thousands of idle or slow
+dashboard clients cost no threads. Request handlers - and with them every
+blocking SQLite call - run on a bounded thread pool, sized to the database
+connection pool by default so requests never queue for a connection while
+holding a thread.
+
+Long-lived streams (the /api/changes/stream feed) don't hold a thread while
+idle either: the bridge sets NONBLOCKING_STREAMS in the WSGI environ, and an
+app that supports it returns b'' from its body iterator when there is
+nothing to send and puts a STREAM_WAITER callable in the environ. The
+bridge then awaits that callback (or the client going away) before pulling
+the next chunk.
+
+Run it with:
+    python app.py --asgi [--host 127.0.0.1] [--port 5000] [--threads N]
+or with an ASGI server directly:
+    uvicorn asgi:application --timeout-graceful-shutdown 5
+(python app.py --asgi ends open streams at shutdown by itself; plain uvicorn
+would wait for their clients to disconnect.)
+"""
+import asyncio
+import contextvars
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Request bodies larger than this are spooled to disk
+MAX_BODY_IN_MEMORY = 1024 * 1024
+
+# WSGI environ keys of the idle stream protocol described above.
+# STREAM_WAITER is add_waiter(callback): call callback(), from any thread,
+# once the body iterator may have something to send.
+NONBLOCKING_STREAMS = 'asgi_bridge.nonblocking_streams'
+STREAM_WAITER = 'asgi_bridge.stream_waiter'
+
+
+class WSGIBridge:
+    """ASGI application that runs a WSGI app on a bounded thread pool"""
+
+    def __init__(self, wsgi_app, max_threads=None, on_shutdown=None):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_threads,
+                                           thread_name_prefix='asgi-worker')
+        # Set by close_streams() to end idle streams at shutdown
+        self._closing = asyncio.Event()
+        self.on_shutdown = on_shutdown
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            await self._handle_http(scope, receive, send)
+        elif scope['type'] == 'lifespan':
+            await self._handle_lifespan(receive, send)
+
+    async def _handle_lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                if self.on_shutdown is not None:
+                    self.on_shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle_http(self, scope, receive, send):
+        body = tempfile.SpooledTemporaryFile(max_size=MAX_BODY_IN_MEMORY)
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return
+            body.write(message.get('body', b''))
+            more_body = message.get('more_body', False)
+        body.seek(0)
+
+        environ = self._build_environ(scope, body)
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+            return lambda data: None
+
+        loop = asyncio.get_running_loop()
+        # Every step of a request runs in the same context, whichever pool
+        # thread picks it up, so context variables survive a streamed body
+        context = contextvars.copy_context()
+
+        def run(fn, *args):
+            return loop.run_in_executor(self.executor, context.run, fn, *args)
+
+        disconnected = None
+        try:
+            iterable = await run(self.wsgi_app, environ, start_response)
+            try:
+                if isinstance(iterable, (list, tuple)):
+                    chunks = list(iterable)
+                else:
+                    chunks = None
+                    iterator = iter(iterable)
+                await send({'type': 'http.response.start', 'status': response['status'],
+                            'headers': response['headers']})
+                if chunks is not None:
+                    await send({'type': 'http.response.body', 'body': b''.join(chunks)})
+                    return
+                while True:
+                    # Streaming responses (e.g. exports) produce chunks lazily and
+                    # may block on SQLite, so pull them on the pool as well
+                    chunk = await run(next, iterator, None)
+                    if chunk is None:
+                        break
+                    if chunk:
+                        await send({'type': 'http.response.body', 'body': chunk,
+                                    'more_body': True})
+                    elif STREAM_WAITER in environ:
+                        if disconnected is None:
+                            disconnected = asyncio.ensure_future(self._wait_for_disconnect(receive))
+                        if not await self._wait_for_stream(loop, environ[STREAM_WAITER],
+                                                           disconnected):
+                            break
+                await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+            finally:
+                if hasattr(iterable, 'close'):
+                    await run(iterable.close)
+        finally:
+            if disconnected is not None:
+                disconnected.cancel()
+            body.close()
+
+    @staticmethod
+    async def _wait_for_disconnect(receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    def close_streams(self):
+        """End every idle stream, so a graceful shutdown need not wait for them"""
+        self._closing.set()
+
+    async def _wait_for_stream(self, loop, add_waiter, disconnected):
+        """Wait until an idle stream has more to send; False if it should end"""
+        if self._closing.is_set():
+            return False
+        ready = asyncio.Event()
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(ready.set)
+            except RuntimeError:
+                # The event loop has already closed
+                pass
+
+        add_waiter(wake)
+        waiting = asyncio.ensure_future(ready.wait())
+        closing = asyncio.ensure_future(self._closing.wait())
+        await asyncio.wait({waiting, disconnected, closing}, return_when=asyncio.FIRST_COMPLETED)
+        waiting.cancel()
+        closing.cancel()
+        return not (disconnected.done() or self._closing.is_set())
+
+    @staticmethod
+    def _build_environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+            'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+            'SERVER_NAME': str(server[0]),
+            'SERVER_PORT': str(server[1] if server[1] is not None else 80),
+            'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+            'REMOTE_ADDR': client[0],
+            'REMOTE_PORT': str(client[1]),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+            NONBLOCKING_STREAMS: True,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin-1').upper().replace('-', '_')
+            value = value.decode('latin-1')
+            if name == 'CONTENT_TYPE' or name == 'CONTENT_LENGTH':
+                key = name
+            else:
+                key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+        return environ
+
+
+def create_application(flask_app, database, max_threads=None, on_shutdown=None):
+    """Wrap the Flask app for an ASGI server"""
+    return WSGIBridge(flask_app.wsgi_app, max_threads=max_threads or database.pool.max_size,
+                      on_shutdown=on_shutdown or database.close)
+
+
+def serve(flask_app, database, host='127.0.0.1', port=5000, max_threads=None,
+          on_shutdown=None):
+    """Serve the Flask app with uvicorn"""
+    try:
+        import uvicorn
+    except ImportError:
+        sys.exit('The asyncio serving mode needs uvicorn: pip install uvicorn')
+    application = create_application(flask_app, database, max_threads, on_shutdown)
+
+    class Server(uvicorn.Server):
+        async def shutdown(self, sockets=None):
+            # uvicorn waits for open responses before shutting down, and a
+            # change stream never finishes on its own
+            application.close_streams()
+            await super().shutdown(sockets)
+
+    try:
+        Server(uvicorn.Config(application, host=host, port=port, lifespan='on',
+                              log_level='warning')).run()
+    except KeyboardInterrupt:
+        # uvicorn re-raises the Ctrl+C it shut down for; uvicorn.run() swallows it too
+        pass
+
+
+def __getattr__(name):
+    # `uvicorn asgi:application` - build it on first access so that importing
+    # this module from app.py does not import app.py a second time
+    if name == 'application':
+        global application
+        from app import app, db, shutdown
+        application = create_application(app, db, on_shutdown=shutdown)
+        return application
+    raise AttributeError(name)
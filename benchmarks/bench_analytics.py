@@ -0,0 +1,125 @@
+"""League-wide analytics: NumPy columns (analytics.py) vs the same numbers in SQL.
+
+Usage:
+    python benchmarks/bench_analytics.py [--sizes 10000 100000 1000000] [--repeat 5]
+
+For each size a temporary database is seeded, the columns are loaded once,
+and both sides compute per-position means, the median and 90th percentile
+of goals, a goals histogram and the goals/assists correlation. The last line
+is what a stat update costs the next analytics read: re-reading the changed
+row and patching a new snapshot.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analytics import Analytics  # noqa: E402
+from database import Database  # noqa: E402
+
+POSITIONS = ('Goalkeeper', 'Defender', 'Midfielder', 'Forward')
+
+SQL = {
+    'means by position': '''
+        SELECT position, COUNT(*), AVG(age), AVG(height), AVG(weight), AVG(ranking),
+               AVG(goals), AVG(assists), AVG(matches_played)
+        FROM players GROUP BY position''',
+    'percentiles (p50, p90)': '''
+        SELECT (SELECT goals FROM players WHERE goals IS NOT NULL ORDER BY goals
+                LIMIT 1 OFFSET (SELECT COUNT(goals) FROM players) * 50 / 100),
+               (SELECT goals FROM players WHERE goals IS NOT NULL ORDER BY goals
+                LIMIT 1 OFFSET (SELECT COUNT(goals) FROM players) * 90 / 100)''',
+    'histogram (10 bins)': '''
+        WITH bounds AS (SELECT MIN(goals) AS low, MAX(goals) AS high FROM players)
+        SELECT MIN(CAST((goals - low) * 10.0 / MAX(high - low, 1) AS INTEGER), 9) AS bin,
+               COUNT(*)
+        FROM players, bounds WHERE goals IS NOT NULL GROUP BY bin''',
+    'correlation (goals, assists)': '''
+        SELECT (COUNT(*) * SUM(goals * assists) - SUM(goals) * SUM(assists)) /
+               (SQRT(COUNT(*) * SUM(goals * goals) - SUM(goals) * SUM(goals)) *
+                SQRT(COUNT(*) * SUM(assists * assists) - SUM(assists) * SUM(assists)))
+        FROM (SELECT CAST(goals AS REAL) AS goals, CAST(assists AS REAL) AS assists
+              FROM players WHERE goals IS NOT NULL AND assists IS NOT NULL)''',
+}
+
+
+def seed(db, players):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO teams (team_name) VALUES (?)', [(f'Team {i}',) for i in range(50)])
+    for start in range(0, players, 100000):
+        cursor.executemany('''
+            INSERT INTO players
+            (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+             ranking, goals, assists, matches_played)
+            VALUES (?, ?, ?, ?, 9, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(f'First{i}', f'Last{i}', i % 50 + 1, rng.choice(POSITIONS), rng.randint(17, 38),
+               round(rng.gauss(181, 7), 1), round(rng.gauss(76, 8), 1), rng.randint(0, 100),
+               rng.randint(0, 60), rng.randint(0, 40), rng.randint(0, 40))
+              for i in range(start, min(players, start + 100000))])
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(name, seconds):
+    unit, scale = ('ms', 1000) if seconds >= 0.001 else ('us', 1000000)
+    print(f'  {name:<50} {seconds * scale:>10.1f} {unit}')
+
+
+def run(size, repeat):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        seed(db, size)
+        stats = Analytics(db)
+        print(f'{size} players')
+        started = time.perf_counter()
+        stats.columns()
+        report('column load', time.perf_counter() - started)
+
+        numpy = {
+            'means by position': lambda: stats.group_means(
+                'position', ['age', 'height', 'weight', 'ranking', 'goals', 'assists',
+                             'matches_played']),
+            'percentiles (p50, p90)': lambda: stats.percentiles(['goals'], [50, 90]),
+            'histogram (10 bins)': lambda: stats.histogram('goals', 10),
+            'correlation (goals, assists)': lambda: stats.correlations(['goals', 'assists']),
+        }
+        conn = db.get_connection()
+        for name, query in SQL.items():
+            report(f'{name} (NumPy)', timed(numpy[name], repeat))
+            report(f'{name} (SQL)', timed(lambda: conn.execute(query).fetchall(), repeat))
+        conn.close()
+
+        player_ids = iter(random.Random(11).sample(range(1, size + 1), repeat))
+        report('stat update + next analytics read',
+               timed(lambda: (db.apply_stat_deltas({next(player_ids): (1, 0, 1)}),
+                              stats.summary(['goals'])), repeat))
+        print(f'  {stats.stats()}')
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Read throughput while a writer is running, per storage profile.
+
+Usage:
+    python benchmarks/bench_concurrent_reads.py [--players 5000] [--readers 4] [--seconds 5]
+
+For each storage profile a fresh temporary database is seeded, then reader
+threads hammer the same queries the /api/players and /api/stats/* routes use
+while a single writer keeps adding and updating players.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, STORAGE_PROFILES  # noqa: E402
+
+
+def seed(db, players):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO teams (team_name, coach_name, founded_year, city, stadium) VALUES (?, ?, ?, ?, ?)',
+        [(f'Team {i}', f'Coach {i}', 1900 + i, f'City {i}', f'Stadium {i}') for i in range(20)])
+    cursor.executemany('''
+        INSERT INTO players
+        (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+         ranking, goals, assists, matches_played)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(f'First{i}', f'Last{i}', i % 20 + 1, 'Forward', i % 99, 20 + i % 15, 180.0, 75.0,
+           random.randint(0, 100), random.randint(0, 40), random.randint(0, 20), 30)
+          for i in range(players)])
+    conn.commit()
+    conn.close()
+
+
+def run(profile, players, readers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'), pool_size=readers + 1,
+                      storage_profile=profile)
+        seed(db, players)
+        stop = threading.Event()
+        reads = [0] * readers
+        writes = [0]
+        errors = [0]
+
+        def reader(slot):
+            while not stop.is_set():
+                try:
+                    db.get_top_players_by_ranking(50)
+                    db.get_team_stats()
+                    reads[slot] += 2
+                except Exception:
+                    errors[0] += 1
+
+        def writer():
+            while not stop.is_set():
+                try:
+                    result = db.add_player('Bench', 'Writer', 1, 'Forward', 9, 25, 180.0, 75.0,
+                                           50, 0, 0, 0)
+                    db.update_player(result['id'], 'Bench', 'Writer', 2, 'Forward', 9, 25, 180.0,
+                                     75.0, 51, 1, 0, 1)
+                    writes[0] += 2
+                except Exception:
+                    errors[0] += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        threads.append(threading.Thread(target=writer))
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        db.close()
+    return {
+        'profile': profile,
+        'reads_per_sec': sum(reads) / seconds,
+        'writes_per_sec': writes[0] / seconds,
+        'errors': errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--profiles', nargs='+', default=sorted(STORAGE_PROFILES))
+    args = parser.parse_args()
+
+    print(f'{"profile":<10} {"reads/s":>10} {"writes/s":>10} {"errors":>7}')
+    for profile in args.profiles:
+        result = run(profile, args.players, args.readers, args.seconds)
+        print(f'{result["profile"]:<10} {result["reads_per_sec"]:>10.1f} '
+              f'{result["writes_per_sec"]:>10.1f} {result["errors"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
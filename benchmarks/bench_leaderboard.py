@@ -0,0 +1,130 @@
+"""Leaderboard queries: in-memory Leaderboards vs SQL, at up to 1M players.
+
+Usage:
+    python benchmarks/bench_leaderboard.py [--sizes 10000 100000 1000000] [--queries 200]
+
+For each size a temporary database is seeded and both sides answer the same
+questions: top 10, the position of a random player, the 10 players around a
+random player, and - for the leaderboard - the cost of keeping up with a
+stat update. goals_per_match is computed per row, so SQL has to scan and
+sort the whole table for it; ranking has an index.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from leaderboard import Leaderboards  # noqa: E402
+
+GOALS_PER_MATCH = ('CASE WHEN matches_played > 0 '
+                   'THEN ROUND(CAST(goals AS REAL) / matches_played, 2) ELSE 0 END')
+
+SQL = {
+    'top 10': 'SELECT player_id FROM players ORDER BY {score} DESC, player_id LIMIT 10',
+    'position of player': '''
+        SELECT COUNT(*) + 1 FROM players
+        WHERE {score} > (SELECT {score} FROM players WHERE player_id = :player_id)
+           OR ({score} = (SELECT {score} FROM players WHERE player_id = :player_id)
+               AND player_id < :player_id)''',
+    'players around': '''
+        SELECT player_id FROM (
+            SELECT player_id, ROW_NUMBER() OVER (ORDER BY {score} DESC, player_id) AS position
+            FROM players)
+        WHERE position BETWEEN :position - 5 AND :position + 5''',
+}
+
+
+def seed(db, players):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO teams (team_name) VALUES (?)', [(f'Team {i}',) for i in range(50)])
+    for start in range(0, players, 100000):
+        cursor.executemany('''
+            INSERT INTO players
+            (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+             ranking, goals, assists, matches_played)
+            VALUES (?, ?, ?, 'Forward', 9, 25, 180.0, 75.0, ?, ?, 0, ?)
+        ''', [(f'First{i}', f'Last{i}', i % 50 + 1, rng.randint(0, 100), rng.randint(0, 60),
+               rng.randint(0, 40)) for i in range(start, min(players, start + 100000))])
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat
+
+
+def report(name, seconds):
+    unit, scale = ('ms', 1000) if seconds >= 0.001 else ('us', 1000000)
+    print(f'  {name:<50} {seconds * scale:>10.1f} {unit}')
+
+
+def run(size, queries):
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'bench.db'))
+        seed(db, size)
+        boards = Leaderboards(db)
+        print(f'{size} players')
+        started = time.perf_counter()
+        boards.size('ranking')
+        report('leaderboard build', time.perf_counter() - started)
+
+        player_ids = [rng.randint(1, size) for _ in range(queries)]
+        conn = db.get_connection()
+        for metric, score in (('ranking', 'ranking'), ('goals_per_match', GOALS_PER_MATCH)):
+            picks = iter(player_ids * 4)
+            report(f'{metric}: top 10 (leaderboard)',
+                   timed(lambda: boards.top(metric, 10), queries))
+            report(f'{metric}: position of player (leaderboard)',
+                   timed(lambda: boards.lookup(metric, next(picks)), queries))
+            report(f'{metric}: players around (leaderboard)',
+                   timed(lambda: boards.around(metric, next(picks), 5), queries))
+            # SQL is much slower on the unindexed metric; a few runs are enough
+            repeat = queries if metric == 'ranking' else max(1, queries // 50)
+            report(f'{metric}: top 10 (SQL)',
+                   timed(lambda: conn.execute(SQL['top 10'].format(score=score)).fetchall(),
+                         repeat))
+            report(f'{metric}: position of player (SQL)',
+                   timed(lambda: conn.execute(SQL['position of player'].format(score=score),
+                                              {'player_id': next(picks)}).fetchone(), repeat))
+            report(f'{metric}: players around (SQL)',
+                   timed(lambda: conn.execute(SQL['players around'].format(score=score),
+                                              {'position': size // 2}).fetchall(),
+                         max(1, repeat // 10)))
+        conn.close()
+
+        def update_and_sync():
+            player_id = next(picks)
+            db.apply_stat_deltas({player_id: (1, 0, 1)})
+            # Changes are applied lazily, by the next read
+            boards.lookup('goals_per_match', player_id)
+
+        picks = iter(player_ids)
+        report('stat update + leaderboard sync', timed(update_and_sync, queries))
+        print(f'  {boards.stats()}')
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+    for size in args.sizes:
+        run(size, args.queries)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Player name search latency: LIKE scan vs the FTS5 index.
+
+Usage:
+    python benchmarks/bench_search.py [--sizes 10000 100000 1000000] [--repeat 20]
+
+For each roster size a temporary database is filled with synthetic players,
+then the same search terms are timed through the LIKE query and the FTS5
+query used by Database.search_players.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import (Database, SEARCH_PLAYERS_FTS, SEARCH_PLAYERS_LIKE,  # noqa: E402
+                      fts_match_expression)
+
+SYLLABLES = ['al', 'ber', 'cas', 'dan', 'el', 'fer', 'gio', 'har', 'ian', 'jo', 'ka', 'le',
+             'mar', 'ne', 'os', 'pe', 'qui', 'ro', 'san', 'to', 'u', 'vi', 'wen', 'xa', 'yo', 'zi']
+
+# What the search box sends while someone types a name
+TERMS = ['ha', 'har', 'harto', 'mar', 'marsan', 'zi', 'kale', 'joel ro']
+
+
+def make_name(rng):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def fill(db, size, rng):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO teams (team_name, coach_name, founded_year, city, stadium) VALUES (?, ?, ?, ?, ?)',
+        [(f'Team {i}', f'Coach {i}', 1900, f'City {i}', f'Stadium {i}') for i in range(50)])
+    batch = []
+    for i in range(size):
+        batch.append((make_name(rng), make_name(rng), i % 50 + 1, 'Forward', i % 99, 25, 180.0, 75.0,
+                      rng.randint(0, 100), rng.randint(0, 40), rng.randint(0, 20), 30))
+        if len(batch) == 10000:
+            cursor.executemany('''
+                INSERT INTO players
+                (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+                 ranking, goals, assists, matches_played)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            batch = []
+    if batch:
+        cursor.executemany('''
+            INSERT INTO players
+            (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+             ranking, goals, assists, matches_played)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+    conn.commit()
+    conn.close()
+
+
+def time_query(db, sql, params, repeat):
+    conn = db.get_connection()
+    try:
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(sql, params).fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+    finally:
+        conn.close()
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    print(f'{"players":>9} {"term":<10} {"like ms":>9} {"fts ms":>9} {"speedup":>8}')
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(os.path.join(tmp, 'bench.db'))
+            if not db.fts_enabled:
+                sys.exit('This SQLite build has no FTS5 support')
+            fill(db, size, random.Random(args.seed))
+            for term in TERMS:
+                like_ms = time_query(db, SEARCH_PLAYERS_LIKE, (f'%{term}%', f'%{term}%'), args.repeat)
+                match = fts_match_expression(term)
+                if match is None:
+                    # Too short for the trigram index; searched with LIKE
+                    print(f'{size:>9} {term:<10} {like_ms:>9.2f} {"-":>9} {"-":>8}')
+                    continue
+                fts_ms = time_query(db, SEARCH_PLAYERS_FTS, (match,), args.repeat)
+                print(f'{size:>9} {term:<10} {like_ms:>9.2f} {fts_ms:>9.2f} {like_ms / fts_ms:>7.1f}x')
+            db.close()
+
+
+if __name__ == '__main__':
+    main()
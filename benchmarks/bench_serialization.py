@@ -0,0 +1,102 @@
+"""Rows/sec through the JSON serialization layer.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 100000] [--repeat 5]
+
+Compares the old per-route tuple-to-dict loop + json.dumps with
+serializers.rows_to_dicts + FastJSONProvider (with orjson when installed),
+and checks that both produce the same bytes.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+
+import serializers  # noqa: E402
+from serializers import FastJSONProvider, rows_to_dicts  # noqa: E402
+
+
+def make_rows(count):
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.execute('''
+        CREATE TABLE players (
+            player_id INTEGER PRIMARY KEY, first_name TEXT, last_name TEXT, team_id INTEGER,
+            position TEXT, jersey_number INTEGER, age INTEGER, height REAL, weight REAL,
+            ranking INTEGER, goals INTEGER, assists INTEGER, matches_played INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, team_name TEXT)
+    ''')
+    conn.executemany('''
+        INSERT INTO players (first_name, last_name, team_id, position, jersey_number, age, height,
+                             weight, ranking, goals, assists, matches_played, team_name)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(f'First{i}', f'Last{i}', i % 20, 'Midfielder', i % 99, 18 + i % 20, 170.0 + i % 30,
+           60.5 + i % 40, i % 100, i % 50, i % 30, 20 + i % 20, f'Team {i % 20}')
+          for i in range(count)])
+    return conn.execute('SELECT * FROM players').fetchall()
+
+
+def legacy(rows):
+    players_list = []
+    for player in rows:
+        players_list.append({
+            'player_id': player[0],
+            'first_name': player[1],
+            'last_name': player[2],
+            'team_id': player[3],
+            'position': player[4],
+            'jersey_number': player[5],
+            'age': player[6],
+            'height': player[7],
+            'weight': player[8],
+            'ranking': player[9],
+            'goals': player[10],
+            'assists': player[11],
+            'matches_played': player[12],
+            'created_at': player[13],
+            'team_name': player[14] if len(player) > 14 else None
+        })
+    return json.dumps(players_list, separators=(',', ':'), sort_keys=True,
+                      ensure_ascii=True).encode()
+
+
+def best_of(repeat, func, *args):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    provider = FastJSONProvider(Flask(__name__))
+
+    def layered(rows):
+        return provider._dumps_bytes(rows_to_dicts(rows), separators=(',', ':'))
+
+    legacy_time, legacy_bytes = best_of(args.repeat, legacy, rows)
+    layered_time, layered_bytes = best_of(args.repeat, layered, rows)
+    encoder = 'orjson' if serializers.orjson is not None else 'json (orjson not installed)'
+
+    print(f'{"serializer":<40} {"rows/sec":>12}')
+    print(f'{"legacy tuple loop + json":<40} {args.rows / legacy_time:>12,.0f}')
+    print(f'{"rows_to_dicts + " + encoder:<40} {args.rows / layered_time:>12,.0f}')
+    print(f'byte-identical: {legacy_bytes == layered_bytes}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Match stat events/sec: one full-row update per event vs the write-behind queue.
+
+Usage:
+    python benchmarks/bench_stat_events.py [--players 500] [--events 20000] [--threads 8]
+
+"update_player" is what a PUT /api/players/<id> per goal costs: every column
+rewritten and one commit per event. "StatEventQueue" is what
+POST /api/players/<id>/events does: increments summed per player and written
+in batches. The queue is timed until close() has flushed every event, and the
+final totals are checked against the expected ones.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from events import StatEventQueue  # noqa: E402
+
+
+def seed(db, players):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO teams (team_name) VALUES ('Team')")
+    cursor.executemany('''
+        INSERT INTO players
+        (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+         ranking, goals, assists, matches_played)
+        VALUES (?, ?, 1, 'Forward', 9, 25, 180.0, 75.0, 50, 0, 0, 0)
+    ''', [(f'First{i}', f'Last{i}') for i in range(players)])
+    conn.commit()
+    conn.close()
+
+
+def make_events(players, count):
+    rng = random.Random(42)
+    return [(rng.randint(1, players), (1, rng.randint(0, 1), 0)) for _ in range(count)]
+
+
+def run_threads(threads, target, events):
+    workers = [threading.Thread(target=target, args=(events[i::threads],))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+def bench_update_player(db, events, threads):
+    def work(chunk):
+        for player_id, (goals, assists, matches_played) in chunk:
+            player = db.get_player_by_id(player_id)
+            db.update_player(player_id, player['first_name'], player['last_name'],
+                             player['team_id'], player['position'], player['jersey_number'],
+                             player['age'], player['height'], player['weight'],
+                             player['ranking'], player['goals'] + goals,
+                             player['assists'] + assists, player['matches_played'] + matches_played)
+    started = time.perf_counter()
+    run_threads(threads, work, events)
+    return time.perf_counter() - started
+
+
+def bench_queue(db, events, threads):
+    queue = StatEventQueue(db)
+
+    def work(chunk):
+        for player_id, deltas in chunk:
+            queue.add(player_id, [deltas])
+    started = time.perf_counter()
+    run_threads(threads, work, events)
+    queue.close()
+    elapsed = time.perf_counter() - started
+    return elapsed, queue.stats()
+
+
+def totals(db):
+    conn = db.get_connection()
+    row = conn.execute('SELECT SUM(goals), SUM(assists) FROM players').fetchone()
+    conn.close()
+    return tuple(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--players', type=int, default=500)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    events = make_events(args.players, args.events)
+    expected = (sum(d[0] for _, d in events), sum(d[1] for _, d in events))
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(os.path.join(tmp, 'direct.db'), pool_size=args.threads)
+        seed(db, args.players)
+        # The read-modify-write loses increments under concurrency, so only
+        # its speed is comparable; a tenth of the events keeps the run short
+        sample = events[:max(1, len(events) // 10)]
+        elapsed = bench_update_player(db, sample, args.threads)
+        print(f'{"update_player per event":<26} {len(sample) / elapsed:>10.0f} events/s')
+        db.close()
+
+        db = Database(os.path.join(tmp, 'queue.db'), pool_size=args.threads)
+        seed(db, args.players)
+        elapsed, stats = bench_queue(db, events, args.threads)
+        print(f'{"StatEventQueue":<26} {len(events) / elapsed:>10.0f} events/s'
+              f'   ({stats["flushes"]} flushes, {stats["flushed_players"]} player rows written)')
+        assert totals(db) == expected, (totals(db), expected)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
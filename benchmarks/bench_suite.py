@@ -0,0 +1,555 @@
+"""Time every Database method and /api route at 1k/100k/1M players, and save the results.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 1000 100000 1000000] [--budget 1.0]
+                                     [--max-iterations 500] [--only REGEX] [--cache]
+                                     [--output FILE] [--compare BASELINE.json]
+
+Each size runs in a fresh child process against a temporary database filled by
+Database.add_synthetic_data(), so app.py binds to that database on import.
+Routes go through the Flask test client, i.e. everything but the HTTP server.
+
+Every case runs once to warm up, then repeatedly for about --budget seconds
+(at least once, at most --max-iterations times). Anything a case needs that
+should not be timed, such as a player to delete, is prepared before each
+iteration, and rows a case adds are deleted after it, so the dataset keeps
+its size. Routes are timed with the response cache emptied first, so they
+measure the query and serialization work; --cache leaves it in place.
+
+Results are printed as ops/sec and latency percentiles and saved as JSON
+(default: benchmarks/results/suite-<timestamp>.json). --compare prints each
+case's p50 next to the same case in an earlier results file. Public Database
+methods and /api routes without a case are listed at the end, so new ones
+don't go unmeasured.
+
+1M players takes several minutes: seeding alone is about half a minute, and
+the full-list cases serialize every row.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Database methods that are setup, teardown or plumbing rather than something
+# a request does
+SKIPPED_METHODS = {
+    'init_database', 'close', 'get_connection', 'add_write_listener', 'pool_stats',
+    'add_sample_data', 'add_synthetic_data', 'clear_all_data', 'checkpoint',
+    'explain_query_plans', 'verify_query_plans', 'explain_player_query',
+}
+# Players given a season of weekly matches on top of the synthetic data, for
+# the form curve and season cases
+HISTORY_PLAYERS = 1000
+HISTORY_MATCHES = 38
+SEASON = '2025-26'
+# Routes that are destructive, not JSON APIs, or only enabled by configuration
+SKIPPED_ROUTES = {
+    ('GET', '/'), ('GET', '/static/<path:filename>'), ('DELETE', '/api/clear-data'),
+    ('POST', '/api/sample-data'), ('GET', '/metrics'), ('GET', '/api/metrics/slow-queries'),
+    ('GET', '/api/replica/stats'),
+}
+
+
+class Case:
+    """One thing to time: run(ctx, prepared).
+
+    prepare(ctx) runs untimed before it, and cleanup(ctx, result) untimed
+    after it, so that write cases leave the dataset the size it was.
+    """
+
+    def __init__(self, name, run, prepare=None, cleanup=None):
+        self.name = name
+        self.run = run
+        self.prepare = prepare
+        self.cleanup = cleanup
+
+
+class Context:
+    def __init__(self, db, client, players, teams, cache):
+        self.db = db
+        self.client = client
+        self.players = players
+        self.teams = teams
+        self.cache = cache
+        self.rng = random.Random(42)
+        self.counter = 0
+
+    def player(self):
+        return self.rng.randint(1, self.players)
+
+    def team(self):
+        return self.rng.randint(1, self.teams)
+
+    def history_player(self):
+        """A player with a season of match history (see seed_history)"""
+        return self.rng.randint(1, min(self.players, HISTORY_PLAYERS))
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f'{prefix} {os.getpid()}-{self.counter}'
+
+    def new_player(self):
+        return self.db.add_player('Bench', self.unique('Player'), self.team(), 'Forward', 9, 25,
+                                  180.0, 75.0, 50, 0, 0, 0)['id']
+
+    def new_team(self):
+        return self.db.add_team(self.unique('Bench Team'), 'Coach', 2000, 'City', 'Stadium')['id']
+
+
+def player_values(ctx):
+    """A row in bulk.PLAYER_FIELDS order that updates an existing player"""
+    return (ctx.player(), 'Bulk', ctx.unique('Player'), ctx.team(), 'Defender', 4, 27, 185.0,
+            80.0, 60, 1, 2, 30)
+
+
+def match_values(ctx, player_id, day):
+    """A row in bulk.MATCH_FIELDS order for a match in SEASON"""
+    return (player_id, None, (date(2025, 8, 9) + timedelta(days=day)).isoformat(),
+            ctx.rng.randint(0, 2), ctx.rng.randint(0, 1), 1)
+
+
+def seed_history(ctx):
+    ctx.db.add_match_stats(enumerate(
+        (match_values(ctx, player_id, week * 7) for week in range(HISTORY_MATCHES)
+         for player_id in range(1, min(ctx.players, HISTORY_PLAYERS) + 1)), start=1))
+
+
+def player_json(ctx):
+    return {'first_name': 'Api', 'last_name': ctx.unique('Player'), 'team_id': ctx.team(),
+            'position': 'Midfielder', 'jersey_number': 8, 'age': 24, 'height': 178.0,
+            'weight': 72.0, 'ranking': 70, 'goals': 3, 'assists': 4, 'matches_played': 10}
+
+
+def team_json(ctx):
+    return {'team_name': ctx.unique('Api Team'), 'coach_name': 'Coach', 'founded_year': 1990,
+            'city': 'City', 'stadium': 'Stadium'}
+
+
+def delete_team(ctx, result):
+    ctx.db.delete_team(result['id'])
+
+
+def delete_player(ctx, result):
+    ctx.db.delete_player(result['id'])
+
+
+def delete_created(ctx, response):
+    """Undo a POST that created a team or player"""
+    if response.status_code < 400:
+        if '/teams' in response.request.path:
+            ctx.db.delete_team(response.json['id'])
+        else:
+            ctx.db.delete_player(response.json['id'])
+
+
+def existing_player(ctx):
+    return ctx.db.get_player_by_id(ctx.player()) or ctx.db.get_player_by_id(ctx.new_player())
+
+
+def database_cases():
+    def update_player(ctx, player):
+        ctx.db.update_player(player['player_id'], player['first_name'], player['last_name'],
+                             player['team_id'], player['position'], player['jersey_number'],
+                             player['age'], player['height'], player['weight'],
+                             player['ranking'] + 1, player['goals'], player['assists'],
+                             player['matches_played'])
+
+    def update_team(ctx, team_id):
+        team = ctx.db.get_team_by_id(team_id)
+        ctx.db.update_team(team_id, team['team_name'], team['coach_name'], team['founded_year'],
+                           team['city'], team['stadium'])
+
+    def read_snapshot(ctx):
+        with ctx.db.snapshot():
+            ctx.db.get_player_by_id(ctx.player())
+            ctx.db.get_team_by_id(ctx.team())
+            ctx.db.get_table_versions()
+
+    def drain(iterator):
+        for _ in iterator:
+            pass
+
+    return [
+        Case('ping', lambda ctx, _: ctx.db.ping()),
+        Case('get_table_versions', lambda ctx, _: ctx.db.get_table_versions()),
+        Case('get_latest_change_seq', lambda ctx, _: ctx.db.get_latest_change_seq()),
+        Case('get_changes (500)', lambda ctx, since: ctx.db.get_changes(since, 500),
+             lambda ctx: max(0, ctx.db.get_latest_change_seq() - 500)),
+        Case('get_all_teams', lambda ctx, _: ctx.db.get_all_teams()),
+        Case('get_team_by_id', lambda ctx, _: ctx.db.get_team_by_id(ctx.team())),
+        Case('snapshot (3 reads)', lambda ctx, _: read_snapshot(ctx)),
+        Case('get_teams_by_ids (10)', lambda ctx, ids: ctx.db.get_teams_by_ids(ids),
+             lambda ctx: [ctx.team() for _ in range(10)]),
+        Case('add_team', lambda ctx, name: ctx.db.add_team(name, 'Coach', 2000, 'City', 'Stadium'),
+             lambda ctx: ctx.unique('Bench Team'), delete_team),
+        Case('update_team', update_team, lambda ctx: ctx.team()),
+        Case('delete_team', lambda ctx, team_id: ctx.db.delete_team(team_id),
+             lambda ctx: ctx.new_team()),
+        Case('add_player', lambda ctx, _: {'id': ctx.new_player()}, cleanup=delete_player),
+        Case('get_all_players', lambda ctx, _: ctx.db.get_all_players()),
+        Case('get_all_players (3 fields)',
+             lambda ctx, _: ctx.db.get_all_players(['player_id', 'last_name', 'goals'])),
+        Case('get_player_by_id', lambda ctx, _: ctx.db.get_player_by_id(ctx.player())),
+        Case('get_players_by_ids (100)', lambda ctx, ids: ctx.db.get_players_by_ids(ids),
+             lambda ctx: [ctx.player() for _ in range(100)]),
+        Case('get_players_by_team', lambda ctx, _: ctx.db.get_players_by_team(ctx.team())),
+        Case('update_player', update_player, existing_player),
+        Case('delete_player', lambda ctx, player_id: ctx.db.delete_player(player_id),
+             lambda ctx: ctx.new_player()),
+        Case('player_exists', lambda ctx, _: ctx.db.player_exists(ctx.player())),
+        Case('apply_stat_deltas (100 players)', lambda ctx, deltas: ctx.db.apply_stat_deltas(deltas),
+             lambda ctx: {ctx.player(): (1, 0, 1) for _ in range(100)}),
+        Case('bulk_upsert_players (1000 rows)',
+             lambda ctx, rows: ctx.db.bulk_upsert_players(enumerate(rows, start=1)),
+             lambda ctx: [player_values(ctx) for _ in range(1000)]),
+        Case('bulk_upsert_teams (100 rows)',
+             lambda ctx, rows: ctx.db.bulk_upsert_teams(enumerate(rows, start=1)),
+             lambda ctx: [(team_id, ctx.unique('Bulk Team'), 'Coach', 1999, 'City', 'Stadium')
+                          for team_id in ctx.rng.sample(range(1, ctx.teams + 1),
+                                                        min(100, ctx.teams))]),
+        Case('iter_export (players)', lambda ctx, _: drain(ctx.db.iter_export('players'))),
+        Case('get_leaderboard_scores', lambda ctx, _: ctx.db.get_leaderboard_scores()),
+        Case('get_analytics_columns', lambda ctx, _: ctx.db.get_analytics_columns()),
+        Case('get_player_stats', lambda ctx, _: ctx.db.get_player_stats()),
+        Case('get_team_stats', lambda ctx, _: ctx.db.get_team_stats()),
+        Case('check_team_stats', lambda ctx, _: ctx.db.check_team_stats()),
+        Case('rebuild_team_stats', lambda ctx, _: ctx.db.rebuild_team_stats()),
+        Case('add_match_stats (1000 rows)',
+             lambda ctx, rows: ctx.db.add_match_stats(enumerate(rows, start=1)),
+             lambda ctx: [match_values(ctx, ctx.player(), ctx.rng.randint(0, 270))
+                          for _ in range(1000)]),
+        Case('get_player_form', lambda ctx, _: ctx.db.get_player_form(ctx.history_player())),
+        Case('get_team_form', lambda ctx, _: ctx.db.get_team_form(ctx.team())),
+        Case('get_player_seasons', lambda ctx, _: ctx.db.get_player_seasons(ctx.player())),
+        Case('get_team_seasons', lambda ctx, _: ctx.db.get_team_seasons(ctx.team())),
+        Case('get_season_leaders', lambda ctx, _: ctx.db.get_season_leaders(SEASON)),
+        Case('check_season_stats', lambda ctx, _: ctx.db.check_season_stats()),
+        Case('rebuild_season_stats', lambda ctx, _: ctx.db.rebuild_season_stats()),
+        Case('get_dashboard_summary', lambda ctx, _: ctx.db.get_dashboard_summary()),
+        Case('get_top_players_by_ranking', lambda ctx, _: ctx.db.get_top_players_by_ranking(10)),
+        Case('search_players', lambda ctx, _: ctx.db.search_players('silva')),
+        Case('get_players_page', lambda ctx, _: ctx.db.get_players_page(100)),
+        Case('get_players_page (3 fields)',
+             lambda ctx, _: ctx.db.get_players_page(100, fields=['player_id', 'last_name', 'goals'])),
+        Case('get_player_stats_page', lambda ctx, _: ctx.db.get_player_stats_page(100)),
+        Case('search_players_page', lambda ctx, _: ctx.db.search_players_page('silva', 100)),
+        Case('query_players (position, age range, by goals)',
+             lambda ctx, _: ctx.db.query_players(positions=['Forward'], ranges={'age': (20, 25)},
+                                                 sort=[('goals', True)], limit=100)),
+        Case('query_players (team, 3 fields)',
+             lambda ctx, _: ctx.db.query_players(fields=['player_id', 'last_name', 'ranking'],
+                                                 team_ids=[ctx.team()], limit=100)),
+    ]
+
+
+def route_cases():
+    def get(path):
+        return lambda ctx, _: ctx.client.get(path(ctx) if callable(path) else path)
+
+    def read_change_stream(ctx, since):
+        response = ctx.client.get(f'/api/changes/stream?since={since}', buffered=False)
+        try:
+            chunks = iter(response.response)
+            next(chunks)
+            return next(chunks)
+        finally:
+            response.close()
+
+    def cold(ctx):
+        # Time the work behind a response, not the response cache
+        if not ctx.cache:
+            ctx.app.response_cache.clear()
+
+    def cases():
+        for rule, path in [
+            ('/api/dashboard', '/api/dashboard'),
+            ('/api/teams', '/api/teams'),
+            ('/api/teams/<int:team_id>', lambda ctx: f'/api/teams/{ctx.team()}'),
+            ('/api/teams/<int:team_id>/players', lambda ctx: f'/api/teams/{ctx.team()}/players'),
+            ('/api/players', '/api/players'),
+            ('/api/players/<int:player_id>', lambda ctx: f'/api/players/{ctx.player()}'),
+            ('/api/players/search', '/api/players/search?q=silva'),
+            ('/api/players/query',
+             '/api/players/query?position=Forward&age_min=20&age_max=25&sort=-goals'),
+            ('/api/players/top/<int:limit>', '/api/players/top/10'),
+            ('/api/stats/players', '/api/stats/players'),
+            ('/api/stats/teams', '/api/stats/teams'),
+            ('/api/export/<path:dataset>', '/api/export/players'),
+            ('/api/leaderboards/<metric>', '/api/leaderboards/goals_per_match?limit=100'),
+            ('/api/leaderboards/<metric>/players/<int:player_id>',
+             lambda ctx: f'/api/leaderboards/ranking/players/{ctx.player()}'),
+            ('/api/leaderboards/<metric>/players/<int:player_id>/around',
+             lambda ctx: f'/api/leaderboards/ranking/players/{ctx.player()}/around'),
+            ('/api/analytics/summary', '/api/analytics/summary'),
+            ('/api/analytics/percentiles', '/api/analytics/percentiles'),
+            ('/api/analytics/groups/<by>', '/api/analytics/groups/position'),
+            ('/api/analytics/correlations', '/api/analytics/correlations'),
+            ('/api/analytics/histogram/<column>', '/api/analytics/histogram/goals'),
+            ('/api/players/<int:player_id>/form',
+             lambda ctx: f'/api/players/{ctx.history_player()}/form'),
+            ('/api/teams/<int:team_id>/form', lambda ctx: f'/api/teams/{ctx.team()}/form'),
+            ('/api/players/<int:player_id>/seasons',
+             lambda ctx: f'/api/players/{ctx.player()}/seasons'),
+            ('/api/teams/<int:team_id>/seasons', lambda ctx: f'/api/teams/{ctx.team()}/seasons'),
+            ('/api/seasons/<season>/players', f'/api/seasons/{SEASON}/players'),
+        ]:
+            yield Case(f'GET {rule}', get(path), cold)
+        # A page deep into the list costs the same as the first one
+        yield Case('GET /api/players (page)', get('/api/players?limit=100'), cold)
+        yield Case('GET /api/players (3 fields, columns)',
+                   get('/api/players?fields=player_id,last_name,goals&format=columns'), cold)
+        yield Case('GET /api/players (100 ids)', lambda ctx, ids: ctx.client.get(
+            f"/api/players?ids={','.join(map(str, ids))}"),
+            lambda ctx: [ctx.player() for _ in range(100)])
+        yield Case('POST /api/batch (player, team, 10 players)', lambda ctx, body: ctx.client.post(
+            '/api/batch', json=body), lambda ctx: {'requests': [
+                f'/api/players/{ctx.player()}', f'/api/teams/{ctx.team()}',
+                f"/api/players?ids={','.join(str(ctx.player()) for _ in range(10))}"]})
+        yield Case('GET /api/players (gzip)', lambda ctx, _: ctx.client.get(
+            '/api/players', headers={'Accept-Encoding': 'gzip'}), cold)
+        for rule in ('/healthz', '/readyz', '/api/pool/stats', '/api/cache/stats',
+                     '/api/events/stats', '/api/leaderboards/stats', '/api/analytics/stats',
+                     '/api/changes/stats'):
+            yield Case(f'GET {rule}', get(rule))
+        # Connecting, then catching up on the last (up to) 500 changes
+        yield Case('GET /api/changes/stream', read_change_stream,
+                   lambda ctx: max(0, ctx.db.get_latest_change_seq() - 500))
+
+        yield Case('POST /api/teams', lambda ctx, body: ctx.client.post('/api/teams', json=body),
+                   team_json, delete_created)
+        yield Case('PUT /api/teams/<int:team_id>',
+                   lambda ctx, args: ctx.client.put(f'/api/teams/{args[0]}', json=args[1]),
+                   lambda ctx: (ctx.new_team(), team_json(ctx)))
+        yield Case('DELETE /api/teams/<int:team_id>',
+                   lambda ctx, team_id: ctx.client.delete(f'/api/teams/{team_id}'),
+                   lambda ctx: ctx.new_team())
+        yield Case('POST /api/teams/bulk (100 rows)',
+                   lambda ctx, body: ctx.client.post('/api/teams/bulk', json=body),
+                   lambda ctx: [dict(team_json(ctx), team_id=team_id)
+                                for team_id in ctx.rng.sample(range(1, ctx.teams + 1),
+                                                              min(100, ctx.teams))])
+        yield Case('POST /api/players',
+                   lambda ctx, body: ctx.client.post('/api/players', json=body), player_json,
+                   delete_created)
+        yield Case('PUT /api/players/<int:player_id>',
+                   lambda ctx, args: ctx.client.put(f'/api/players/{args[0]}', json=args[1]),
+                   lambda ctx: (ctx.player(), player_json(ctx)))
+        yield Case('DELETE /api/players/<int:player_id>',
+                   lambda ctx, player_id: ctx.client.delete(f'/api/players/{player_id}'),
+                   lambda ctx: ctx.new_player())
+        yield Case('POST /api/players/bulk (1000 rows)',
+                   lambda ctx, body: ctx.client.post('/api/players/bulk', json=body),
+                   lambda ctx: [dict(player_json(ctx), player_id=ctx.player())
+                                for _ in range(1000)])
+        yield Case('POST /api/matches (1000 rows)',
+                   lambda ctx, body: ctx.client.post('/api/matches', json=body),
+                   lambda ctx: [dict(zip(('player_id', 'team_id', 'match_date', 'goals',
+                                          'assists', 'appearances'),
+                                         match_values(ctx, ctx.player(), ctx.rng.randint(0, 270))))
+                                for _ in range(1000)])
+        yield Case('POST /api/players/<int:player_id>/events',
+                   lambda ctx, _: ctx.client.post(f'/api/players/{ctx.player()}/events',
+                                                  json={'goals': 1, 'matches_played': 1}))
+
+    return list(cases())
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    total = sum(samples)
+
+    def percentile(p):
+        return samples[max(0, math.ceil(p / 100 * len(samples)) - 1)] * 1000
+
+    return {
+        'iterations': len(samples),
+        'ops_per_sec': round(len(samples) / total, 2) if total else None,
+        'mean_ms': round(total / len(samples) * 1000, 4),
+        'p50_ms': round(percentile(50), 4),
+        'p90_ms': round(percentile(90), 4),
+        'p99_ms': round(percentile(99), 4),
+        'max_ms': round(samples[-1] * 1000, 4),
+    }
+
+
+def time_case(ctx, case, budget, max_iterations):
+    samples = []
+    errors = 0
+    for iteration in range(max_iterations + 1):
+        prepared = case.prepare(ctx) if case.prepare else None
+        started = time.perf_counter()
+        result = case.run(ctx, prepared)
+        elapsed = time.perf_counter() - started
+        if getattr(result, 'status_code', 200) >= 400:
+            errors += 1
+        if case.cleanup:
+            case.cleanup(ctx, result)
+        # The first run warms caches (leaderboards, analytics columns, pages)
+        if iteration:
+            samples.append(elapsed)
+        if iteration and sum(samples) >= budget:
+            break
+    stats = summarize(samples)
+    stats['errors'] = errors
+    return stats
+
+
+def report(name, stats):
+    print(f'  {name:<58} {stats["ops_per_sec"] or 0:>10.1f}/s  p50 {stats["p50_ms"]:>9.3f}  '
+          f'p90 {stats["p90_ms"]:>9.3f}  p99 {stats["p99_ms"]:>9.3f} ms'
+          + (f'  ({stats["errors"]} errors)' if stats['errors'] else ''), flush=True)
+
+
+def run_size(args):
+    """Child process: seed a database of args.child players and time every case"""
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['SPORTS_MANAGEMENT_DB'] = os.path.join(tmp, 'bench.db')
+        import app as application
+
+        players = args.child
+        teams = min(max(players // 200, 10), 2000)
+        started = time.perf_counter()
+        application.db.add_synthetic_data(teams, players, seed=7)
+        seed_time = time.perf_counter() - started
+        print(f'{players} players, {teams} teams (seeded in {seed_time:.1f}s)', flush=True)
+
+        ctx = Context(application.db, application.app.test_client(), players, teams, args.cache)
+        ctx.app = application
+        seed_history(ctx)
+        only = re.compile(args.only) if args.only else None
+        results = {'players': players, 'teams': teams, 'seed_seconds': round(seed_time, 3),
+                   'database': {}, 'api': {}}
+        for section, cases in (('database', database_cases()), ('api', route_cases())):
+            for case in cases:
+                if only and not only.search(case.name):
+                    continue
+                stats = time_case(ctx, case, args.budget, args.max_iterations)
+                results[section][case.name] = stats
+                report(case.name, stats)
+        application.shutdown()
+    with open(args.child_output, 'w') as f:
+        json.dump(results, f)
+    return 0
+
+
+def uncovered():
+    """Public Database methods and API routes that no case exercises"""
+    from app import app as flask_app
+    from database import Database
+
+    covered = {case.name.split(' ')[0] for case in database_cases()}
+    methods = sorted(name for name in vars(Database)
+                     if not name.startswith('_') and callable(getattr(Database, name))
+                     and name not in covered and name not in SKIPPED_METHODS)
+    covered = {tuple(case.name.split(' ')[:2]) for case in route_cases()}
+    routes = sorted(f'{method} {rule.rule}' for rule in flask_app.url_map.iter_rules()
+                    for method in rule.methods - {'HEAD', 'OPTIONS'}
+                    if (method, rule.rule) not in covered | SKIPPED_ROUTES)
+    return methods, routes
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f'\np50 vs {baseline_path}:')
+    for size, sections in results.items():
+        if size not in baseline:
+            continue
+        print(f'{size} players')
+        for section in ('database', 'api'):
+            for name, stats in sections[section].items():
+                before = baseline[size].get(section, {}).get(name)
+                if before and before['p50_ms']:
+                    ratio = stats['p50_ms'] / before['p50_ms']
+                    print(f'  {name:<58} {before["p50_ms"]:>9.3f} -> {stats["p50_ms"]:>9.3f} ms'
+                          f'  x{ratio:.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--budget', type=float, default=1.0,
+                        help='seconds to spend timing each case (default 1)')
+    parser.add_argument('--max-iterations', type=int, default=500)
+    parser.add_argument('--only', help='only run cases whose name matches this regex')
+    parser.add_argument('--cache', action='store_true',
+                        help='leave the response cache on while timing routes')
+    parser.add_argument('--output', help='results file (default: benchmarks/results/suite-<timestamp>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='earlier results file to compare with')
+    parser.add_argument('--child', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--child-output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_size(args)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            output = os.path.join(tmp, f'{size}.json')
+            command = [sys.executable, os.path.abspath(__file__), '--child', str(size),
+                       '--child-output', output, '--budget', str(args.budget),
+                       '--max-iterations', str(args.max_iterations)]
+            if args.only:
+                command += ['--only', args.only]
+            if args.cache:
+                command.append('--cache')
+            if subprocess.run(command).returncode != 0:
+                print(f'{size} players: failed', file=sys.stderr)
+                return 1
+            with open(output) as f:
+                results[str(size)] = json.load(f)
+
+        # Imported only now (for uncovered()) so the parent never opens a
+        # database of its own in the working directory
+        os.environ['SPORTS_MANAGEMENT_DB'] = os.path.join(tmp, 'coverage.db')
+        methods, routes = uncovered()
+
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results', time.strftime('suite-%Y%m%d-%H%M%S.json'))
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'meta': {
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+                'budget': args.budget,
+                'max_iterations': args.max_iterations,
+                'cache': args.cache,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f'\nResults saved to {output}')
+    if methods or routes:
+        print('Not benchmarked: ' + ', '.join(methods + routes))
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
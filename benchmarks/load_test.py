@@ -0,0 +1,211 @@
+"""HTTP load test: the sync dev server against the asyncio (ASGI) mode.
+
+Usage:
+    python benchmarks/load_test.py [--players 5000] [--concurrency 64] [--seconds 10]
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 [--url ...]
+
+By default a temporary database is seeded and `python app.py --no-debug` and
+`python app.py --asgi` are started against it in turn. With --url the given
+servers are tested as they are. Each of --concurrency clients requests the
+dashboard read routes in a loop, reusing its connection where the server
+allows keep-alive; requests/sec and latency percentiles are reported per
+server.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from database import Database  # noqa: E402
+
+PATHS = [
+    '/api/dashboard?top=5',
+    '/api/stats/teams',
+    '/api/players/top/10',
+    '/api/players?limit=50',
+    '/api/players/search?q=Fir&limit=20',
+]
+
+# Seconds to wait for a response before counting it as an error
+TIMEOUT = 30.0
+
+SERVERS = {
+    'sync': ['--no-debug'],
+    'asgi': ['--asgi'],
+}
+
+
+def seed(path, players):
+    db = Database(path)
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.executemany(
+        'INSERT INTO teams (team_name, coach_name, founded_year, city, stadium) VALUES (?, ?, ?, ?, ?)',
+        [(f'Team {i}', f'Coach {i}', 1900 + i, f'City {i}', f'Stadium {i}') for i in range(20)])
+    cursor.executemany('''
+        INSERT INTO players
+        (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+         ranking, goals, assists, matches_played)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', [(f'First{i}', f'Last{i}', i % 20 + 1, 'Forward', i % 99, 20 + i % 15, 180.0, 75.0,
+           random.randint(0, 100), random.randint(0, 40), random.randint(0, 20), 30)
+          for i in range(players)])
+    conn.commit()
+    conn.close()
+    db.close()
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    keep_alive = status_line.startswith(b'HTTP/1.1')
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection':
+            keep_alive = value.strip().lower() == 'keep-alive'
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length is not None:
+        await reader.readexactly(length)
+    else:
+        await reader.read()
+        raise ConnectionError('response without a length')
+    return status, keep_alive
+
+
+async def client(host, port, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = random.choice(PATHS)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n\r\n'.encode())
+            await writer.drain()
+            status, keep_alive = await asyncio.wait_for(read_response(reader), TIMEOUT)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError,
+                asyncio.TimeoutError):
+            errors.append(path)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+            continue
+        if status != 200:
+            errors.append(path)
+        latencies.append(time.perf_counter() - started)
+        if not keep_alive:
+            # The dev server answers every request with Connection: close
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(url, concurrency, seconds):
+    parts = urlsplit(url)
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + seconds
+    await asyncio.gather(*(client(parts.hostname, parts.port or 80, deadline, latencies, errors)
+                           for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies, errors, elapsed):
+    latencies.sort()
+    if not latencies:
+        print(f'{name:<28} no successful requests ({len(errors)} errors)')
+        return
+    print(f'{name:<28} {len(latencies) / elapsed:>9.0f} req/s'
+          f'   p50 {percentile(latencies, 0.50) * 1000:>7.1f} ms'
+          f'   p99 {percentile(latencies, 0.99) * 1000:>7.1f} ms'
+          f'   errors {len(errors)}')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_listening(port, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError('server exited during startup')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError('server did not start listening')
+
+
+def run_server(mode, db_path, concurrency, seconds):
+    port = free_port()
+    env = dict(os.environ, SPORTS_MANAGEMENT_DB=db_path)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'app.py'), '--port', str(port)] + SERVERS[mode],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_until_listening(port, process)
+        return asyncio.run(load(f'http://127.0.0.1:{port}', concurrency, seconds))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', action='append', help='test a running server instead')
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    args = parser.parse_args()
+
+    print(f'{args.concurrency} concurrent clients, {args.seconds:g}s per server')
+    if args.url:
+        for url in args.url:
+            report(url, *asyncio.run(load(url, args.concurrency, args.seconds)))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'load.db')
+        seed(db_path, args.players)
+        for mode in SERVERS:
+            report(f'{mode} ({args.players} players)',
+                   *run_server(mode, db_path, args.concurrency, args.seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+import codecs
+import csv
+import json
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'application/json': 'json',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/x-jsonlines': 'ndjson',
+    'text/csv': 'csv',
+}
+
+# (name, type, default) in the column order used by Database.bulk_upsert_*
+PLAYER_FIELDS = [
+    ('player_id', int, None),
+    ('first_name', str, None),
+    ('last_name', str, None),
+    ('team_id', int, None),
+    ('position', str, ''),
+    ('jersey_number', int, 0),
+    ('age', int, 0),
+    ('height', float, 0.0),
+    ('weight', float, 0.0),
+    ('ranking', int, 0),
+    ('goals', int, 0),
+    ('assists', int, 0),
+    ('matches_played', int, 0),
+]
+
+TEAM_FIELDS = [
+    ('team_id', int, None),
+    ('team_name', str, None),
+    ('coach_name', str, ''),
+    ('founded_year', int, None),
+    ('city', str, ''),
+    ('stadium', str, ''),
+]
+
+# Column order used by Database.add_match_stats
+MATCH_FIELDS = [
+    ('player_id', int, None),
+    ('team_id', int, None),
+    ('match_date', str, None),
+    ('goals', int, 0),
+    ('assists', int, 0),
+    ('appearances', int, 1),
+]
+
+# Entity -> (fields, required field names) for rows()
+ENTITIES = {
+    'players': (PLAYER_FIELDS, ('first_name', 'last_name')),
+    'teams': (TEAM_FIELDS, ('team_name',)),
+    'matches': (MATCH_FIELDS, ('player_id', 'match_date')),
+}
+
+
+def detect_format(mimetype, requested=None):
+    """Pick the body format from ?format= or the Content-Type"""
+    if requested:
+        if requested not in ('json', 'ndjson', 'csv'):
+            raise ValueError(f'Unsupported format: {requested}')
+        return requested
+    if mimetype not in FORMATS:
+        raise ValueError('Content-Type must be application/json, application/x-ndjson or text/csv')
+    return FORMATS[mimetype]
+
+
+def iter_records(stream, fmt):
+    """Yield (row_number, record) from a request body without reading it all.
+
+    record is a dict, or a ValueError for a row that could not be parsed.
+    Row numbers start at 1 (for CSV, the first row after the header). A body
+    that is not valid JSON past some point ends with an error for that row.
+    """
+    if fmt == 'json':
+        return _iter_json_array(stream)
+    if fmt == 'ndjson':
+        return _iter_ndjson(stream)
+    return _iter_csv(stream)
+
+
+def _iter_text(stream):
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        yield decoder.decode(chunk)
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _iter_json_array(stream):
+    decoder = json.JSONDecoder()
+    chunks = _iter_text(stream)
+    buffer = ''
+    position = 0
+    started = False
+    row_number = 0
+    for chunk in chunks:
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    yield 1, ValueError('Expected a JSON array')
+                    return
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                record, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # Probably cut off at the chunk boundary; wait for more data
+                break
+            position = end
+            row_number += 1
+            if isinstance(record, dict):
+                yield row_number, record
+            else:
+                yield row_number, ValueError('Expected a JSON object')
+    if not started:
+        yield 1, ValueError('Expected a JSON array')
+    else:
+        yield row_number + 1, ValueError(f'Invalid or truncated JSON after row {row_number}')
+
+
+def _iter_ndjson(stream):
+    for row_number, line in enumerate(_iter_lines(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield row_number, ValueError(f'Invalid JSON: {e}')
+            continue
+        if isinstance(record, dict):
+            yield row_number, record
+        else:
+            yield row_number, ValueError('Expected a JSON object')
+
+
+def _iter_lines(stream):
+    pending = ''
+    for chunk in _iter_text(stream):
+        pending += chunk
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+
+def _iter_csv(stream):
+    reader = csv.DictReader(_iter_lines(stream))
+    for row_number, record in enumerate(reader, start=1):
+        if None in record:
+            yield row_number, ValueError('Too many values in row')
+            continue
+        # Empty CSV cells mean "use the default"
+        yield row_number, {key: value for key, value in record.items() if value not in ('', None)}
+
+
+def to_values(record, fields, required):
+    """Validate a record and return its column values in field order.
+
+    Raises ValueError describing the first problem found.
+    """
+    if isinstance(record, Exception):
+        raise record
+    values = []
+    for name, type_, default in fields:
+        value = record.get(name)
+        if value is None or value == '':
+            if name in required:
+                raise ValueError(f'{name} is required')
+            values.append(default)
+            continue
+        try:
+            values.append(_coerce(value, type_))
+        except (TypeError, ValueError):
+            raise ValueError(f'{name} must be of type {type_.__name__}')
+    return tuple(values)
+
+
+def _coerce(value, type_):
+    if isinstance(value, (bool, dict, list)):
+        raise ValueError
+    if type_ is int:
+        if isinstance(value, str):
+            value = value.strip()
+            try:
+                return int(value)
+            except ValueError:
+                value = float(value)
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError
+        return int(value)
+    return type_(value)
+
+
+def rows(records, entity):
+    """Turn (row_number, record) pairs into (row_number, values or ValueError).
+
+    entity is a key of ENTITIES.
+    """
+    fields, required = ENTITIES[entity]
+    for row_number, record in records:
+        try:
+            yield row_number, to_values(record, fields, required)
+        except ValueError as e:
+            yield row_number, e
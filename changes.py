@@ -0,0 +1,292 @@
+"""Change feed behind /api/changes/stream.
+
+Every Database write appends to the change_log table (see
+PooledConnection.record_change). A ChangeStream turns new entries into
+Server-Sent Events carrying the changed rows, so a dashboard can patch its
+tables instead of re-fetching them after every edit.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+# change_log entries read per step of a stream
+BATCH_SIZE = 500
+# Seconds between checks for writes made by other processes (serve.py
+# workers, manage.py); writes made by this process wake streams right away
+POLL_INTERVAL = 1.0
+# Seconds of silence after which a comment line is sent, so proxies keep the
+# connection open and a vanished client is noticed on the next write
+HEARTBEAT_INTERVAL = 15.0
+# How long browsers wait before reconnecting, in milliseconds
+RETRY_MS = 3000
+
+# Tables whose current rows are sent along with their changes
+ROW_READERS = {
+    'players': ('get_players_by_ids', 'player_id'),
+    'teams': ('get_teams_by_ids', 'team_id'),
+}
+
+
+def format_event(event, data, seq=None):
+    """Encode one Server-Sent Event"""
+    lines = []
+    if seq is not None:
+        lines.append(f'id: {seq}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, separators=(",", ":"))}')
+    return '\n'.join(lines) + '\n\n'
+
+
+def parse_since(value):
+    """Sequence number from ?since= or Last-Event-ID; raises ValueError"""
+    if value is None or value == '':
+        return None
+    since = int(value)
+    if since < 0:
+        raise ValueError('since must not be negative')
+    return since
+
+
+class ChangeFeed:
+    """Wakes change streams when new change_log entries appear.
+
+    A write listener notices this process's own commits immediately; while
+    any stream is waiting, a background thread also polls the newest
+    sequence number every poll_interval seconds to pick up other processes'
+    writes. The listener never reads the database itself, since the writer
+    still holds its connection while listeners run.
+    """
+
+    def __init__(self, db, poll_interval=POLL_INTERVAL):
+        self.db = db
+        self.poll_interval = poll_interval
+        self._lock = threading.Condition(threading.Lock())
+        self._latest = 0  # newest sequence number the poller has seen
+        self._waiters = []  # [after, deadline, callback]
+        self._wake = False
+        self._closed = False
+        self._thread = None
+        self._stats = {'streams': 0, 'open_streams': 0, 'events': 0, 'resets': 0, 'polls': 0}
+        db.add_write_listener(self._on_write)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _on_write(self, changes):
+        with self._lock:
+            if self._waiters:
+                self._wake = True
+                self._lock.notify()
+
+    def add_waiter(self, after, callback, timeout):
+        """Call callback() once there are entries after sequence number after.
+
+        The callback also runs once timeout seconds have passed, or when the
+        feed closes. It is called from whichever thread notices, so it must
+        not block.
+        """
+        with self._lock:
+            ready = self._closed or self._latest > after
+            if not ready:
+                self._waiters.append((after, time.monotonic() + timeout, callback))
+                if self._thread is None:
+                    self._start()
+                # Check the database now rather than after a full interval
+                self._wake = True
+                self._lock.notify()
+        if ready:
+            callback()
+
+    def _start(self):
+        # Started lazily, like StatEventQueue, so a feed created before a
+        # fork gets its thread in the process that serves the streams
+        self._thread = threading.Thread(target=self._run, name='change-feed', daemon=True)
+        self._thread.start()
+
+    def _timeout(self):
+        if not self._waiters:
+            return None
+        deadline = min(deadline for after, deadline, callback in self._waiters)
+        return max(0.0, min(self.poll_interval, deadline - time.monotonic()))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._wake and not self._closed:
+                    self._lock.wait(self._timeout())
+                self._wake = False
+                if self._closed:
+                    waiters, self._waiters = self._waiters, []
+                    break
+                poll = bool(self._waiters)
+            latest = None
+            if poll:
+                try:
+                    latest = self.db.get_latest_change_seq()
+                except sqlite3.Error:
+                    pass
+            now = time.monotonic()
+            with self._lock:
+                if latest is not None:
+                    self._latest = latest
+                    self._stats['polls'] += 1
+                ready = [waiter for waiter in self._waiters
+                         if self._latest > waiter[0] or now >= waiter[1]]
+                self._waiters = [waiter for waiter in self._waiters
+                                 if not (self._latest > waiter[0] or now >= waiter[1])]
+            for after, deadline, callback in ready:
+                callback()
+        for after, deadline, callback in waiters:
+            callback()
+
+    def read(self, since):
+        """Return (latest, events) for the entries after sequence number since.
+
+        events is a list of (event, data, seq) tuples. A missing since starts
+        at the newest entry. A since the log can no longer resume from, because
+        it was pruned or the database was replaced, produces a 'reset' event
+        and continues from the newest entry. Changes to the same row within
+        one batch are sent once, with the row as it is now.
+        """
+        if since is None:
+            return self.db.get_latest_change_seq(), []
+        latest, oldest, rows = self.db.get_changes(since, BATCH_SIZE)
+        if since > latest or (since < latest and (oldest is None or since < oldest - 1)):
+            with self._lock:
+                self._stats['resets'] += 1
+            return latest, [('reset', {'seq': latest}, latest)]
+        if not rows:
+            return since, []
+        # (table, row_id) -> (seq, op), ordered by each key's newest entry
+        changes = {}
+        for seq, table, op, row_id in rows:
+            changes.pop((table, row_id), None)
+            changes[(table, row_id)] = (seq, op)
+        current = {}
+        for table, (reader, key) in ROW_READERS.items():
+            ids = [row_id for changed_table, row_id in changes
+                   if changed_table == table and row_id is not None]
+            if ids:
+                for row in getattr(self.db, reader)(ids):
+                    current[(table, row[key])] = dict(zip(row.keys(), row))
+        events = []
+        for (table, row_id), (seq, op) in changes.items():
+            if row_id is None:
+                # Unknown rows changed (bulk writes, sample data, clearing)
+                events.append(('reload', {'seq': seq, 'table': table, 'op': op}, seq))
+                continue
+            row = current.get((table, row_id))
+            if row is None and table in ROW_READERS:
+                op = 'delete'
+            events.append(('change', {'seq': seq, 'table': table, 'op': op, 'id': row_id,
+                                      'row': row}, seq))
+        with self._lock:
+            self._stats['events'] += len(events)
+        return rows[-1][0], events
+
+    def stream(self, since=None):
+        """ChangeStream for one client"""
+        return ChangeStream(self, since)
+
+    def _stream_opened(self):
+        with self._lock:
+            self._stats['streams'] += 1
+            self._stats['open_streams'] += 1
+
+    def _stream_closed(self):
+        with self._lock:
+            self._stats['open_streams'] -= 1
+
+    def close(self):
+        """Stop the poller and end every open stream"""
+        with self._lock:
+            self._closed = True
+            thread = self._thread
+            self._lock.notify()
+            waiters, self._waiters = self._waiters, []
+        for after, deadline, callback in waiters:
+            callback()
+        if thread is not None and thread.is_alive():
+            thread.join()
+
+    def stats(self):
+        """Stream, event and poll counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['waiting_streams'] = len(self._waiters)
+            stats['latest_seq'] = self._latest
+            stats['poll_interval'] = self.poll_interval
+        return stats
+
+
+class ChangeStream:
+    """Iterator over the Server-Sent Events for one client.
+
+    Starts with a 'ready' event carrying the current sequence number, then
+    sends a 'change' event per changed row (id, op and the row itself, or
+    null once deleted) and a 'reload' event when a write touched an unknown
+    set of rows. Every event's id is its sequence number, so a reconnecting
+    EventSource resumes where it stopped through Last-Event-ID.
+
+    Iterating blocks while there is nothing to send, which suits a threaded
+    WSGI server. asgi.py sets blocking = False instead: next() then returns
+    b'' when idle and add_waiter(callback) asks to be told when to call it
+    again, so an idle client holds no thread.
+    """
+
+    def __init__(self, feed, since=None):
+        self.feed = feed
+        self.seq = since
+        self.blocking = True
+        self._started = False
+        self._closed = False
+        self._next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+        feed._stream_opened()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while True:
+            if self._closed or self.feed.closed:
+                raise StopIteration
+            chunk = self._read()
+            if chunk:
+                return chunk
+            if time.monotonic() >= self._next_heartbeat:
+                self._next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+                return b': keep-alive\n\n'
+            if not self.blocking:
+                return b''
+            ready = threading.Event()
+            self.add_waiter(ready.set)
+            ready.wait()
+
+    def _read(self):
+        if not self._started:
+            self._started = True
+            if self.seq is None:
+                self.seq = self.feed.read(None)[0]
+            # A resumed stream says where it resumes from and catches up on
+            # the next call
+            chunks = [f'retry: {RETRY_MS}\n\n',
+                      format_event('ready', {'seq': self.seq}, self.seq)]
+        else:
+            self.seq, events = self.feed.read(self.seq)
+            if not events:
+                return b''
+            chunks = [format_event(event, data, seq) for event, data, seq in events]
+        self._next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+        return ''.join(chunks).encode()
+
+    def add_waiter(self, callback):
+        """Call callback() once next() may have something to send"""
+        self.feed.add_waiter(self.seq, callback,
+                             max(0.0, self._next_heartbeat - time.monotonic()))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.feed._stream_closed()
@@ -0,0 +1,68 @@
+"""gzip/brotli compression for API responses.
+
+Responses are compressed when the client accepts it, the body is one of
+COMPRESSIBLE_TYPES and at least MIN_SIZE bytes. brotli is used when the
+package is installed and the client prefers it at least as much as gzip.
+Streamed bodies (exports, the change feed) and files are left alone: they
+are sent as they are produced, or are small static assets.
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Below this many bytes the headers outweigh the saving
+MIN_SIZE = 1024
+GZIP_LEVEL = 6
+# brotli's 11 is several times slower than gzip; 5 compresses better than
+# gzip -6 at about the same speed
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+}
+
+
+def encodings():
+    """Content codings this process can produce, most preferred first"""
+    return ['br', 'gzip'] if brotli is not None else ['gzip']
+
+
+def negotiate(accept_encodings):
+    """Best coding from a request's Accept-Encoding, or None for identity"""
+    return accept_encodings.best_match(encodings())
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, GZIP_LEVEL, mtime=0)
+
+
+def compressible(response):
+    """Whether response's body may be compressed at all"""
+    return (response.mimetype in COMPRESSIBLE_TYPES and not response.direct_passthrough
+            and not response.is_streamed and 'Content-Encoding' not in response.headers)
+
+
+def compress_response(response, encoding):
+    """Compress response in place with encoding (None does nothing) and return it"""
+    if not compressible(response):
+        return response
+    response.vary.add('Accept-Encoding')
+    if encoding is None or not 200 <= response.status_code < 300:
+        return response
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
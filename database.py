@@ -1,18 +1,1403 @@
+import base64
+import contextlib
+import functools
+import json
+import logging
+import os
+import random
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import date
+from itertools import islice
+
+write_listener_log = logging.getLogger('sports_management.write_listeners')
+
+# Named storage profiles. journal_mode is persistent and applied once when the
+# database is initialised; the remaining PRAGMAs are applied to every pooled
+# connection as it is opened.
+STORAGE_PROFILES = {
+    # SQLite's defaults: a rollback journal, so a writer blocks all readers.
+    'rollback': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+    # Write-ahead logging: readers keep going while a write is in progress.
+    'wal': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -16000,  # in KiB, i.e. ~16 MB per connection
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'wal_autocheckpoint': 1000,  # pages
+        'journal_size_limit': 67108864,
+    },
+}
+
+# Secondary indexes for the hot read paths. The (team_id, ranking, goals,
+# assists) index lets get_players_by_team seek and return rows already in
+# ranking order, and covers the per-team aggregates behind team_stats.
+INDEXES = {
+    'idx_players_team_ranking': 'players (team_id, ranking DESC, goals, assists)',
+    'idx_players_ranking': 'players (ranking DESC)',
+    'idx_players_name': 'players (last_name, first_name)',
+    'idx_players_position_ranking': 'players (position, ranking DESC)',
+    'idx_match_stats_player_date': 'match_stats (player_id, match_date)',
+    'idx_match_stats_team_date': 'match_stats (team_id, match_date)',
+    'idx_player_season_stats_leaders': 'player_season_stats (season, goals DESC)',
+}
+
+# Read queries issued by Database. They live here so verify_query_plans() can
+# check exactly the SQL the methods run.
+SELECT_ALL_TEAMS = 'SELECT * FROM teams ORDER BY team_name'
+
+SELECT_TEAM_BY_ID = 'SELECT * FROM teams WHERE team_id = ?'
+
+SELECT_ALL_PLAYERS = '''
+    SELECT p.*, t.team_name 
+    FROM players p
+    LEFT JOIN teams t ON p.team_id = t.team_id
+    ORDER BY p.ranking DESC
+'''
+
+SELECT_PLAYER_BY_ID = 'SELECT * FROM players WHERE player_id = ?'
+
+SELECT_PLAYERS_BY_IDS = '''
+    SELECT p.*, t.team_name
+    FROM players p
+    LEFT JOIN teams t ON p.team_id = t.team_id
+    WHERE p.player_id IN'''
+
+SELECT_PLAYERS_BY_TEAM = '''
+    SELECT * FROM players 
+    WHERE team_id = ? 
+    ORDER BY ranking DESC
+'''
+
+SELECT_TEAMS_BY_IDS = 'SELECT * FROM teams WHERE team_id IN'
+
+# Queries ending in "IN" take a list of ids (see _fetch_by_ids), sent in
+# batches that stay under SQLITE_MAX_VARIABLE_NUMBER on older builds (999)
+MAX_SQL_PARAMETERS = 500
+
+# Change feed (see changes.py). Every record_change() appends one change_log
+# row per changed id, or a single row with a NULL row_id when the write
+# touched an unknown set of rows.
+INSERT_CHANGE = 'INSERT INTO change_log (table_name, op, row_id) VALUES (?, ?, ?)'
+
+SELECT_CHANGES = '''
+    SELECT seq, table_name, op, row_id FROM change_log
+    WHERE seq > ?
+    ORDER BY seq
+    LIMIT ?
+'''
+
+SELECT_LATEST_CHANGE = "SELECT seq FROM sqlite_sequence WHERE name = 'change_log'"
+
+# change_log keeps roughly the last CHANGE_LOG_RETENTION entries; older ones
+# are pruned each time the sequence passes a multiple of CHANGE_LOG_PRUNE_EVERY
+CHANGE_LOG_RETENTION = 10000
+CHANGE_LOG_PRUNE_EVERY = 1000
+
+SELECT_PLAYER_STATS = 'SELECT * FROM player_stats'
+
+SELECT_TEAM_STATS = 'SELECT * FROM team_stats ORDER BY team_id'
+
+# team_stats is a table maintained by the triggers below rather than a view,
+# so reading it costs O(teams) instead of aggregating every player. This is
+# the aggregate it must always equal.
+COMPUTE_TEAM_STATS = '''
+    SELECT 
+        t.team_id,
+        t.team_name,
+        t.coach_name,
+        t.city,
+        COUNT(p.player_id) AS total_players,
+        COALESCE(SUM(p.goals), 0) AS total_goals,
+        COALESCE(SUM(p.assists), 0) AS total_assists
+    FROM teams t
+    LEFT JOIN players p ON t.team_id = p.team_id
+    GROUP BY t.team_id
+'''
+
+CREATE_TEAM_STATS = '''
+    CREATE TABLE IF NOT EXISTS team_stats (
+        team_id INTEGER PRIMARY KEY,
+        team_name TEXT,
+        coach_name TEXT,
+        city TEXT,
+        total_players INTEGER NOT NULL DEFAULT 0,
+        total_goals INTEGER NOT NULL DEFAULT 0,
+        total_assists INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+TEAM_STATS_TRIGGERS = {
+    'team_stats_team_ai': '''
+        AFTER INSERT ON teams BEGIN
+            INSERT OR REPLACE INTO team_stats
+            SELECT new.team_id, new.team_name, new.coach_name, new.city, COUNT(*),
+                   COALESCE(SUM(goals), 0), COALESCE(SUM(assists), 0)
+            FROM players WHERE team_id = new.team_id;
+        END
+    ''',
+    'team_stats_team_au': '''
+        AFTER UPDATE OF team_name, coach_name, city ON teams BEGIN
+            UPDATE team_stats
+            SET team_name = new.team_name, coach_name = new.coach_name, city = new.city
+            WHERE team_id = new.team_id;
+        END
+    ''',
+    'team_stats_team_ad': '''
+        AFTER DELETE ON teams BEGIN
+            DELETE FROM team_stats WHERE team_id = old.team_id;
+        END
+    ''',
+    'team_stats_player_ai': '''
+        AFTER INSERT ON players BEGIN
+            UPDATE team_stats
+            SET total_players = total_players + 1,
+                total_goals = total_goals + COALESCE(new.goals, 0),
+                total_assists = total_assists + COALESCE(new.assists, 0)
+            WHERE team_id = new.team_id;
+        END
+    ''',
+    'team_stats_player_au': '''
+        AFTER UPDATE OF team_id, goals, assists ON players BEGIN
+            UPDATE team_stats
+            SET total_players = total_players - 1,
+                total_goals = total_goals - COALESCE(old.goals, 0),
+                total_assists = total_assists - COALESCE(old.assists, 0)
+            WHERE team_id = old.team_id;
+            UPDATE team_stats
+            SET total_players = total_players + 1,
+                total_goals = total_goals + COALESCE(new.goals, 0),
+                total_assists = total_assists + COALESCE(new.assists, 0)
+            WHERE team_id = new.team_id;
+        END
+    ''',
+    'team_stats_player_ad': '''
+        AFTER DELETE ON players BEGIN
+            UPDATE team_stats
+            SET total_players = total_players - 1,
+                total_goals = total_goals - COALESCE(old.goals, 0),
+                total_assists = total_assists - COALESCE(old.assists, 0)
+            WHERE team_id = old.team_id;
+        END
+    ''',
+}
+
+# Match history. match_stats is append-only: one row per player per match,
+# plus 'adjustment' rows for totals set directly (add_player, update_player,
+# bulk upserts), so a player's goals/assists/matches_played always equal the
+# sum of their rows. SQLite has no range partitioning; instead season is a
+# stored column computed from match_date (seasons start in
+# SEASON_START_MONTH and are named like '2025-26'), events are indexed by
+# (player_id, match_date) and (team_id, match_date), and the per-season
+# rollups below are kept up to date by triggers, like team_stats.
+SEASON_START_MONTH = 7
+
+_SEASON_START_YEAR = (f"(CAST(strftime('%Y', match_date) AS INTEGER) - "
+                      f"(CAST(strftime('%m', match_date) AS INTEGER) < {SEASON_START_MONTH}))")
+
+CREATE_MATCH_STATS = f'''
+    CREATE TABLE IF NOT EXISTS match_stats (
+        event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER NOT NULL,
+        team_id INTEGER,
+        match_date TEXT NOT NULL CHECK (date(match_date) IS match_date),
+        season TEXT GENERATED ALWAYS AS
+            (printf('%d-%02d', {_SEASON_START_YEAR}, ({_SEASON_START_YEAR} + 1) % 100)) STORED,
+        goals INTEGER NOT NULL DEFAULT 0,
+        assists INTEGER NOT NULL DEFAULT 0,
+        appearances INTEGER NOT NULL DEFAULT 1,
+        kind TEXT NOT NULL DEFAULT 'match' CHECK (kind IN ('match', 'adjustment')),
+        recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+CREATE_SEASON_STATS = {
+    'player_season_stats': '''
+        CREATE TABLE IF NOT EXISTS player_season_stats (
+            player_id INTEGER NOT NULL,
+            season TEXT NOT NULL,
+            matches_played INTEGER NOT NULL DEFAULT 0,
+            goals INTEGER NOT NULL DEFAULT 0,
+            assists INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (player_id, season)
+        ) WITHOUT ROWID
+    ''',
+    'team_season_stats': '''
+        CREATE TABLE IF NOT EXISTS team_season_stats (
+            team_id INTEGER NOT NULL,
+            season TEXT NOT NULL,
+            matches_played INTEGER NOT NULL DEFAULT 0,
+            goals INTEGER NOT NULL DEFAULT 0,
+            assists INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (team_id, season)
+        ) WITHOUT ROWID
+    ''',
+}
+
+# The aggregates the rollups must always equal, in primary key order
+COMPUTE_SEASON_STATS = {
+    'player_season_stats': '''
+        SELECT player_id, season, SUM(appearances), SUM(goals), SUM(assists)
+        FROM match_stats
+        GROUP BY player_id, season
+        ORDER BY player_id, season
+    ''',
+    'team_season_stats': '''
+        SELECT team_id, season, SUM(appearances), SUM(goals), SUM(assists)
+        FROM match_stats
+        WHERE team_id IS NOT NULL
+        GROUP BY team_id, season
+        ORDER BY team_id, season
+    ''',
+}
+
+# Players whose totals differ from the sum of their season rollups
+SELECT_PLAYER_TOTAL_MISMATCHES = '''
+    SELECT p.player_id,
+           COALESCE(p.matches_played, 0), COALESCE(p.goals, 0), COALESCE(p.assists, 0),
+           COALESCE(s.matches_played, 0), COALESCE(s.goals, 0), COALESCE(s.assists, 0)
+    FROM players p
+    LEFT JOIN (
+        SELECT player_id, SUM(matches_played) AS matches_played, SUM(goals) AS goals,
+               SUM(assists) AS assists
+        FROM player_season_stats GROUP BY player_id
+    ) s ON s.player_id = p.player_id
+    WHERE (COALESCE(p.matches_played, 0), COALESCE(p.goals, 0), COALESCE(p.assists, 0))
+          <> (COALESCE(s.matches_played, 0), COALESCE(s.goals, 0), COALESCE(s.assists, 0))
+    ORDER BY p.player_id
+'''
+
+# Players' totals set to the sum of their season rollups
+SET_PLAYER_TOTALS = '''
+    UPDATE players
+    SET matches_played = COALESCE(s.matches_played, 0), goals = COALESCE(s.goals, 0),
+        assists = COALESCE(s.assists, 0)
+    FROM (SELECT p.player_id, SUM(r.matches_played) AS matches_played, SUM(r.goals) AS goals,
+                 SUM(r.assists) AS assists
+          FROM players p LEFT JOIN player_season_stats r ON r.player_id = p.player_id
+          GROUP BY p.player_id) AS s
+    WHERE players.player_id = s.player_id
+      AND (COALESCE(players.matches_played, 0), COALESCE(players.goals, 0),
+           COALESCE(players.assists, 0))
+          <> (COALESCE(s.matches_played, 0), COALESCE(s.goals, 0), COALESCE(s.assists, 0))
+'''
+
+# A player's totals that are not yet accounted for by match_stats, recorded
+# as an adjustment dated today
+_RECORD_ADJUSTMENT = '''
+    INSERT INTO match_stats (player_id, team_id, match_date, goals, assists, appearances, kind)
+    SELECT new.player_id, new.team_id, date('now'),
+           COALESCE(new.goals, 0) - COALESCE(SUM(goals), 0),
+           COALESCE(new.assists, 0) - COALESCE(SUM(assists), 0),
+           COALESCE(new.matches_played, 0) - COALESCE(SUM(matches_played), 0),
+           'adjustment'
+    FROM player_season_stats WHERE player_id = new.player_id;
+'''
+
+_TOTALS_CHANGED = '''
+    (COALESCE(new.matches_played, 0), COALESCE(new.goals, 0), COALESCE(new.assists, 0)) <> (
+        SELECT COALESCE(SUM(matches_played), 0), COALESCE(SUM(goals), 0),
+               COALESCE(SUM(assists), 0)
+        FROM player_season_stats WHERE player_id = new.player_id)
+'''
+
+MATCH_STATS_TRIGGERS = {
+    'match_stats_bi': '''
+        BEFORE INSERT ON match_stats
+        WHEN NOT EXISTS (SELECT 1 FROM players WHERE player_id = new.player_id) BEGIN
+            SELECT RAISE(ABORT, 'Unknown player_id');
+        END
+    ''',
+    'match_stats_bu': '''
+        BEFORE UPDATE ON match_stats BEGIN
+            SELECT RAISE(ABORT, 'match_stats is append-only');
+        END
+    ''',
+    # Rows only go when their player does (match_stats_player_ad)
+    'match_stats_bd': '''
+        BEFORE DELETE ON match_stats
+        WHEN EXISTS (SELECT 1 FROM players WHERE player_id = old.player_id) BEGIN
+            SELECT RAISE(ABORT, 'match_stats is append-only');
+        END
+    ''',
+    # Rollups first, so the players trigger below finds them matching the
+    # new totals and records no adjustment
+    'match_stats_ai': '''
+        AFTER INSERT ON match_stats BEGIN
+            INSERT INTO player_season_stats (player_id, season, matches_played, goals, assists)
+            VALUES (new.player_id, new.season, new.appearances, new.goals, new.assists)
+            ON CONFLICT (player_id, season) DO UPDATE SET
+                matches_played = matches_played + excluded.matches_played,
+                goals = goals + excluded.goals, assists = assists + excluded.assists;
+            INSERT INTO team_season_stats (team_id, season, matches_played, goals, assists)
+            SELECT new.team_id, new.season, new.appearances, new.goals, new.assists
+            WHERE new.team_id IS NOT NULL
+            ON CONFLICT (team_id, season) DO UPDATE SET
+                matches_played = matches_played + excluded.matches_played,
+                goals = goals + excluded.goals, assists = assists + excluded.assists;
+            UPDATE players
+            SET goals = COALESCE(goals, 0) + new.goals,
+                assists = COALESCE(assists, 0) + new.assists,
+                matches_played = COALESCE(matches_played, 0) + new.appearances
+            WHERE player_id = new.player_id AND new.kind = 'match';
+        END
+    ''',
+    'match_stats_ad': '''
+        AFTER DELETE ON match_stats BEGIN
+            UPDATE player_season_stats
+            SET matches_played = matches_played - old.appearances,
+                goals = goals - old.goals, assists = assists - old.assists
+            WHERE player_id = old.player_id AND season = old.season;
+            DELETE FROM player_season_stats
+            WHERE player_id = old.player_id AND season = old.season
+              AND NOT EXISTS (SELECT 1 FROM match_stats
+                              WHERE player_id = old.player_id AND season = old.season);
+            UPDATE team_season_stats
+            SET matches_played = matches_played - old.appearances,
+                goals = goals - old.goals, assists = assists - old.assists
+            WHERE team_id = old.team_id AND season = old.season;
+            DELETE FROM team_season_stats
+            WHERE team_id = old.team_id AND season = old.season
+              AND NOT EXISTS (SELECT 1 FROM match_stats
+                              WHERE team_id = old.team_id AND season = old.season);
+        END
+    ''',
+    'match_stats_player_ai': f'''
+        AFTER INSERT ON players WHEN {_TOTALS_CHANGED} BEGIN
+            {_RECORD_ADJUSTMENT}
+        END
+    ''',
+    'match_stats_player_au': f'''
+        AFTER UPDATE OF goals, assists, matches_played ON players
+        WHEN {_TOTALS_CHANGED} BEGIN
+            {_RECORD_ADJUSTMENT}
+        END
+    ''',
+    # A deleted player's history goes with them, so a player_id reused
+    # later (e.g. by a bulk upsert) starts from nothing
+    'match_stats_player_ad': '''
+        AFTER DELETE ON players BEGIN
+            DELETE FROM match_stats WHERE player_id = old.player_id;
+        END
+    ''',
+}
+
+# Ingestion through Database.add_match_stats(); the team defaults to the
+# player's current one
+INSERT_MATCH_STATS = '''
+    INSERT INTO match_stats (player_id, team_id, match_date, goals, assists, appearances)
+    VALUES (?, COALESCE(?, (SELECT team_id FROM players WHERE player_id = ?)), ?, ?, ?, ?)
+'''
+
+SELECT_PLAYER_SEASONS = '''
+    SELECT season, matches_played, goals, assists
+    FROM player_season_stats WHERE player_id = ? ORDER BY season
+'''
+
+SELECT_TEAM_SEASONS = '''
+    SELECT season, matches_played, goals, assists
+    FROM team_season_stats WHERE team_id = ? ORDER BY season
+'''
+
+SELECT_SEASON_LEADERS = '''
+    SELECT s.player_id, p.first_name || ' ' || p.last_name AS player_name, t.team_name,
+           s.matches_played, s.goals, s.assists
+    FROM player_season_stats s
+    JOIN players p ON p.player_id = s.player_id
+    LEFT JOIN teams t ON t.team_id = p.team_id
+    WHERE s.season = ?
+    ORDER BY s.goals DESC
+    LIMIT ?
+'''
+
+# Form curves: the last N match days in a date range, each with its own
+# numbers and the rolling totals over itself and the window - 1 before it
+FORM_LAST = 10
+FORM_WINDOW = 5
+FORM_MAX_LAST = 500
+
+
+def _form_query(key):
+    return f'''
+    WITH days AS (
+        SELECT match_date, SUM(appearances) AS matches_played, SUM(goals) AS goals,
+               SUM(assists) AS assists
+        FROM match_stats
+        WHERE {key} = ? AND match_date BETWEEN ? AND ? AND kind = 'match'
+        GROUP BY match_date
+        ORDER BY match_date DESC
+        LIMIT ?
+    )
+    SELECT match_date, matches_played, goals, assists,
+           SUM(matches_played) OVER recent AS form_matches,
+           SUM(goals) OVER recent AS form_goals,
+           SUM(assists) OVER recent AS form_assists,
+           COALESCE(ROUND(CAST(SUM(goals) OVER recent AS REAL)
+                          / NULLIF(SUM(matches_played) OVER recent, 0), 2), 0) AS form_goals_per_match
+    FROM days
+    WINDOW recent AS (ORDER BY match_date ROWS BETWEEN ? PRECEDING AND CURRENT ROW)
+    ORDER BY match_date
+'''
+
+
+PLAYER_FORM = _form_query('player_id')
+TEAM_FORM = _form_query('team_id')
+
+SELECT_TOP_PLAYERS = '''
+    SELECT p.*, t.team_name 
+    FROM players p
+    LEFT JOIN teams t ON p.team_id = t.team_id
+    ORDER BY p.ranking DESC
+    LIMIT ?
+'''
+
+# Per-player scores the in-memory leaderboards (leaderboard.py) sort by;
+# goals_per_match matches the player_stats view
+LEADERBOARD_SCORES = '''
+    SELECT player_id, ranking,
+           CASE
+               WHEN matches_played > 0 THEN ROUND(CAST(goals AS REAL) / matches_played, 2)
+               ELSE 0
+           END AS goals_per_match
+    FROM players'''
+LEADERBOARD_SCORES_BY_IDS = f'{LEADERBOARD_SCORES} WHERE player_id IN'
+
+# Numeric columns for analytics.py, NULLs included
+ANALYTICS_COLUMNS = '''
+    SELECT player_id, team_id, position, age, height, weight, ranking,
+           goals, assists, matches_played
+    FROM players'''
+ANALYTICS_COLUMNS_BY_IDS = f'{ANALYTICS_COLUMNS} WHERE player_id IN'
+
+# Every headline number on the dashboard in one pass over the (narrow)
+# team/ranking index rather than the players table itself
+SELECT_DASHBOARD_TOTALS = '''
+    SELECT 
+        (SELECT COUNT(*) FROM teams) AS total_teams,
+        COUNT(*) AS total_players,
+        COALESCE(SUM(goals), 0) AS total_goals,
+        COALESCE(SUM(assists), 0) AS total_assists
+    FROM players
+'''
+
+SEARCH_PLAYERS_LIKE = '''
+    SELECT p.*, t.team_name 
+    FROM players p
+    LEFT JOIN teams t ON p.team_id = t.team_id
+    WHERE p.first_name LIKE ? OR p.last_name LIKE ?
+    ORDER BY p.ranking DESC
+'''
+
+
+
+def _keyset_queries(select, ranking, player_id, condition=None):
+    """Build the SQL for keyset pagination ordered by (ranking DESC, player_id).
+
+    'first' starts from the top, 'after' seeks past a cursor through the
+    ranking index, and 'nulls' pages through players without a ranking, which
+    sort after everyone else.
+    """
+    where = f'{condition} AND ' if condition else ''
+    order = f'ORDER BY {ranking} DESC, {player_id} LIMIT ?'
+    return {
+        'first': f'{select} WHERE {condition} {order}' if condition else f'{select} {order}',
+        'after': f'{select} WHERE {where}{ranking} <= ? AND ({ranking} < ? OR {player_id} > ?) {order}',
+        'nulls': f'{select} WHERE {where}{ranking} IS NULL AND {player_id} > ? ORDER BY {player_id} LIMIT ?',
+    }
+
+
+PLAYERS_PAGE = _keyset_queries(
+    'SELECT p.*, t.team_name FROM players p LEFT JOIN teams t ON p.team_id = t.team_id',
+    'p.ranking', 'p.player_id')
+
+PLAYER_STATS_PAGE = _keyset_queries('SELECT * FROM player_stats', 'ranking', 'player_id')
+
+SEARCH_PLAYERS_LIKE_PAGE = _keyset_queries(
+    'SELECT p.*, t.team_name FROM players p LEFT JOIN teams t ON p.team_id = t.team_id',
+    'p.ranking', 'p.player_id', '(p.first_name LIKE ? OR p.last_name LIKE ?)')
+
+
+def encode_cursor(ranking, player_id):
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    raw = json.dumps([ranking, player_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor(); raises ValueError if invalid"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        ranking, player_id = json.loads(raw)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(player_id, int) or not (ranking is None or isinstance(ranking, (int, float))):
+        raise ValueError('Invalid cursor')
+    return ranking, player_id
+
+
+# Full-text index over player names, kept in sync with players by triggers.
+# The trigram tokenizer indexes every three-character substring, so a search
+# finds text anywhere in a name ("arr" in "Harry"), as the LIKE query does,
+# without scanning the table. Terms shorter than that go to the LIKE query.
+CREATE_PLAYERS_FTS = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS players_fts USING fts5(
+        first_name, last_name,
+        content='players', content_rowid='player_id',
+        tokenize='trigram'
+    )
+'''
+FTS_MIN_LENGTH = 3
+
+PLAYERS_FTS_TRIGGERS = {
+    'players_fts_ai': '''
+        AFTER INSERT ON players BEGIN
+            INSERT INTO players_fts (rowid, first_name, last_name)
+            VALUES (new.player_id, new.first_name, new.last_name);
+        END
+    ''',
+    'players_fts_ad': '''
+        AFTER DELETE ON players BEGIN
+            INSERT INTO players_fts (players_fts, rowid, first_name, last_name)
+            VALUES ('delete', old.player_id, old.first_name, old.last_name);
+        END
+    ''',
+    'players_fts_au': '''
+        AFTER UPDATE OF first_name, last_name ON players BEGIN
+            INSERT INTO players_fts (players_fts, rowid, first_name, last_name)
+            VALUES ('delete', old.player_id, old.first_name, old.last_name);
+            INSERT INTO players_fts (rowid, first_name, last_name)
+            VALUES (new.player_id, new.first_name, new.last_name);
+        END
+    ''',
+}
+
+# Best matches first (bm25), then by ranking
+SEARCH_PLAYERS_FTS = '''
+    SELECT p.*, t.team_name 
+    FROM players_fts
+    CROSS JOIN players p ON p.player_id = players_fts.rowid
+    LEFT JOIN teams t ON p.team_id = t.team_id
+    WHERE players_fts MATCH ?
+    ORDER BY players_fts.rank, p.ranking DESC
+'''
+
+# CROSS JOIN pins players_fts as the outer loop. Once ANALYZE has run, the
+# planner would otherwise rather walk the whole ranking index to skip the sort.
+SEARCH_PLAYERS_FTS_PAGE = _keyset_queries(
+    'SELECT p.*, t.team_name FROM players_fts '
+    'CROSS JOIN players p ON p.player_id = players_fts.rowid '
+    'LEFT JOIN teams t ON p.team_id = t.team_id',
+    'p.ranking', 'p.player_id', 'players_fts MATCH ?')
+
+
+# Composite player queries (Database.query_players). Fields, filters and sort
+# keys are all column names from these tuples, so the compiled SQL depends
+# only on the shape of a query, never on its values, and each shape is
+# compiled once and prepared once per pooled connection.
+PLAYER_QUERY_FIELDS = (
+    'player_id', 'first_name', 'last_name', 'team_id', 'team_name', 'position',
+    'jersey_number', 'age', 'height', 'weight', 'ranking', 'goals', 'assists',
+    'matches_played', 'created_at',
+)
+PLAYER_QUERY_RANGES = ('age', 'ranking', 'goals', 'assists', 'matches_played')
+PLAYER_QUERY_MAX_LIMIT = 1000
+# Query shapes kept compiled, and prepared statements kept per connection
+PLAYER_QUERY_CACHE_SIZE = 256
+
+# Every compiled query starts with one of these, which also names it in /metrics
+QUERY_PLAYERS = 'SELECT /* query_players */'
+PLAYERS_PAGE_FIELDS = 'SELECT /* players_page:fields */'
+
+
+def _player_column(name):
+    return 't.team_name' if name == 'team_name' else f'p.{name}'
+
+
+def _player_from(fields):
+    """Select list and FROM clause for fields; teams is only joined for team_name"""
+    unknown = [name for name in fields if name not in PLAYER_QUERY_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown field: {unknown[0]}')
+    sql = f"{', '.join(_player_column(name) for name in fields)} FROM players p"
+    if 'team_name' in fields:
+        sql += ' LEFT JOIN teams t ON p.team_id = t.team_id'
+    return sql
+
+
+@functools.lru_cache(maxsize=PLAYER_QUERY_CACHE_SIZE)
+def compile_player_page(fields):
+    """Keyset page queries (see _keyset_queries) returning only fields"""
+    return _keyset_queries(f'{PLAYERS_PAGE_FIELDS} {_player_from(fields)}',
+                           'p.ranking', 'p.player_id')
+
+
+@functools.lru_cache(maxsize=PLAYER_QUERY_CACHE_SIZE)
+def compile_player_query(fields, positions, teams, ranges, sort, limited=True):
+    """SQL for one query shape; see Database.query_players.
+
+    positions and teams are None, 'eq' for one value or 'in' for a JSON
+    array of them. ranges is a tuple of (column, 'min' | 'max' | 'between')
+    and sort of (column, descending). Parameters are taken in that order,
+    followed by the limit if limited. Conditions stay plain comparisons on
+    bare columns so the planner can seek the team, position and ranking
+    indexes, and teams are only joined in when team_name is asked for.
+    """
+    conditions = []
+    for name, mode in (('position', positions), ('team_id', teams)):
+        if mode == 'eq':
+            conditions.append(f'p.{name} = ?')
+        elif mode == 'in':
+            conditions.append(f'p.{name} IN (SELECT value FROM json_each(?))')
+    for name, bound in ranges:
+        conditions.append({
+            'min': f'p.{name} >= ?',
+            'max': f'p.{name} <= ?',
+            'between': f'p.{name} BETWEEN ? AND ?',
+        }[bound])
+    sql = f'{QUERY_PLAYERS} {_player_from(fields)}'
+    if 'team_name' not in fields and any(name == 'team_name' for name, descending in sort):
+        sql += ' LEFT JOIN teams t ON p.team_id = t.team_id'
+    if conditions:
+        sql += ' WHERE ' + ' AND '.join(conditions)
+    order = ', '.join(f"{_player_column(name)}{' DESC' if descending else ''}"
+                      for name, descending in sort)
+    sql += f' ORDER BY {order}'
+    return f'{sql} LIMIT ?' if limited else sql
+
+
+# Bulk upserts. Players are matched on player_id (rows without one are
+# inserted); teams on team_id when given, otherwise on their unique name.
+UPSERT_PLAYER = '''
+    INSERT INTO players
+    (player_id, first_name, last_name, team_id, position, jersey_number, age, height, weight,
+     ranking, goals, assists, matches_played)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (player_id) DO UPDATE SET
+        first_name = excluded.first_name, last_name = excluded.last_name,
+        team_id = excluded.team_id, position = excluded.position,
+        jersey_number = excluded.jersey_number, age = excluded.age, height = excluded.height,
+        weight = excluded.weight, ranking = excluded.ranking, goals = excluded.goals,
+        assists = excluded.assists, matches_played = excluded.matches_played
+'''
+
+UPSERT_TEAM_BY_ID = '''
+    INSERT INTO teams (team_id, team_name, coach_name, founded_year, city, stadium)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (team_id) DO UPDATE SET
+        team_name = excluded.team_name, coach_name = excluded.coach_name,
+        founded_year = excluded.founded_year, city = excluded.city, stadium = excluded.stadium
+'''
+
+UPSERT_TEAM_BY_NAME = '''
+    INSERT INTO teams (team_name, coach_name, founded_year, city, stadium)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (team_name) DO UPDATE SET
+        coach_name = excluded.coach_name, founded_year = excluded.founded_year,
+        city = excluded.city, stadium = excluded.stadium
+'''
+
+BULK_CHUNK_SIZE = 1000
+BULK_MAX_ERRORS = 1000
+
+# Coalesced match stat increments, see events.py. They are recorded as
+# match_stats rows dated the day they are written, for the player's team.
+APPLY_STAT_DELTAS = '''
+    INSERT INTO match_stats (player_id, team_id, match_date, goals, assists, appearances)
+    SELECT player_id, team_id, date('now'), ?, ?, ? FROM players WHERE player_id = ?
+'''
+
+# Pools for Database.add_synthetic_data()
+SYNTHETIC_FIRST_NAMES = (
+    'Adam', 'Ben', 'Carlos', 'Daniel', 'Emil', 'Felix', 'Gabriel', 'Hugo', 'Ivan', 'Jonas',
+    'Karim', 'Luca', 'Mateo', 'Noah', 'Oscar', 'Pablo', 'Rafael', 'Samuel', 'Tomas', 'Yusuf',
+    'Zoltan', 'Andre', 'Diego', 'Erik', 'Joao', 'Kai', 'Leon', 'Marco', 'Nico', 'Theo',
+)
+SYNTHETIC_LAST_NAMES = (
+    'Silva', 'Smith', 'Garcia', 'Muller', 'Rossi', 'Dubois', 'Jensen', 'Novak', 'Kowalski',
+    'Petrov', 'Santos', 'Johnson', 'Fernandez', 'Schmidt', 'Bianchi', 'Martin', 'Larsen',
+    'Horvat', 'Nowak', 'Ivanov', 'Costa', 'Brown', 'Lopez', 'Weber', 'Romano', 'Bernard',
+    'Hansen', 'Kovac', 'Wojcik', 'Popov',
+)
+SYNTHETIC_CITIES = (
+    'Northport', 'Eastfield', 'Westbrook', 'Southgate', 'Riverton', 'Lakeside', 'Hillcrest',
+    'Fairview', 'Oakdale', 'Bayview', 'Stonebridge', 'Ashford',
+)
+SYNTHETIC_NICKNAMES = ('United', 'City', 'Rovers', 'Athletic', 'Wanderers', 'Rangers', 'FC')
+# (position, share of players, goals per match, assists per match) on average
+SYNTHETIC_POSITIONS = (
+    ('Goalkeeper', 2, 0.0, 0.01),
+    ('Defender', 7, 0.05, 0.08),
+    ('Midfielder', 7, 0.2, 0.3),
+    ('Forward', 4, 0.5, 0.2),
+)
+
+# Datasets that can be streamed out with Database.iter_export()
+EXPORT_QUERIES = {
+    'players': SELECT_ALL_PLAYERS,
+    'teams': SELECT_ALL_TEAMS,
+    'player_stats': SELECT_PLAYER_STATS,
+    'team_stats': SELECT_TEAM_STATS,
+}
+EXPORT_BATCH_SIZE = 1000
+
+
+def fts_match_expression(search_term):
+    """Turn free text into a players_fts query.
+
+    Matches names containing the whole text, like the LIKE query, or every
+    word of it in either name ("har kan" finds Harry Kane). Words shorter than
+    FTS_MIN_LENGTH are left out of the second part. Returns None if the text
+    itself is too short for the index.
+    """
+    search_term = search_term.strip()
+    if len(search_term) < FTS_MIN_LENGTH:
+        return None
+    phrase = search_term.replace('"', '""')
+    words = re.findall(r'\w+', search_term)
+    long_words = [word for word in words if len(word) >= FTS_MIN_LENGTH]
+    if len(words) < 2 or not long_words:
+        return f'"{phrase}"'
+    every_word = ' AND '.join(f'"{word}"' for word in long_words)
+    return f'"{phrase}" OR ({every_word})'
+
+
+# (name, sql, sample parameters, tables/aliases that may be scanned).
+# Queries that return a whole table list it here; they must still walk an
+# index in order rather than sort. Any other scan, an automatic index or a
+# sort through a temporary b-tree fails the check. Full-text queries may
+# sort their (already narrowed down) matches: 'TEMP B-TREE' allows that.
+HOT_QUERIES = [
+    ('get_all_teams', SELECT_ALL_TEAMS, (), ('teams',)),
+    ('get_team_by_id', SELECT_TEAM_BY_ID, (1,), ()),
+    ('get_all_players', SELECT_ALL_PLAYERS, (), ('p',)),
+    ('get_player_by_id', SELECT_PLAYER_BY_ID, (1,), ()),
+    ('get_players_by_team', SELECT_PLAYERS_BY_TEAM, (1,), ()),
+    ('get_players_by_ids', f'{SELECT_PLAYERS_BY_IDS} (?, ?)', (1, 2), ()),
+    ('get_teams_by_ids', f'{SELECT_TEAMS_BY_IDS} (?, ?)', (1, 2), ()),
+    ('get_leaderboard_scores', LEADERBOARD_SCORES, (), ('players',)),
+    ('get_leaderboard_scores:ids', f'{LEADERBOARD_SCORES_BY_IDS} (?, ?)', (1, 2), ()),
+    ('get_analytics_columns', ANALYTICS_COLUMNS, (), ('players',)),
+    ('get_analytics_columns:ids', f'{ANALYTICS_COLUMNS_BY_IDS} (?, ?)', (1, 2), ()),
+    ('get_changes', SELECT_CHANGES, (0, 500), ()),
+    ('get_player_stats', SELECT_PLAYER_STATS, (), ('p',)),
+    ('get_team_stats', SELECT_TEAM_STATS, (), ('team_stats',)),
+    ('get_top_players_by_ranking', SELECT_TOP_PLAYERS, (10,), ('p',)),
+    ('get_dashboard_summary', SELECT_DASHBOARD_TOTALS, (), ('players', 'teams')),
+    ('search_players', SEARCH_PLAYERS_LIKE, ('%a%', '%a%'), ('p',)),
+    ('get_players_page', PLAYERS_PAGE['first'], (50,), ('p',)),
+    ('get_players_page:after', PLAYERS_PAGE['after'], (90, 90, 1, 50), ()),
+    ('get_players_page:nulls', PLAYERS_PAGE['nulls'], (1, 50), ()),
+    ('get_player_stats_page', PLAYER_STATS_PAGE['first'], (50,), ('p',)),
+    ('get_player_stats_page:after', PLAYER_STATS_PAGE['after'], (90, 90, 1, 50), ()),
+    ('get_player_stats_page:nulls', PLAYER_STATS_PAGE['nulls'], (1, 50), ()),
+    ('search_players_page', SEARCH_PLAYERS_LIKE_PAGE['first'], ('%a%', '%a%', 50), ('p',)),
+    ('search_players_page:after', SEARCH_PLAYERS_LIKE_PAGE['after'],
+     ('%a%', '%a%', 90, 90, 1, 50), ()),
+    ('search_players_page:nulls', SEARCH_PLAYERS_LIKE_PAGE['nulls'], ('%a%', '%a%', 1, 50), ()),
+    ('search_players:fts', SEARCH_PLAYERS_FTS, ('"har"',), ('players_fts', 'TEMP B-TREE')),
+    ('search_players_page:fts', SEARCH_PLAYERS_FTS_PAGE['first'], ('"har"', 50),
+     ('players_fts', 'TEMP B-TREE')),
+    ('search_players_page:fts:after', SEARCH_PLAYERS_FTS_PAGE['after'], ('"har"', 90, 90, 1, 50),
+     ('players_fts', 'TEMP B-TREE')),
+    ('search_players_page:fts:nulls', SEARCH_PLAYERS_FTS_PAGE['nulls'], ('"har"', 1, 50),
+     ('players_fts', 'TEMP B-TREE')),
+    ('get_player_seasons', SELECT_PLAYER_SEASONS, (1,), ()),
+    ('get_team_seasons', SELECT_TEAM_SEASONS, (1,), ()),
+    ('get_season_leaders', SELECT_SEASON_LEADERS, ('2025-26', 10), ()),
+    # The window runs over at most FORM_MAX_LAST days already narrowed down
+    # by the index, so scanning and sorting them is fine
+    ('get_player_form', PLAYER_FORM, (1, '0000-01-01', '9999-12-31', 10, 4),
+     ('days', 'TEMP B-TREE')),
+    ('get_team_form', TEAM_FORM, (1, '0000-01-01', '9999-12-31', 10, 4),
+     ('days', 'TEMP B-TREE')),
+]
+
+
+def _fetch_by_ids(conn, sql, ids):
+    """All rows of sql, which ends in "IN", for ids, in batches of MAX_SQL_PARAMETERS"""
+    ids = list(ids)
+    rows = []
+    for start in range(0, len(ids), MAX_SQL_PARAMETERS):
+        batch = ids[start:start + MAX_SQL_PARAMETERS]
+        placeholders = ', '.join('?' * len(batch))
+        rows.extend(conn.execute(f'{sql} ({placeholders})', batch).fetchall())
+    return rows
+
+
+class QueryPlanError(Exception):
+    """Raised when a hot query would fall back to a full scan or a sort"""
+
+
+class PooledConnection:
+    """Wrapper around a pooled sqlite3 connection.
+
+    Behaves like a regular sqlite3 connection, except that close() hands the
+    connection back to the pool instead of tearing it down.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._changes = []
+        self._versions = {}
+
+    def __getattr__(self, name):
+        if self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed connection.')
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        self.close()
+        return False
+
+    def record_change(self, table, op, ids=None):
+        """Bump the table's data version, log the change and announce it after commit"""
+        self._conn.execute('UPDATE data_versions SET version = version + 1 WHERE table_name = ?',
+                           (table,))
+        version = self._conn.execute('SELECT version FROM data_versions WHERE table_name = ?',
+                                     (table,)).fetchone()
+        self._changes.append((table, op, ids))
+        if version is not None:
+            first = self._versions.get(table, (version[0], None))[0]
+            self._versions[table] = (first, version[0])
+        self._log_change(table, op, ids)
+
+    def _log_change(self, table, op, ids):
+        if ids is None:
+            self._conn.execute(INSERT_CHANGE, (table, op, None))
+            logged = 1
+        else:
+            self._conn.executemany(INSERT_CHANGE, [(table, op, row_id) for row_id in ids])
+            logged = len(ids)
+        if not logged:
+            return
+        seq = self._conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+        if seq // CHANGE_LOG_PRUNE_EVERY > (seq - logged) // CHANGE_LOG_PRUNE_EVERY:
+            self._conn.execute('DELETE FROM change_log WHERE seq <= ?',
+                               (seq - CHANGE_LOG_RETENTION,))
+
+    def commit(self):
+        if not self._changes or self._pool.on_commit is None:
+            self._conn.commit()
+            return
+        # Counted from before the commit until the listeners have run, so
+        # readers can tell a version bump that is still being announced from
+        # one made by another process
+        self._pool.writes_in_flight(1)
+        try:
+            self._conn.commit()
+            changes, self._changes = self._changes, []
+            versions, self._versions = self._versions, {}
+            self._pool.on_commit(changes, versions)
+        finally:
+            self._pool.writes_in_flight(-1)
+
+    def rollback(self):
+        self._changes = []
+        self._versions = {}
+        self._conn.rollback()
+
+    def close(self):
+        """Return the connection to the pool"""
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            self._changes = []
+            self._versions = {}
+            self._pool.release(conn)
+
+    def __del__(self):
+        # Safety net for code paths that raise before calling close()
+        self.close()
+
+
+class SnapshotConnection:
+    """The connection get_connection() hands out inside Database.snapshot().
+
+    close() keeps it checked out, so every read in the block runs on the
+    same connection and inside the same transaction.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def _read_transaction(conn):
+    """BEGIN ... ROLLBACK around reads that must see a single snapshot.
+
+    Inside Database.snapshot() the connection is already in one, which is
+    left open.
+    """
+    if conn.in_transaction:
+        yield
+        return
+    conn.execute('BEGIN')
+    try:
+        yield
+    finally:
+        conn.rollback()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of long-lived SQLite connections.
+
+    Connections are opened lazily up to max_size, configured once with the
+    given PRAGMAs and then reused. When every connection is checked out,
+    callers wait up to timeout seconds for one to be returned.
+    """
+
+    def __init__(self, db_name, max_size=5, timeout=30.0, pragmas=None, factory=None):
+        self.db_name = db_name
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pragmas = dict(pragmas or {})
+        # sqlite3.Connection subclass to open connections with, e.g.
+        # metrics.Metrics.connection_class
+        self.factory = factory or sqlite3.Connection
+        # Called with ([(table, op, ids), ...], {table: (first, last)}) after
+        # a transaction that recorded changes commits
+        self.on_commit = None
+        # Set by close(): connections are discarded instead of kept when returned
+        self.closed = False
+        self._idle = deque()
+        self._lock = threading.Condition(threading.Lock())
+        self._pid = os.getpid()
+        self._open = 0
+        self._in_flight = 0
+        self._stats = {
+            'checkouts': 0,
+            'hits': 0,
+            'misses': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'opened': 0,
+            'closed': 0,
+        }
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_name, timeout=self.timeout, check_same_thread=False,
+                               factory=self.factory, cached_statements=PLAYER_QUERY_CACHE_SIZE)
+        # Rows index like tuples and also carry their column names, which the
+        # serialization layer uses instead of hard-coded positions
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def writes_in_flight(self, delta=0):
+        """Adjust and return the number of commits still being announced"""
+        with self._lock:
+            self._in_flight += delta
+            return self._in_flight
+
+    def _reset_after_fork(self):
+        # Handles inherited from a parent process must never be used (or
+        # closed) by the child, so simply forget about them.
+        self._idle.clear()
+        self._open = 0
+        self._in_flight = 0
+        self._pid = os.getpid()
+
+    def acquire(self):
+        """Check a connection out of the pool"""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset_after_fork()
+            self._stats['checkouts'] += 1
+            if not self._idle and self._open >= self.max_size:
+                self._stats['waits'] += 1
+                started = time.monotonic()
+                deadline = started + self.timeout
+                while not self._idle and self._open >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise sqlite3.OperationalError('Timed out waiting for a pooled connection')
+                    self._lock.wait(remaining)
+                self._stats['wait_time'] += time.monotonic() - started
+            if self._idle:
+                self._stats['hits'] += 1
+                return PooledConnection(self, self._idle.pop())
+            self._stats['misses'] += 1
+            self._stats['opened'] += 1
+            self._open += 1
+        try:
+            return PooledConnection(self, self._connect())
+        except Exception:
+            with self._lock:
+                self._open -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool"""
+        if self._pid != os.getpid():
+            return
+        if self.closed:
+            self._discard(conn)
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        with self._lock:
+            self._idle.append(conn)
+            self._lock.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._stats['closed'] += 1
+            self._lock.notify()
+
+    def close_all(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn in idle:
+            self._discard(conn)
+
+    def close(self):
+        """Close every idle connection, and the others as they are returned"""
+        self.closed = True
+        self.close_all()
+
+    def stats(self):
+        """Get pool usage statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['max_size'] = self.max_size
+            stats['open'] = self._open
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._open - len(self._idle)
+        checkouts = stats['checkouts']
+        stats['hit_rate'] = round(stats['hits'] / checkouts, 4) if checkouts else 0.0
+        return stats
+
+
+# A data version RowChangeTracker has no record of
+_MISSING = object()
+
+
+class RowChangeTracker:
+    """Which rows of one table each local commit touched, by data version.
+
+    For in-memory copies of a table (leaderboard.py, analytics.py) that
+    re-read only the rows written since they were loaded. Its write listener
+    only records ids, since the writer still holds its connection while
+    listeners run; catch_up() does the re-reading on the caller's own
+    connection. Nothing is recorded until start() is called.
+    """
+
+    # Re-reading more than this fraction of a copy's rows costs about as much
+    # as reloading all of them
+    RELOAD_FRACTION = 0.1
+    # How long catch_up() waits for a local commit that is still announcing
+    # its changes before it gives up
+    IN_FLIGHT_WAIT = 0.5
+
+    def __init__(self, db, table):
+        self.db = db
+        self.table = table
+        self._lock = threading.Lock()
+        self._changes = None  # version -> ids it touched (None if unknown), until start()
+        db.add_write_listener(self._on_write, with_versions=True)
+
+    def _on_write(self, changes, versions):
+        if self.table not in versions:
+            return
+        row_ids = set()
+        for table, op, ids in changes:
+            if table == self.table:
+                if ids is None:
+                    row_ids = None
+                    break
+                row_ids.update(ids)
+        first, last = versions[self.table]
+        with self._lock:
+            if self._changes is None:
+                return
+            for version in range(first, last + 1):
+                self._changes[version] = row_ids
+
+    def start(self):
+        """Start recording; call before the first full load"""
+        with self._lock:
+            if self._changes is None:
+                self._changes = {}
+
+    def forget(self, version):
+        """Drop what was recorded up to version, which a copy now reflects"""
+        with self._lock:
+            self._changes = {changed: ids for changed, ids in (self._changes or {}).items()
+                             if changed > version}
+
+    def changed_since(self, since, until=None):
+        """(ids, complete) for the recorded versions after since.
+
+        ids is None if some write changed unknown rows; complete is False if
+        a version up to until (default: the newest recorded) was never
+        recorded, i.e. another process wrote it.
+        """
+        with self._lock:
+            changes = self._changes or {}
+            if until is None:
+                until = max(changes, default=since)
+            row_ids = set()
+            complete = True
+            for version in range(since + 1, until + 1):
+                changed = changes.get(version, _MISSING)
+                if changed is _MISSING:
+                    complete = False
+                elif changed is None:
+                    return None, complete
+                else:
+                    row_ids |= changed
+        return row_ids, complete
+
+    def catch_up(self, since, size, read):
+        """Re-read the rows changed after version since, for a copy of size rows.
+
+        read(ids) returns (version, rows) read in one transaction. Returns
+        (version, ids, rows) once every write up to that version is
+        accounted for, or None when the copy should be reloaded instead:
+        unknown or too many rows changed, or another process wrote.
+        """
+        deadline = time.monotonic() + self.IN_FLIGHT_WAIT
+        while True:
+            wanted, _ = self.changed_since(since)
+            if wanted is None or len(wanted) > self.RELOAD_FRACTION * max(size, 1):
+                return None
+            version, rows = read(wanted)
+            needed, complete = self.changed_since(since, version)
+            if needed is None:
+                return None
+            if complete and needed <= wanted:
+                return version, wanted, rows
+            if not complete:
+                # A commit that is still running its listeners has bumped the
+                # version already; anything else was another process
+                if not self.db.pool.writes_in_flight() or time.monotonic() > deadline:
+                    return None
+                time.sleep(0.001)
+
 
 class Database:
-    def __init__(self, db_name='sports_management.db'):
+    def __init__(self, db_name='sports_management.db', pool_size=5, pool_timeout=30.0,
+                 pragmas=None, storage_profile='wal', connection_factory=None, read_only=False):
+        """read_only opens an existing database (e.g. a replica.Replica copy)
+        without creating or migrating the schema; its connections are query_only.
+        """
         self.db_name = db_name
-        self.init_database()
+        self.read_only = read_only
+        if isinstance(storage_profile, str):
+            if storage_profile not in STORAGE_PROFILES:
+                raise ValueError(f'Unknown storage profile: {storage_profile}')
+            storage_profile = STORAGE_PROFILES[storage_profile]
+        connection_pragmas = dict(storage_profile)
+        connection_pragmas.update(pragmas or {})
+        self.journal_mode = connection_pragmas.pop('journal_mode', None)
+        if read_only:
+            connection_pragmas['query_only'] = 'ON'
+            self.journal_mode = None
+        self.pool = ConnectionPool(db_name, max_size=pool_size, timeout=pool_timeout,
+                                   pragmas=connection_pragmas, factory=connection_factory)
+        self.pool.on_commit = self._notify_write_listeners
+        self._write_listeners = []
+        self._local = threading.local()
+        if read_only:
+            self.fts_enabled = self._has_players_fts()
+        else:
+            self.init_database()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Check out a pooled connection; close() returns it to the pool"""
+        snapshot = getattr(self._local, 'snapshot', None)
+        if snapshot is not None:
+            return snapshot
+        return self.pool.acquire()
+
+    @contextlib.contextmanager
+    def snapshot(self):
+        """Run every read in the block on one connection and one transaction.
+
+        get_connection() in this thread returns that connection until the
+        block ends, so the reads all see the same committed state, however
+        many writes other connections commit in the meantime. The connection
+        is query_only for the duration: writes in the block raise
+        sqlite3.OperationalError. Nested blocks share the outer snapshot.
+        """
+        if getattr(self._local, 'snapshot', None) is not None:
+            yield
+            return
+        conn = self.pool.acquire()
+        try:
+            conn.execute('PRAGMA query_only = ON')
+            conn.execute('BEGIN')
+            # A deferred transaction only pins its snapshot at the first read
+            conn.execute("SELECT version FROM data_versions WHERE table_name = 'players'").fetchone()
+            self._local.snapshot = SnapshotConnection(conn)
+            try:
+                yield
+            finally:
+                self._local.snapshot = None
+        finally:
+            try:
+                conn.rollback()
+                conn.execute('PRAGMA query_only = OFF')
+            finally:
+                conn.close()
+
+    def add_write_listener(self, listener, with_versions=False):
+        """Register listener(changes), called after each committed write.
+
+        Listeners run while the writer still holds its connection, so they
+        must not read the database. Exceptions they raise are logged and
+        otherwise ignored.
+
+        changes is a list of (table, op, ids) tuples, where op is 'insert',
+        'update', 'upsert' or 'delete' and ids is a list of row IDs, or None
+        when the write touched an unknown set of rows.
+
+        With with_versions=True the listener is called as
+        listener(changes, versions), where versions maps each changed table
+        to the (first, last) data versions this transaction bumped it to.
+        Versions in between that a listener never sees were written by
+        another process.
+        """
+        self._write_listeners.append((listener, with_versions))
+
+    def track_changes(self, table):
+        """RowChangeTracker recording which rows of table each write touched"""
+        return RowChangeTracker(self, table)
+
+    def _notify_write_listeners(self, changes, versions):
+        # The write is already committed, so a failing listener must neither
+        # fail it nor keep the remaining listeners from running
+        for listener, with_versions in self._write_listeners:
+            try:
+                if with_versions:
+                    listener(changes, versions)
+                else:
+                    listener(changes)
+            except Exception:
+                write_listener_log.exception('Write listener %r failed', listener)
+
+    def pool_stats(self):
+        """Get connection pool statistics"""
+        return self.pool.stats()
+
+    def ping(self):
+        """Run a trivial query on a pooled connection; raises sqlite3.Error on failure"""
+        conn = self.get_connection()
+        try:
+            conn.execute('SELECT 1').fetchone()
+        finally:
+            conn.close()
+
+    def checkpoint(self, mode='PASSIVE'):
+        """Run a WAL checkpoint (PASSIVE, FULL, RESTART or TRUNCATE)"""
+        mode = mode.upper()
+        if mode not in ('PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'):
+            raise ValueError(f'Unknown checkpoint mode: {mode}')
+        conn = self.get_connection()
+        try:
+            busy, log_pages, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+        finally:
+            conn.close()
+        return {"busy": bool(busy), "log_pages": log_pages, "checkpointed_pages": checkpointed}
+
+    def explain_query_plans(self):
+        """Run EXPLAIN QUERY PLAN on every hot query and report any problems"""
+        conn = self.get_connection()
+        try:
+            report = []
+            for name, sql, params, allowed_scans in HOT_QUERIES:
+                if 'players_fts' in sql and not self.fts_enabled:
+                    continue
+                steps = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+                problems = []
+                for step in steps:
+                    if step.startswith('USE TEMP B-TREE'):
+                        if 'TEMP B-TREE' not in allowed_scans:
+                            problems.append(step)
+                    elif ' AUTOMATIC ' in step:
+                        problems.append(step)
+                    elif step.startswith('SCAN (subquery-'):
+                        # Rows a window function was computed over, not a table
+                        continue
+                    elif step.startswith('SCAN ') and step.split()[1] not in allowed_scans:
+                        problems.append(step)
+                report.append({"query": name, "plan": steps, "problems": problems})
+            return report
+        finally:
+            conn.close()
+
+    def verify_query_plans(self):
+        """Raise QueryPlanError if any hot query scans a table or sorts"""
+        report = self.explain_query_plans()
+        failures = [f"{entry['query']}: {'; '.join(entry['problems'])}"
+                    for entry in report if entry['problems']]
+        if failures:
+            raise QueryPlanError('Query plan check failed:\n' + '\n'.join(failures))
+        return report
+
+    def close(self):
+        """Checkpoint the WAL and close all pooled connections"""
+        if self.read_only:
+            self.pool.close()
+            return
+        try:
+            conn = self.get_connection()
+            conn.execute('PRAGMA optimize')
+            conn.close()
+        except sqlite3.Error:
+            pass
+        if self.journal_mode and self.journal_mode.upper() == 'WAL':
+            try:
+                self.checkpoint('TRUNCATE')
+            except sqlite3.Error:
+                pass
+        self.pool.close_all()
     
     def init_database(self):
         """Initialize database with tables"""
         conn = self.get_connection()
         cursor = conn.cursor()
         
+        if self.journal_mode:
+            cursor.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        
         # Create Teams table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS teams (
@@ -71,25 +1456,147 @@ class Database:
             ORDER BY p.ranking DESC
         ''')
         
-        # Create view for team statistics
+        # Create materialized team statistics, replacing the old view
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = 'team_stats'")
+        existing = cursor.fetchone()
+        if existing and existing[0] == 'view':
+            cursor.execute('DROP VIEW team_stats')
+        cursor.execute(CREATE_TEAM_STATS)
+        for trigger_name, body in TEAM_STATS_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}')
+        if not existing or existing[0] == 'view':
+            cursor.execute(f'INSERT INTO team_stats {COMPUTE_TEAM_STATS}')
+        
+        # Create the match history and its per-season rollups
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'match_stats'")
+        history_exists = cursor.fetchone() is not None
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'match_stats_player_ad'")
+        orphans_possible = history_exists and cursor.fetchone() is None
+        cursor.execute(CREATE_MATCH_STATS)
+        for create in CREATE_SEASON_STATS.values():
+            cursor.execute(create)
+        for trigger_name, body in MATCH_STATS_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}')
+        if orphans_possible:
+            # Drop the history players deleted before match_stats_player_ad
+            # existed left behind; match_stats_ad updates the rollups
+            cursor.execute('''
+                DELETE FROM match_stats
+                WHERE player_id NOT IN (SELECT player_id FROM players)
+            ''')
+        if not history_exists:
+            # Open the history of existing players with their current totals
+            cursor.execute('''
+                INSERT INTO match_stats
+                (player_id, team_id, match_date, goals, assists, appearances, kind)
+                SELECT player_id, team_id, date('now'), COALESCE(goals, 0),
+                       COALESCE(assists, 0), COALESCE(matches_played, 0), 'adjustment'
+                FROM players
+                WHERE COALESCE(goals, 0) <> 0 OR COALESCE(assists, 0) <> 0
+                   OR COALESCE(matches_played, 0) <> 0
+            ''')
+        
+        # Create table of per-table data versions, bumped by every write so
+        # readers can tell whether anything changed without reading the rows
         cursor.execute('''
-            CREATE VIEW IF NOT EXISTS team_stats AS
-            SELECT 
-                t.team_id,
-                t.team_name,
-                t.coach_name,
-                t.city,
-                COUNT(p.player_id) AS total_players,
-                COALESCE(SUM(p.goals), 0) AS total_goals,
-                COALESCE(SUM(p.assists), 0) AS total_assists
-            FROM teams t
-            LEFT JOIN players p ON t.team_id = p.team_id
-            GROUP BY t.team_id
+            CREATE TABLE IF NOT EXISTS data_versions (
+                table_name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.executemany('INSERT OR IGNORE INTO data_versions (table_name) VALUES (?)',
+                           [('teams',), ('players',), ('match_stats',)])
+        
+        # Create the change log behind /api/changes/stream. AUTOINCREMENT
+        # keeps sequence numbers from being reused after pruning.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS change_log (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name TEXT NOT NULL,
+                op TEXT NOT NULL,
+                row_id INTEGER,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
         ''')
         
+        # Create indexes for the hot queries
+        for index_name, definition in INDEXES.items():
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {index_name} ON {definition}')
+        
+        # Create the full-text search index, if this SQLite build has FTS5
+        self.fts_enabled = self._init_players_fts(cursor)
+        
         conn.commit()
         conn.close()
     
+    def _has_players_fts(self):
+        """Whether the database already has players_fts (read_only mode)"""
+        conn = self.get_connection()
+        try:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'players_fts'").fetchone()
+        finally:
+            conn.close()
+        return row is not None and 'trigram' in row[0]
+
+    def _init_players_fts(self, cursor):
+        """Create players_fts and its sync triggers; returns False without FTS5 or
+        its trigram tokenizer (SQLite 3.34+)"""
+        cursor.execute("SELECT sql FROM sqlite_master WHERE name = 'players_fts'")
+        row = cursor.fetchone()
+        exists = row is not None
+        if exists and 'trigram' not in row[0]:
+            # Built with the earlier word-prefix tokenizer; rebuild it
+            for trigger_name in PLAYERS_FTS_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {trigger_name}')
+            cursor.execute('DROP TABLE players_fts')
+            exists = False
+        try:
+            cursor.execute(CREATE_PLAYERS_FTS)
+        except sqlite3.OperationalError:
+            return False
+        for trigger_name, body in PLAYERS_FTS_TRIGGERS.items():
+            cursor.execute(f'CREATE TRIGGER IF NOT EXISTS {trigger_name} {body}')
+        if not exists:
+            # Index the players that were added before the FTS table existed
+            cursor.execute("INSERT INTO players_fts (players_fts) VALUES ('rebuild')")
+        return True
+    
+    def get_table_versions(self):
+        """Get the current data version of every table, e.g. {'teams': 3, 'players': 17}"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT table_name, version FROM data_versions')
+        versions = dict(cursor.fetchall())
+        conn.close()
+        return versions
+    
+    def get_latest_change_seq(self):
+        """Sequence number of the newest change_log entry ever written (0 if none)"""
+        conn = self.get_connection()
+        try:
+            row = conn.execute(SELECT_LATEST_CHANGE).fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+    
+    def get_changes(self, since, limit):
+        """Read change_log entries after sequence number since, oldest first.
+
+        Returns (latest, oldest, rows): the newest sequence number handed out
+        so far, the oldest one still in the log (None if it is empty) and up
+        to limit (seq, table_name, op, row_id) rows, all from one snapshot.
+        Entries between since and oldest were pruned if since < oldest - 1.
+        """
+        conn = self.get_connection()
+        try:
+            with _read_transaction(conn):
+                rows = conn.execute(SELECT_CHANGES, (since, limit)).fetchall()
+                oldest = conn.execute('SELECT MIN(seq) FROM change_log').fetchone()[0]
+                latest = conn.execute(SELECT_LATEST_CHANGE).fetchone()
+        finally:
+            conn.close()
+        return (latest[0] if latest else 0), oldest, rows
+    
     # TEAM OPERATIONS
     def add_team(self, team_name, coach_name, founded_year, city, stadium):
         """Add a new team"""
@@ -100,6 +1607,7 @@ class Database:
                 INSERT INTO teams (team_name, coach_name, founded_year, city, stadium)
                 VALUES (?, ?, ?, ?, ?)
             ''', (team_name, coach_name, founded_year, city, stadium))
+            conn.record_change('teams', 'insert', [cursor.lastrowid])
             conn.commit()
             return {"success": True, "message": "Team added successfully", "id": cursor.lastrowid}
         except sqlite3.IntegrityError:
@@ -111,7 +1619,7 @@ class Database:
         """Get all teams"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM teams ORDER BY team_name')
+        cursor.execute(SELECT_ALL_TEAMS)
         teams = cursor.fetchall()
         conn.close()
         return teams
@@ -120,11 +1628,22 @@ class Database:
         """Get team by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM teams WHERE team_id = ?', (team_id,))
+        cursor.execute(SELECT_TEAM_BY_ID, (team_id,))
         team = cursor.fetchone()
         conn.close()
         return team
     
+    def get_teams_by_ids(self, team_ids):
+        """Get teams by ID, in the order given; unknown IDs are left out"""
+        team_ids = list(team_ids)
+        conn = self.get_connection()
+        try:
+            by_id = {row['team_id']: row
+                     for row in _fetch_by_ids(conn, SELECT_TEAMS_BY_IDS, team_ids)}
+        finally:
+            conn.close()
+        return [by_id[team_id] for team_id in team_ids if team_id in by_id]
+    
     def update_team(self, team_id, team_name, coach_name, founded_year, city, stadium):
         """Update team information"""
         conn = self.get_connection()
@@ -135,6 +1654,7 @@ class Database:
                 SET team_name = ?, coach_name = ?, founded_year = ?, city = ?, stadium = ?
                 WHERE team_id = ?
             ''', (team_name, coach_name, founded_year, city, stadium, team_id))
+            conn.record_change('teams', 'update', [team_id])
             conn.commit()
             return {"success": True, "message": "Team updated successfully"}
         except sqlite3.IntegrityError:
@@ -147,6 +1667,7 @@ class Database:
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute('DELETE FROM teams WHERE team_id = ?', (team_id,))
+        conn.record_change('teams', 'delete', [team_id])
         conn.commit()
         conn.close()
         return {"success": True, "message": "Team deleted successfully"}
@@ -164,21 +1685,19 @@ class Database:
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (first_name, last_name, team_id, position, jersey_number, age, height, weight,
               ranking, goals, assists, matches_played))
-        conn.commit()
         player_id = cursor.lastrowid
+        conn.record_change('players', 'insert', [player_id])
+        conn.commit()
         conn.close()
         return {"success": True, "message": "Player added successfully", "id": player_id}
     
-    def get_all_players(self):
-        """Get all players"""
+    def get_all_players(self, fields=None):
+        """Get all players, optionally only some columns (see PLAYER_QUERY_FIELDS)"""
+        if fields:
+            return self.query_players(fields=fields, limit=None)
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.*, t.team_name 
-            FROM players p
-            LEFT JOIN teams t ON p.team_id = t.team_id
-            ORDER BY p.ranking DESC
-        ''')
+        cursor.execute(SELECT_ALL_PLAYERS)
         players = cursor.fetchall()
         conn.close()
         return players
@@ -187,20 +1706,27 @@ class Database:
         """Get player by ID"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM players WHERE player_id = ?', (player_id,))
+        cursor.execute(SELECT_PLAYER_BY_ID, (player_id,))
         player = cursor.fetchone()
         conn.close()
         return player
     
+    def get_players_by_ids(self, player_ids):
+        """Get players by ID, in the order given; unknown IDs are left out"""
+        player_ids = list(player_ids)
+        conn = self.get_connection()
+        try:
+            by_id = {row['player_id']: row
+                     for row in _fetch_by_ids(conn, SELECT_PLAYERS_BY_IDS, player_ids)}
+        finally:
+            conn.close()
+        return [by_id[player_id] for player_id in player_ids if player_id in by_id]
+    
     def get_players_by_team(self, team_id):
         """Get all players in a team"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM players 
-            WHERE team_id = ? 
-            ORDER BY ranking DESC
-        ''', (team_id,))
+        cursor.execute(SELECT_PLAYERS_BY_TEAM, (team_id,))
         players = cursor.fetchall()
         conn.close()
         return players
@@ -218,6 +1744,7 @@ class Database:
             WHERE player_id = ?
         ''', (first_name, last_name, team_id, position, jersey_number, age, height, weight,
               ranking, goals, assists, matches_played, player_id))
+        conn.record_change('players', 'update', [player_id])
         conn.commit()
         conn.close()
         return {"success": True, "message": "Player updated successfully"}
@@ -226,17 +1753,210 @@ class Database:
         """Delete a player"""
         conn = self.get_connection()
         cursor = conn.cursor()
+        # match_stats_player_ad drops the player's history in the same
+        # statement; readers of it all version on players as well
         cursor.execute('DELETE FROM players WHERE player_id = ?', (player_id,))
+        conn.record_change('players', 'delete', [player_id])
         conn.commit()
         conn.close()
         return {"success": True, "message": "Player deleted successfully"}
     
+    def player_exists(self, player_id):
+        """Check whether a player exists"""
+        conn = self.get_connection()
+        try:
+            row = conn.execute('SELECT 1 FROM players WHERE player_id = ?', (player_id,)).fetchone()
+        finally:
+            conn.close()
+        return row is not None
+    
+    def apply_stat_deltas(self, deltas):
+        """Add goals/assists/matches_played increments in one transaction.
+
+        deltas maps player_id -> (goals, assists, matches_played). Each becomes
+        a match_stats row dated today. Returns the number of players updated;
+        ids that no longer exist are skipped.
+        """
+        deltas = {player_id: delta for player_id, delta in deltas.items() if any(delta)}
+        if not deltas:
+            return 0
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(APPLY_STAT_DELTAS, [(goals, assists, matches_played, player_id)
+                                                   for player_id, (goals, assists, matches_played)
+                                                   in deltas.items()])
+            updated = cursor.rowcount
+            conn.record_change('players', 'update', list(deltas))
+            conn.record_change('match_stats', 'insert')
+            conn.commit()
+        finally:
+            conn.close()
+        return updated
+    
+    # BULK OPERATIONS
+    def bulk_upsert_players(self, rows, chunk_size=BULK_CHUNK_SIZE):
+        """Insert or update many players.
+
+        rows yields (row_number, values) where values follow bulk.PLAYER_FIELDS,
+        or (row_number, exception) for rows that failed to parse.
+        """
+        return self._bulk_upsert('players', rows, lambda values: (UPSERT_PLAYER, values), chunk_size)
+
+    def bulk_upsert_teams(self, rows, chunk_size=BULK_CHUNK_SIZE):
+        """Insert or update many teams.
+
+        rows yields (row_number, values) where values follow bulk.TEAM_FIELDS,
+        or (row_number, exception) for rows that failed to parse.
+        """
+        def statement(values):
+            if values[0] is None:
+                return UPSERT_TEAM_BY_NAME, values[1:]
+            return UPSERT_TEAM_BY_ID, values
+        return self._bulk_upsert('teams', rows, statement, chunk_size)
+
+    def add_match_stats(self, rows, chunk_size=BULK_CHUNK_SIZE):
+        """Append per-match stats to the history and the players' totals.
+
+        rows yields (row_number, values) where values follow bulk.MATCH_FIELDS,
+        or (row_number, exception) for rows that failed to parse. Rows for
+        unknown players or with an invalid match_date are reported and skipped.
+        """
+        def statement(values):
+            player_id, team_id = values[:2]
+            return INSERT_MATCH_STATS, (player_id, team_id, player_id, *values[2:])
+        return self._bulk_upsert('match_stats', rows, statement, chunk_size,
+                                 changes=(('match_stats', 'insert'), ('players', 'update')),
+                                 verb='inserted')
+
+    def _bulk_upsert(self, table, rows, statement, chunk_size, changes=None, verb='upserted'):
+        """Upsert rows in one transaction per chunk, collecting per-row errors.
+
+        Each chunk goes through executemany; if a row in it violates a
+        constraint the chunk is rolled back to a savepoint and replayed row
+        by row, so only the offending rows are reported and skipped. changes
+        lists the (table, op) pairs recorded per chunk, (table, 'upsert') by
+        default; verb names the count in the result.
+        """
+        upserted = 0
+        errors = []
+        failed = 0
+
+        def fail(row_number, error):
+            nonlocal failed
+            failed += 1
+            if len(errors) < BULK_MAX_ERRORS:
+                errors.append({"row": row_number, "error": str(error)})
+
+        rows = iter(rows)
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                batches = {}
+                for row_number, values in chunk:
+                    if isinstance(values, Exception):
+                        fail(row_number, values)
+                    else:
+                        sql, params = statement(values)
+                        batches.setdefault(sql, []).append((row_number, params))
+                if not batches:
+                    continue
+                cursor.execute('BEGIN')
+                for sql, batch in batches.items():
+                    cursor.execute('SAVEPOINT bulk_chunk')
+                    try:
+                        cursor.executemany(sql, [params for row_number, params in batch])
+                        upserted += len(batch)
+                    except sqlite3.Error:
+                        cursor.execute('ROLLBACK TO bulk_chunk')
+                        for row_number, params in batch:
+                            try:
+                                cursor.execute(sql, params)
+                                upserted += 1
+                            except sqlite3.Error as e:
+                                fail(row_number, e)
+                    cursor.execute('RELEASE bulk_chunk')
+                for changed_table, op in changes or ((table, 'upsert'),):
+                    conn.record_change(changed_table, op)
+                conn.commit()
+        finally:
+            conn.close()
+        errors.sort(key=lambda error: error["row"])
+        return {
+            "success": failed == 0,
+            "message": f"{verb.capitalize()} {upserted} {table}, {failed} failed",
+            verb: upserted,
+            "failed": failed,
+            "errors": errors,
+            "errors_truncated": failed > len(errors),
+        }
+    
+    # EXPORT OPERATIONS
+    def iter_export(self, dataset, batch_size=EXPORT_BATCH_SIZE):
+        """Stream a dataset without loading it into memory.
+
+        Yields the list of column names first, then lists of up to batch_size
+        row tuples. The pooled connection is held until the generator is
+        exhausted or closed.
+        """
+        sql = EXPORT_QUERIES[dataset]
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql)
+            yield [column[0] for column in cursor.description]
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+    
     # VIEW OPERATIONS
+    def get_leaderboard_scores(self, player_ids=None):
+        """Get (players version, [(player_id, ranking, goals_per_match), ...]).
+
+        Both are read in one transaction, so the rows are exactly the state at
+        that data version. player_ids limits the rows to those players.
+        """
+        return self._read_players_at_version(LEADERBOARD_SCORES, LEADERBOARD_SCORES_BY_IDS,
+                                             player_ids)
+
+    def get_analytics_columns(self, player_ids=None):
+        """Get (players version, [(player_id, team_id, position, age, ...), ...]).
+
+        Same consistency as get_leaderboard_scores(), for the columns in
+        ANALYTICS_COLUMNS.
+        """
+        return self._read_players_at_version(ANALYTICS_COLUMNS, ANALYTICS_COLUMNS_BY_IDS,
+                                             player_ids)
+
+    def _read_players_at_version(self, select, select_by_ids, player_ids):
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            with _read_transaction(conn):
+                cursor.execute("SELECT version FROM data_versions WHERE table_name = 'players'")
+                version = cursor.fetchone()[0]
+                if player_ids is None:
+                    rows = cursor.execute(select).fetchall()
+                else:
+                    rows = _fetch_by_ids(cursor, select_by_ids, player_ids)
+        finally:
+            conn.close()
+        return version, rows
+    
     def get_player_stats(self):
         """Get player statistics view"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM player_stats')
+        cursor.execute(SELECT_PLAYER_STATS)
         stats = cursor.fetchall()
         conn.close()
         return stats
@@ -245,22 +1965,164 @@ class Database:
         """Get team statistics view"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('SELECT * FROM team_stats')
+        cursor.execute(SELECT_TEAM_STATS)
         stats = cursor.fetchall()
         conn.close()
         return stats
     
+    def check_team_stats(self):
+        """Compare team_stats with a full recomputation; returns the mismatches"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(SELECT_TEAM_STATS)
+        stored = {row[0]: tuple(row) for row in cursor.fetchall()}
+        cursor.execute(COMPUTE_TEAM_STATS)
+        expected = {row[0]: tuple(row) for row in cursor.fetchall()}
+        conn.close()
+        mismatches = []
+        for team_id in sorted(stored.keys() | expected.keys()):
+            if stored.get(team_id) != expected.get(team_id):
+                mismatches.append({"team_id": team_id, "stored": stored.get(team_id),
+                                   "expected": expected.get(team_id)})
+        return mismatches
+    
+    def rebuild_team_stats(self):
+        """Recompute team_stats from scratch"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute('DELETE FROM team_stats')
+            cursor.execute(f'INSERT INTO team_stats {COMPUTE_TEAM_STATS}')
+            # Refresh cached team statistics
+            conn.record_change('teams', 'update')
+            conn.commit()
+            conn.close()
+            return {"success": True, "message": "Team statistics rebuilt successfully"}
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return {"success": False, "message": f"Error rebuilding team statistics: {str(e)}"}
+    
+    # MATCH HISTORY
+    def get_player_seasons(self, player_id):
+        """Get a player's per-season totals, oldest season first"""
+        return self._fetch_all(SELECT_PLAYER_SEASONS, (player_id,))
+
+    def get_team_seasons(self, team_id):
+        """Get a team's per-season totals, oldest season first"""
+        return self._fetch_all(SELECT_TEAM_SEASONS, (team_id,))
+
+    def get_season_leaders(self, season, limit=10):
+        """Get the top scorers of a season ('2025-26')"""
+        return self._fetch_all(SELECT_SEASON_LEADERS, (season, limit))
+
+    def get_player_form(self, player_id, last=FORM_LAST, window=FORM_WINDOW, since=None,
+                        until=None):
+        """Get a player's form curve over their last match days.
+
+        Returns up to last match days between since and until (ISO dates,
+        inclusive), oldest first, each with that day's numbers and rolling
+        form_* totals over it and the window - 1 match days before it.
+        Adjustments are not matches and are left out. Raises ValueError for
+        out-of-range arguments.
+        """
+        return self._fetch_form(PLAYER_FORM, player_id, last, window, since, until)
+
+    def get_team_form(self, team_id, last=FORM_LAST, window=FORM_WINDOW, since=None,
+                      until=None):
+        """Get a team's form curve, summed over its players; see get_player_form()"""
+        return self._fetch_form(TEAM_FORM, team_id, last, window, since, until)
+
+    def _fetch_form(self, sql, key, last, window, since, until):
+        if not 1 <= last <= FORM_MAX_LAST:
+            raise ValueError(f'last must be between 1 and {FORM_MAX_LAST}')
+        if not 1 <= window <= last:
+            raise ValueError('window must be between 1 and last')
+        bounds = []
+        for name, value, default in (('since', since, '0000-01-01'),
+                                     ('until', until, '9999-12-31')):
+            if value is None:
+                bounds.append(default)
+                continue
+            try:
+                bounds.append(date.fromisoformat(value).isoformat())
+            except (TypeError, ValueError):
+                raise ValueError(f'{name} must be a date (YYYY-MM-DD)') from None
+        return self._fetch_all(sql, (key, *bounds, last, window - 1))
+
+    def _fetch_all(self, sql, params):
+        conn = self.get_connection()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def check_season_stats(self):
+        """Compare the season rollups with match_stats, and the players' totals
+        with the rollups; returns the mismatches"""
+        conn = self.get_connection()
+        try:
+            with _read_transaction(conn):
+                mismatches = []
+                for table, compute in COMPUTE_SEASON_STATS.items():
+                    stored = {tuple(row[:2]): tuple(row) for row in
+                              conn.execute(f'SELECT * FROM {table} ORDER BY 1, 2').fetchall()}
+                    expected = {tuple(row[:2]): tuple(row)
+                                for row in conn.execute(compute).fetchall()}
+                    for key in sorted(stored.keys() | expected.keys()):
+                        if stored.get(key) != expected.get(key):
+                            mismatches.append({"table": table, "key": list(key),
+                                               "stored": stored.get(key),
+                                               "expected": expected.get(key)})
+                for row in conn.execute(SELECT_PLAYER_TOTAL_MISMATCHES).fetchall():
+                    mismatches.append({"table": "players", "key": [row[0]],
+                                       "stored": tuple(row[1:4]), "expected": tuple(row[4:])})
+        finally:
+            conn.close()
+        return mismatches
+
+    def rebuild_season_stats(self):
+        """Recompute the season rollups from match_stats, then the players' totals
+        from the rollups"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            for table, compute in COMPUTE_SEASON_STATS.items():
+                cursor.execute(f'DELETE FROM {table}')
+                cursor.execute(f'INSERT INTO {table} {compute}')
+            cursor.execute(SET_PLAYER_TOTALS)
+            conn.record_change('match_stats', 'update')
+            conn.record_change('players', 'update')
+            conn.commit()
+            conn.close()
+            return {"success": True, "message": "Season statistics rebuilt successfully"}
+        except Exception as e:
+            conn.rollback()
+            conn.close()
+            return {"success": False, "message": f"Error rebuilding season statistics: {str(e)}"}
+
+    def get_dashboard_summary(self, top_n=5):
+        """Get team/player counts, goal and assist totals and the top players"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(SELECT_DASHBOARD_TOTALS)
+        total_teams, total_players, total_goals, total_assists = cursor.fetchone()
+        cursor.execute(SELECT_TOP_PLAYERS, (top_n,))
+        top_players = cursor.fetchall()
+        conn.close()
+        return {
+            "total_teams": total_teams,
+            "total_players": total_players,
+            "total_goals": total_goals,
+            "total_assists": total_assists,
+            "top_players": top_players,
+        }
+    
     def get_top_players_by_ranking(self, limit=10):
         """Get top players by ranking"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.*, t.team_name 
-            FROM players p
-            LEFT JOIN teams t ON p.team_id = t.team_id
-            ORDER BY p.ranking DESC
-            LIMIT ?
-        ''', (limit,))
+        cursor.execute(SELECT_TOP_PLAYERS, (limit,))
         players = cursor.fetchall()
         conn.close()
         return players
@@ -269,17 +2131,145 @@ class Database:
         """Search players by name"""
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute('''
-            SELECT p.*, t.team_name 
-            FROM players p
-            LEFT JOIN teams t ON p.team_id = t.team_id
-            WHERE p.first_name LIKE ? OR p.last_name LIKE ?
-            ORDER BY p.ranking DESC
-        ''', (f'%{search_term}%', f'%{search_term}%'))
+        match = fts_match_expression(search_term) if self.fts_enabled else None
+        if match:
+            cursor.execute(SEARCH_PLAYERS_FTS, (match,))
+        else:
+            cursor.execute(SEARCH_PLAYERS_LIKE, (f'%{search_term}%', f'%{search_term}%'))
         players = cursor.fetchall()
         conn.close()
         return players
     
+    # PAGINATION
+    def _fetch_page(self, queries, params, limit, cursor=None):
+        """Fetch one page of rows ordered by (ranking DESC, player_id).
+
+        Returns (rows, next_cursor); next_cursor is None on the last page.
+        """
+        conn = self.get_connection()
+        try:
+            db_cursor = conn.cursor()
+            ranking = None
+            if cursor is None:
+                db_cursor.execute(queries['first'], (*params, limit))
+            else:
+                ranking, player_id = decode_cursor(cursor)
+                if ranking is None:
+                    db_cursor.execute(queries['nulls'], (*params, player_id, limit))
+                else:
+                    db_cursor.execute(queries['after'], (*params, ranking, ranking, player_id, limit))
+            rows = db_cursor.fetchall()
+            columns = [column[0] for column in db_cursor.description]
+            if ranking is not None and len(rows) < limit:
+                # Ran off the ranked players; continue with the unranked ones
+                db_cursor.execute(queries['nulls'], (*params, 0, limit - len(rows)))
+                rows += db_cursor.fetchall()
+        finally:
+            conn.close()
+        next_cursor = None
+        if len(rows) == limit:
+            last = rows[-1]
+            next_cursor = encode_cursor(last[columns.index('ranking')], last[columns.index('player_id')])
+        return rows, next_cursor
+
+    def get_players_page(self, limit, cursor=None, fields=None):
+        """Get a page of players ordered by ranking.
+
+        With fields, only those columns are read, plus ranking and player_id,
+        which the next cursor is built from.
+        """
+        if not fields:
+            return self._fetch_page(PLAYERS_PAGE, (), limit, cursor)
+        fields = tuple(fields) + tuple(name for name in ('ranking', 'player_id')
+                                       if name not in fields)
+        return self._fetch_page(compile_player_page(fields), (), limit, cursor)
+
+    def get_player_stats_page(self, limit, cursor=None):
+        """Get a page of the player statistics view ordered by ranking"""
+        return self._fetch_page(PLAYER_STATS_PAGE, (), limit, cursor)
+
+    def search_players_page(self, search_term, limit, cursor=None):
+        """Get a page of players matching a name search, ordered by ranking"""
+        match = fts_match_expression(search_term) if self.fts_enabled else None
+        if match:
+            return self._fetch_page(SEARCH_PLAYERS_FTS_PAGE, (match,), limit, cursor)
+        return self._fetch_page(SEARCH_PLAYERS_LIKE_PAGE, (f'%{search_term}%', f'%{search_term}%'),
+                                limit, cursor)
+    
+    @staticmethod
+    def _player_query(fields, positions, team_ids, ranges, sort, limit):
+        """Validate a composite query and return (sql, params)"""
+        fields = tuple(fields or PLAYER_QUERY_FIELDS)
+        sort = tuple((name, bool(descending)) for name, descending in (sort or [('ranking', True)]))
+        for name, descending in sort:
+            if name not in PLAYER_QUERY_FIELDS:
+                raise ValueError(f'Unknown sort field: {name}')
+        if 'player_id' not in [name for name, descending in sort]:
+            # Ties come back in a stable order
+            sort += (('player_id', False),)
+        if limit is not None and not 1 <= limit <= PLAYER_QUERY_MAX_LIMIT:
+            raise ValueError(f'limit must be between 1 and {PLAYER_QUERY_MAX_LIMIT}')
+        params = []
+        modes = []
+        for values in (positions, team_ids):
+            values = list(values or ())
+            if not values:
+                modes.append(None)
+            elif len(values) == 1:
+                modes.append('eq')
+                params.append(values[0])
+            else:
+                modes.append('in')
+                params.append(json.dumps(values))
+        bounds = []
+        for name, (low, high) in sorted((ranges or {}).items()):
+            if name not in PLAYER_QUERY_RANGES:
+                raise ValueError(f'Cannot filter on a range of {name}')
+            if low is not None and high is not None:
+                bounds.append((name, 'between'))
+                params.extend((low, high))
+            elif low is not None:
+                bounds.append((name, 'min'))
+                params.append(low)
+            elif high is not None:
+                bounds.append((name, 'max'))
+                params.append(high)
+        if limit is not None:
+            params.append(limit)
+        return compile_player_query(fields, modes[0], modes[1], tuple(bounds), sort,
+                                    limit is not None), params
+    
+    def query_players(self, fields=None, positions=None, team_ids=None, ranges=None, sort=None,
+                      limit=100):
+        """Filter, sort and project players in one statement.
+
+        fields: columns to return, from PLAYER_QUERY_FIELDS (default: all)
+        positions, team_ids: values to match; a player matches any of them
+        ranges: {column: (low, high)} over PLAYER_QUERY_RANGES, inclusive;
+            None leaves that end open
+        sort: [(column, descending), ...], default ranking, highest first;
+            ties are broken by player_id
+        limit: 1 to PLAYER_QUERY_MAX_LIMIT rows, or None for all of them
+        Raises ValueError for an unknown column or a limit out of range.
+        """
+        sql, params = self._player_query(fields, positions, team_ids, ranges, sort, limit)
+        conn = self.get_connection()
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+    
+    def explain_player_query(self, fields=None, positions=None, team_ids=None, ranges=None,
+                             sort=None, limit=100):
+        """The SQL, parameters and query plan query_players() would use"""
+        sql, params = self._player_query(fields, positions, team_ids, ranges, sort, limit)
+        conn = self.get_connection()
+        try:
+            plan = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+        finally:
+            conn.close()
+        return {"sql": sql, "params": params, "plan": plan}
+    
     def add_sample_data(self):
         """Add sample data to the database"""
         conn = self.get_connection()
@@ -353,6 +2343,8 @@ class Database:
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', players_data)
             
+            conn.record_change('teams', 'insert')
+            conn.record_change('players', 'insert')
             conn.commit()
             conn.close()
             return {"success": True, "message": f"Added {len(teams_data)} teams and {len(players_data)} players successfully"}
@@ -362,6 +2354,78 @@ class Database:
             conn.close()
             return {"success": False, "message": f"Error adding sample data: {str(e)}"}
     
+    def add_synthetic_data(self, teams=50, players=10000, seed=0, chunk_size=10000):
+        """Add generated teams and players, to try the app at realistic sizes.
+
+        The data is random but reproducible: the same seed on an empty database
+        always produces the same rows. About 5% of the players have no team.
+        Everything goes in one transaction, inserted chunk_size rows at a time.
+        """
+        rng = random.Random(seed)
+        positions = [entry for entry in SYNTHETIC_POSITIONS for _ in range(entry[1])]
+
+        def team_rows(first_number):
+            for number in range(first_number, first_number + teams):
+                city = rng.choice(SYNTHETIC_CITIES)
+                yield (f'{city} {rng.choice(SYNTHETIC_NICKNAMES)} {number}',
+                       f'{rng.choice(SYNTHETIC_FIRST_NAMES)} {rng.choice(SYNTHETIC_LAST_NAMES)}',
+                       rng.randint(1870, 2015), city, f'{city} Stadium {number}')
+
+        def player_rows(team_ids):
+            # random() arithmetic instead of randint()/choice(): this loop
+            # dominates generating a million rows
+            uniform = rng.random
+            for _ in range(players):
+                position, _, goal_rate, assist_rate = positions[int(uniform() * len(positions))]
+                matches_played = int(uniform() * 46)
+                team_id = None
+                if team_ids and uniform() >= 0.05:
+                    team_id = team_ids[int(uniform() * len(team_ids))]
+                yield (SYNTHETIC_FIRST_NAMES[int(uniform() * len(SYNTHETIC_FIRST_NAMES))],
+                       SYNTHETIC_LAST_NAMES[int(uniform() * len(SYNTHETIC_LAST_NAMES))],
+                       team_id, position, 1 + int(uniform() * 99), 17 + int(uniform() * 22),
+                       round(rng.gauss(181, 7), 1), round(rng.gauss(76, 8), 1),
+                       40 + int(uniform() * 60), int(matches_played * goal_rate * 2 * uniform()),
+                       int(matches_played * assist_rate * 2 * uniform()), matches_played)
+
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # New team IDs, and so the numbers that keep their names unique,
+            # all come after the current maximum
+            cursor.execute('SELECT COALESCE(MAX(team_id), 0) FROM teams')
+            first_team_id = cursor.fetchone()[0] + 1
+            cursor.executemany('''
+                INSERT INTO teams (team_name, coach_name, founded_year, city, stadium)
+                VALUES (?, ?, ?, ?, ?)
+            ''', team_rows(first_team_id))
+            cursor.execute('SELECT team_id FROM teams WHERE team_id >= ? ORDER BY team_id',
+                           (first_team_id,))
+            team_ids = [row[0] for row in cursor.fetchall()]
+            rows = player_rows(team_ids)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                cursor.executemany('''
+                    INSERT INTO players
+                    (first_name, last_name, team_id, position, jersey_number, age, height, weight,
+                     ranking, goals, assists, matches_played)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', chunk)
+            if teams:
+                conn.record_change('teams', 'insert')
+            if players:
+                conn.record_change('players', 'insert')
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            return {"success": False, "message": f"Error adding synthetic data: {str(e)}"}
+        finally:
+            conn.close()
+        return {"success": True, "teams": teams, "players": players,
+                "message": f"Added {teams} teams and {players} players successfully"}
+
     def clear_all_data(self):
         """Clear all data from the database (useful for testing)"""
         conn = self.get_connection()
@@ -369,6 +2433,12 @@ class Database:
         try:
             cursor.execute('DELETE FROM players')
             cursor.execute('DELETE FROM teams')
+            cursor.execute('DELETE FROM match_stats')
+            for table in CREATE_SEASON_STATS:
+                cursor.execute(f'DELETE FROM {table}')
+            conn.record_change('players', 'delete')
+            conn.record_change('teams', 'delete')
+            conn.record_change('match_stats', 'delete')
             conn.commit()
             conn.close()
             return {"success": True, "message": "All data cleared successfully"}
@@ -0,0 +1,159 @@
+import sqlite3
+import threading
+import time
+
+# Stat columns an event may increment
+STAT_FIELDS = ('goals', 'assists', 'matches_played')
+
+
+def parse_deltas(payload):
+    """Validate an event (or list of events) and return (goals, assists, matches_played) tuples.
+
+    Each event is an object with integer increments for any of STAT_FIELDS;
+    missing fields count as 0 and negative values correct earlier events.
+    Raises ValueError describing the first problem found.
+    """
+    events = payload if isinstance(payload, list) else [payload]
+    if not events:
+        raise ValueError('No events provided')
+    deltas = []
+    for number, event in enumerate(events, start=1):
+        if not isinstance(event, dict):
+            raise ValueError(f'Event {number} must be an object')
+        unknown = set(event) - set(STAT_FIELDS)
+        if unknown:
+            raise ValueError(f'Event {number} has unknown fields: {", ".join(sorted(unknown))}')
+        values = []
+        for field in STAT_FIELDS:
+            value = event.get(field, 0)
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f'Event {number}: {field} must be an integer')
+            values.append(value)
+        deltas.append(tuple(values))
+    return deltas
+
+
+class StatEventQueue:
+    """Write-behind queue for match stat increments.
+
+    Events are summed per player in memory and written by a background thread
+    in a single transaction once max_pending events are queued or
+    flush_interval seconds have passed, whichever comes first. A flush that
+    fails is merged back into the queue and retried. close() stops the thread
+    and flushes whatever is left, so call it on shutdown.
+    """
+
+    def __init__(self, db, max_pending=1000, flush_interval=0.25):
+        self.db = db
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        self._pending = {}  # player_id -> [goals, assists, matches_played]
+        self._pending_events = 0
+        self._lock = threading.Condition(threading.Lock())
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self._thread = None
+        self._stats = {
+            'events': 0,
+            'flushes': 0,
+            'flushed_events': 0,
+            'flushed_players': 0,
+            'failed_flushes': 0,
+            'flush_time': 0.0,
+        }
+
+    def add(self, player_id, deltas):
+        """Queue (goals, assists, matches_played) increments for a player"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('Stat event queue is closed')
+            if self._thread is None:
+                self._start()
+            totals = self._pending.get(player_id)
+            if totals is None:
+                totals = self._pending[player_id] = [0, 0, 0]
+            for goals, assists, matches_played in deltas:
+                totals[0] += goals
+                totals[1] += assists
+                totals[2] += matches_played
+            self._pending_events += len(deltas)
+            self._stats['events'] += len(deltas)
+            if self._pending_events >= self.max_pending:
+                self._lock.notify()
+
+    def _start(self):
+        # Started lazily so that a queue created before a fork gets its
+        # thread in the process that actually uses it
+        self._thread = threading.Thread(target=self._run, name='stat-events', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and self._pending_events < self.max_pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._lock.wait(remaining)
+                closed = self._closed
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # The batch is back in the queue; retry on the next tick
+                pass
+            if closed:
+                return
+
+    def flush(self):
+        """Write every queued increment now; returns the number of events written"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                events, self._pending_events = self._pending_events, 0
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                self.db.apply_stat_deltas({player_id: tuple(totals)
+                                           for player_id, totals in batch.items()})
+            except sqlite3.Error:
+                with self._lock:
+                    for player_id, totals in batch.items():
+                        current = self._pending.setdefault(player_id, [0, 0, 0])
+                        for i, value in enumerate(totals):
+                            current[i] += value
+                    self._pending_events += events
+                    self._stats['failed_flushes'] += 1
+                raise
+            with self._lock:
+                self._stats['flushes'] += 1
+                self._stats['flushed_events'] += events
+                self._stats['flushed_players'] += len(batch)
+                self._stats['flush_time'] += time.perf_counter() - started
+            return events
+
+    def close(self):
+        """Stop accepting events and flush everything still queued"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+            self._lock.notify()
+        if thread is not None and thread.is_alive():
+            thread.join()
+        # Catches anything the thread could not write (or a queue that never
+        # started one); errors propagate so a lost batch is never silent
+        self.flush()
+
+    def stats(self):
+        """Get queue depth and flush counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending_events'] = self._pending_events
+            stats['pending_players'] = len(self._pending)
+            stats['max_pending'] = self.max_pending
+            stats['flush_interval'] = self.flush_interval
+        stats['flush_time'] = round(stats['flush_time'], 6)
+        return stats
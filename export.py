@@ -0,0 +1,37 @@
+import csv
+import io
+import json
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_ndjson(batches):
+    """Encode Database.iter_export() output as NDJSON, one chunk per batch"""
+    columns = next(batches)
+    for rows in batches:
+        yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+
+
+def iter_csv(batches):
+    """Encode Database.iter_export() output as CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(next(batches))
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, for an empty table
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode(batches, fmt):
+    """Encode export batches in the given format"""
+    if fmt == 'csv':
+        return iter_csv(batches)
+    return iter_ndjson(batches)
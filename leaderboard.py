@@ -0,0 +1,282 @@
+import threading
+from bisect import bisect_left, insort
+
+# Metrics a leaderboard can be sorted by, in the column order of
+# Database.get_leaderboard_scores()
+METRICS = ('ranking', 'goals_per_match')
+
+# Scores are compared to two decimal places (goals_per_match is rounded to
+# that in SQL), which lets a (score DESC, player_id) sort key be one integer
+SCALE = 100
+_ID_SPAN = 1 << 64
+# Players without a score sort after everyone else, as in the paginated routes
+_NULL_SCORE = 1 << 128
+
+
+
+def _make_key(score, player_id):
+    if score is None:
+        return _NULL_SCORE * _ID_SPAN + player_id
+    return -round(score * SCALE) * _ID_SPAN + player_id
+
+
+def _score_bound(key):
+    # Smallest key with the same score, i.e. where that score's ties start
+    return key - key % _ID_SPAN
+
+
+def _split_key(key):
+    scaled, player_id = divmod(key, _ID_SPAN)
+    if scaled == _NULL_SCORE:
+        return None, player_id
+    return -scaled / SCALE, player_id
+
+
+class SortedKeyList:
+    """Sorted list of integer keys with O(log n) rank lookups.
+
+    Keys live in chunks of about LOAD items, with a Fenwick tree over the
+    chunk lengths. Finding a key's position, or the key at a position, is
+    a bisect plus a tree walk; adding or removing one only shifts items
+    within its chunk instead of the whole list.
+    """
+
+    LOAD = 1000
+
+    def __init__(self, keys=()):
+        keys = sorted(keys)
+        self._lists = [keys[i:i + self.LOAD] for i in range(0, len(keys), self.LOAD)]
+        self._maxes = [chunk[-1] for chunk in self._lists]
+        self._len = len(keys)
+        self._build_tree()
+
+    def __len__(self):
+        return self._len
+
+    def _build_tree(self):
+        tree = [0] + [len(chunk) for chunk in self._lists]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, chunk, delta):
+        i = chunk + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, chunk):
+        """Number of keys in the chunks before this one"""
+        total = 0
+        while chunk > 0:
+            total += self._tree[chunk]
+            chunk -= chunk & -chunk
+        return total
+
+    def _locate(self, position):
+        """(chunk, offset) of the key at an overall position"""
+        chunk = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            following = chunk + step
+            if following < len(self._tree) and self._tree[following] <= position:
+                chunk = following
+                position -= self._tree[following]
+            step >>= 1
+        return chunk, position
+
+    def add(self, key):
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            self._build_tree()
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+        chunk = self._lists[i]
+        insort(chunk, key)
+        self._maxes[i] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * self.LOAD:
+            self._lists.insert(i + 1, chunk[self.LOAD:])
+            del chunk[self.LOAD:]
+            self._maxes.insert(i, chunk[-1])
+            self._build_tree()
+        else:
+            self._tree_add(i, 1)
+
+    def remove(self, key):
+        i = bisect_left(self._maxes, key)
+        chunk = self._lists[i] if i < len(self._lists) else []
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            raise ValueError(f'{key} is not in the list')
+        del chunk[j]
+        self._len -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+            self._tree_add(i, -1)
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+            self._build_tree()
+
+    def index(self, key):
+        """Number of keys smaller than key"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return self._prefix(i) + bisect_left(self._lists[i], key)
+
+    def slice(self, start, stop):
+        """Keys at positions start..stop-1"""
+        start = max(start, 0)
+        stop = min(stop, self._len)
+        if start >= stop:
+            return []
+        chunk, offset = self._locate(start)
+        keys = []
+        while len(keys) < stop - start:
+            keys.extend(self._lists[chunk][offset:offset + stop - start - len(keys)])
+            chunk += 1
+            offset = 0
+        return keys
+
+
+class Leaderboards:
+    """In-memory leaderboards of every player by each of METRICS.
+
+    Built on first use from one read of the players table. A RowChangeTracker
+    records which players each local commit touched, and the next read
+    re-reads just those players before it is served. A players data version
+    it never saw (a write from another process, such as a serve.py worker or
+    manage.py) means a full rebuild instead.
+
+    Positions are 1-based and break ties by player_id; rank is the
+    competition rank, shared by tied players (1, 2, 2, 4).
+    """
+
+    def __init__(self, db):
+        self.db = db
+        # Only held for in-memory work, never around a database read
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()  # one refresh at a time
+        self._boards = None  # metric -> SortedKeyList, None until loaded
+        self._keys = {}  # player_id -> one key per metric
+        self._version = 0  # players data version the boards reflect
+        self._changes = db.track_changes('players')
+        self._stats = {'rebuilds': 0, 'updates': 0}
+
+    def _refresh(self):
+        with self._refresh_lock:
+            version = self.db.get_table_versions().get('players', 0)
+            if self._boards is not None and version <= self._version:
+                return
+            if self._boards is not None:
+                patch = self._changes.catch_up(self._version, len(self._keys),
+                                               self.db.get_leaderboard_scores)
+                if patch is not None:
+                    self._apply(*patch)
+                    return
+            self._rebuild()
+
+    def _rebuild(self):
+        self._changes.start()
+        version, rows = self.db.get_leaderboard_scores()
+        keys = {player_id: tuple(_make_key(score, player_id) for score in scores)
+                for player_id, *scores in rows}
+        boards = {metric: SortedKeyList(player_keys[i] for player_keys in keys.values())
+                  for i, metric in enumerate(METRICS)}
+        with self._lock:
+            self._boards = boards
+            self._keys = keys
+            self._set_version(version)
+            self._stats['rebuilds'] += 1
+
+    def _apply(self, version, player_ids, rows):
+        """Replace the keys of player_ids with rows read at version"""
+        rows = {player_id: scores for player_id, *scores in rows}
+        with self._lock:
+            for player_id in player_ids:
+                old_keys = self._keys.pop(player_id, None)
+                if old_keys is not None:
+                    for metric, key in zip(METRICS, old_keys):
+                        self._boards[metric].remove(key)
+                if player_id in rows:
+                    new_keys = tuple(_make_key(score, player_id) for score in rows[player_id])
+                    self._keys[player_id] = new_keys
+                    for metric, key in zip(METRICS, new_keys):
+                        self._boards[metric].add(key)
+            self._set_version(version)
+            self._stats['updates'] += 1
+
+    def _set_version(self, version):
+        # Called with the lock held. Changes after version stay recorded for
+        # the next refresh.
+        self._version = version
+        self._changes.forget(version)
+
+    def _read(self, metric, read):
+        """Run read(board) on an up-to-date leaderboard for metric"""
+        if metric not in METRICS:
+            raise KeyError(metric)
+        while True:
+            version = self.db.get_table_versions().get('players', 0)
+            with self._lock:
+                if self._boards is not None and version <= self._version:
+                    return read(self._boards[metric])
+            self._refresh()
+
+    def _entry(self, board, key):
+        score, player_id = _split_key(key)
+        if board is self._boards['ranking'] and score is not None and score.is_integer():
+            # ranking is an INTEGER column
+            score = int(score)
+        return {
+            'player_id': player_id,
+            'score': score,
+            'position': board.index(key) + 1,
+            'rank': board.index(_score_bound(key)) + 1,
+        }
+
+    def top(self, metric, limit, offset=0):
+        """Entries for positions offset+1..offset+limit"""
+        return self._read(metric, lambda board: [
+            self._entry(board, key) for key in board.slice(offset, offset + limit)])
+
+    def lookup(self, metric, player_id):
+        """Entry for one player, or None if there is no such player"""
+        def read(board):
+            keys = self._keys.get(player_id)
+            if keys is None:
+                return None
+            return self._entry(board, keys[METRICS.index(metric)])
+        return self._read(metric, read)
+
+    def around(self, metric, player_id, radius):
+        """Entries for the players up to radius positions above and below a player"""
+        def read(board):
+            keys = self._keys.get(player_id)
+            if keys is None:
+                return None
+            position = board.index(keys[METRICS.index(metric)])
+            return [self._entry(board, key)
+                    for key in board.slice(position - radius, position + radius + 1)]
+        return self._read(metric, read)
+
+    def size(self, metric):
+        """Number of players on the leaderboard"""
+        return self._read(metric, len)
+
+    def stats(self):
+        """Rebuild/update counters and size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['players'] = len(self._keys)
+            stats['loaded'] = self._boards is not None
+            stats['version'] = self._version
+        return stats
@@ -0,0 +1,107 @@
+"""Maintenance commands for the Sport Player Management System database.
+
+Usage:
+    python manage.py check-plans [--db sports_management.db]
+    python manage.py check-team-stats [--db sports_management.db]
+    python manage.py rebuild-team-stats [--db sports_management.db]
+    python manage.py check-season-stats [--db sports_management.db]
+    python manage.py rebuild-season-stats [--db sports_management.db]
+    python manage.py seed [--teams 50] [--players 10000] [--seed 0] [--db sports_management.db]
+"""
+import argparse
+import sys
+import time
+
+from database import Database, QueryPlanError
+
+
+def check_plans(db, args):
+    """Fail if any hot query falls back to a full table scan or a sort"""
+    try:
+        report = db.verify_query_plans()
+    except QueryPlanError as e:
+        print(e, file=sys.stderr)
+        return 1
+    for entry in report:
+        print(f"{entry['query']}: {' | '.join(entry['plan'])}")
+    print('All query plans OK')
+    return 0
+
+
+def check_team_stats(db, args):
+    """Fail if the materialized team_stats table has drifted from the players"""
+    mismatches = db.check_team_stats()
+    for mismatch in mismatches:
+        print(f"team {mismatch['team_id']}: stored {mismatch['stored']}, "
+              f"expected {mismatch['expected']}", file=sys.stderr)
+    if mismatches:
+        print(f'{len(mismatches)} team(s) out of date; run rebuild-team-stats', file=sys.stderr)
+        return 1
+    print('Team statistics OK')
+    return 0
+
+
+def rebuild_team_stats(db, args):
+    """Recompute the materialized team_stats table from scratch"""
+    result = db.rebuild_team_stats()
+    print(result['message'])
+    return 0 if result['success'] else 1
+
+
+def check_season_stats(db, args):
+    """Fail if the season rollups or the players' totals have drifted from match_stats"""
+    mismatches = db.check_season_stats()
+    for mismatch in mismatches:
+        key = ', '.join(str(part) for part in mismatch['key'])
+        print(f"{mismatch['table']} ({key}): stored {mismatch['stored']}, "
+              f"expected {mismatch['expected']}", file=sys.stderr)
+    if mismatches:
+        print(f'{len(mismatches)} row(s) out of date; run rebuild-season-stats', file=sys.stderr)
+        return 1
+    print('Season statistics OK')
+    return 0
+
+
+def rebuild_season_stats(db, args):
+    """Recompute the season rollups and the players' totals from match_stats"""
+    result = db.rebuild_season_stats()
+    print(result['message'])
+    return 0 if result['success'] else 1
+
+
+def seed(db, args):
+    """Add reproducible synthetic teams and players for load testing"""
+    started = time.perf_counter()
+    result = db.add_synthetic_data(args.teams, args.players, seed=args.seed)
+    print(f"{result['message']} in {time.perf_counter() - started:.1f}s")
+    return 0 if result['success'] else 1
+
+
+COMMANDS = {
+    'check-plans': check_plans,
+    'check-team-stats': check_team_stats,
+    'rebuild-team-stats': rebuild_team_stats,
+    'check-season-stats': check_season_stats,
+    'rebuild-season-stats': rebuild_season_stats,
+    'seed': seed,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Database maintenance commands')
+    parser.add_argument('command', choices=sorted(COMMANDS))
+    parser.add_argument('--db', default='sports_management.db', help='Path to the SQLite database')
+    parser.add_argument('--teams', type=int, default=50, help='seed: number of teams to add')
+    parser.add_argument('--players', type=int, default=10000, help='seed: number of players to add')
+    parser.add_argument('--seed', type=int, default=0, help='seed: random seed')
+    args = parser.parse_args(argv)
+
+    db = Database(args.db)
+    try:
+        return COMMANDS[args.command](db, args)
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,406 @@
+import contextvars
+import logging
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+from flask import g, request
+
+import database
+from serializers import FastJSONProvider
+
+# Upper bounds, in seconds, of the latency histogram buckets
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 2.5)
+
+# Statements at least this slow are logged and kept for /api/metrics/slow-queries
+SLOW_QUERY_MS = 100.0
+SLOW_QUERY_LOG_SIZE = 100
+
+# SQL that isn't one of database.py's named statements is labelled by its
+# (shortened) text; past this many distinct texts it is counted as "other"
+MAX_QUERY_LABELS = 200
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+slow_query_log = logging.getLogger('sports_management.slow_queries')
+
+# [route, statements, seconds] for the request being handled, if any
+_request_totals = contextvars.ContextVar('request_totals', default=None)
+
+_SQL_START = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE|WITH|REPLACE)\b', re.IGNORECASE)
+_SCHEMA = re.compile(r'\s*(CREATE|DROP|ALTER)\b', re.IGNORECASE)
+_PLACEHOLDERS = re.compile(r'\?(\s*,\s*\?)+')
+_named_statements = None
+
+
+def _statement_names():
+    """(sql, name) for database.py's SQL constants, longest first"""
+    global _named_statements
+    if _named_statements is None:
+        statements = [(value, name) for name, value in vars(database).items()
+                      if name.isupper() and isinstance(value, str) and _SQL_START.match(value)]
+        _named_statements = sorted(statements, key=lambda item: -len(item[0]))
+    return _named_statements
+
+
+def query_label(sql):
+    """(label, named) for a statement.
+
+    The label is the name of the database.py constant the statement was built
+    from (named=True), "schema" for DDL, else its text with whitespace and
+    placeholder lists collapsed.
+    """
+    for statement, name in _statement_names():
+        if sql.startswith(statement):
+            return name, True
+    if _SCHEMA.match(sql):
+        return 'schema', True
+    text = _PLACEHOLDERS.sub('?, ...', ' '.join(sql.split()))
+    return (text if len(text) <= 80 else text[:77] + '...'), False
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}  # label values -> total
+
+    def inc(self, values=(), amount=1):
+        self._values[values] = self._values.get(values, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for values, total in sorted(self._values.items()):
+            lines.append(f'{self.name}{_labels(self.labels, values)} {_number(total)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}  # label values -> [count per bucket..., +Inf count, sum]
+
+    def observe(self, values, seconds):
+        series = self._values.get(values)
+        if series is None:
+            series = self._values[values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, seconds)] += 1
+        series[-1] += seconds
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for values, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_labels(self.labels, values, le)} {cumulative}')
+            labels = _labels(self.labels, values)
+            lines.append(f'{self.name}_sum{labels} {_number(series[-1])}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's time and row count to its connection's Metrics.
+
+    A SELECT is timed from execute() until its rows run out, the cursor runs
+    another statement, or it is closed or garbage collected, so rows fetched
+    lazily are included. Other statements report their rowcount as soon as
+    execute() returns.
+    """
+
+    _sql = None
+
+    def _begin(self, sql, elapsed):
+        self._sql = sql
+        self._elapsed = elapsed
+        self._rows = 0
+        if self.description is None:
+            # Not a query: it has already run to completion
+            self._rows = max(self.rowcount, 0)
+            self._finish()
+
+    def _finish(self):
+        if self._sql is not None:
+            sql, self._sql = self._sql, None
+            self.connection.metrics.observe_query(sql, self._elapsed, self._rows)
+
+    def _fetched(self, started, rows, done):
+        if self._sql is not None:
+            self._elapsed += time.perf_counter() - started
+            self._rows += rows
+            if done:
+                self._finish()
+
+    def _run(self, method, sql, *args):
+        self._finish()
+        started = time.perf_counter()
+        try:
+            method(sql, *args)
+        except sqlite3.Error:
+            self.connection.metrics.observe_query(sql, time.perf_counter() - started, 0)
+            raise
+        self._begin(sql, time.perf_counter() - started)
+        return self
+
+    def execute(self, sql, parameters=()):
+        return self._run(super().execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(super().executemany, sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self._run(super().executescript, script)
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that times its statements and commits; see Metrics.connection_class"""
+
+    metrics = None
+
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection's shortcuts bypass an overridden cursor(), so they
+    # are routed through it explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self.metrics.observe_query('COMMIT', time.perf_counter() - started, 0)
+
+
+class TimedJSONProvider(FastJSONProvider):
+    """FastJSONProvider that records how long each response takes to encode"""
+
+    def __init__(self, app, metrics):
+        super().__init__(app)
+        self.metrics = metrics
+
+    def dumps(self, obj, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            self.metrics.observe_serialization(time.perf_counter() - started)
+
+
+class Metrics:
+    """Request, SQL and serialization timings in Prometheus text format.
+
+    install(app) times every request and JSON response of a Flask app;
+    connection_class, passed to Database(connection_factory=...), times
+    every SQL statement run through the pool. Statements slower than
+    slow_query_ms are also logged to the "sports_management.slow_queries"
+    logger. Each process keeps its own numbers.
+    """
+
+    def __init__(self, slow_query_ms=SLOW_QUERY_MS):
+        self.slow_query_ms = slow_query_ms
+        self._lock = threading.Lock()
+        self._request_duration = Histogram(
+            'http_request_duration_seconds', 'Time spent in the route handler',
+            ('method', 'route', 'status'), REQUEST_BUCKETS)
+        self._request_queries = Counter(
+            'http_request_queries_total', 'SQL statements run by route', ('method', 'route'))
+        self._request_query_time = Counter(
+            'http_request_query_seconds_total', 'Time spent in SQL by route', ('method', 'route'))
+        self._query_duration = Histogram(
+            'db_query_duration_seconds', 'SQL statement time, from execute to the last row',
+            ('query',), QUERY_BUCKETS)
+        self._query_rows = Counter(
+            'db_query_rows_total', 'Rows returned by queries or changed by writes', ('query',))
+        self._slow_queries = Counter(
+            'db_slow_queries_total', 'Statements slower than the slow query threshold', ('query',))
+        self._serialization = Histogram(
+            'json_serialization_duration_seconds', 'Time spent encoding JSON responses',
+            (), QUERY_BUCKETS)
+        self._query_labels = {}  # sql -> label
+        self._text_labels = set()  # labels that are not database.py statement names
+        self._slow_log = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self._collectors = []
+        # Bound to this instance, so a Database can be given the class alone
+        self.connection_class = type('TimedConnection', (TimedConnection,), {'metrics': self})
+
+    def install(self, app):
+        """Time every request and JSON response of app"""
+        app.json = TimedJSONProvider(app, self)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+
+    def add_collector(self, prefix, stats, counters=(), gauges=()):
+        """Export numbers from a stats() method at every scrape.
+
+        counters and gauges map keys of the dict stats() returns to metric
+        names, which get prefix (and _total for counters) added.
+        """
+        self._collectors.append((prefix, stats, dict(counters), dict(gauges)))
+
+    def _route(self):
+        return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+    def _before_request(self):
+        g.metrics_started = time.perf_counter()
+        _request_totals.set([self._route(), 0, 0.0])
+
+    def _record_request(self, status):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        route, statements, query_time = _request_totals.get() or (self._route(), 0, 0.0)
+        _request_totals.set(None)
+        with self._lock:
+            self._request_duration.observe((request.method, route, str(status)), elapsed)
+            self._request_queries.inc((request.method, route), statements)
+            self._request_query_time.inc((request.method, route), query_time)
+
+    def _after_request(self, response):
+        # Streamed bodies are produced after this, so they count as far as
+        # the first byte
+        self._record_request(response.status_code)
+        return response
+
+    def _teardown_request(self, exc):
+        # Only reached with the request unrecorded when the view raised
+        if exc is not None:
+            self._record_request(500)
+
+    def _label(self, sql):
+        label = self._query_labels.get(sql)
+        if label is None:
+            label, named = query_label(sql)
+            with self._lock:
+                if not named and label not in self._text_labels:
+                    if len(self._text_labels) >= MAX_QUERY_LABELS:
+                        label = 'other'
+                    else:
+                        self._text_labels.add(label)
+                if len(self._query_labels) < 10 * MAX_QUERY_LABELS:
+                    self._query_labels[sql] = label
+        return label
+
+    def observe_query(self, sql, seconds, rows):
+        """Record one finished SQL statement"""
+        label = self._label(sql)
+        totals = _request_totals.get()
+        if totals is not None:
+            totals[1] += 1
+            totals[2] += seconds
+        slow = seconds * 1000 >= self.slow_query_ms
+        with self._lock:
+            self._query_duration.observe((label,), seconds)
+            self._query_rows.inc((label,), rows)
+            if slow:
+                self._slow_queries.inc((label,))
+                self._slow_log.append({
+                    'query': label,
+                    'sql': ' '.join(sql.split())[:1000],
+                    'duration_ms': round(seconds * 1000, 3),
+                    'rows': rows,
+                    'route': totals[0] if totals is not None else None,
+                    'time': time.time(),
+                })
+        if slow:
+            slow_query_log.warning('slow query (%.1f ms, %d rows) %s: %s', seconds * 1000, rows,
+                                   label, ' '.join(sql.split())[:200])
+
+    def observe_serialization(self, seconds):
+        with self._lock:
+            self._serialization.observe((), seconds)
+
+    def slow_queries(self):
+        """The most recent slow statements, newest first"""
+        with self._lock:
+            return list(reversed(self._slow_log))
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        for prefix, stats, counters, gauges in self._collectors:
+            values = stats()
+            for key, name in counters.items():
+                lines += [f'# TYPE {prefix}_{name}_total counter',
+                          f'{prefix}_{name}_total {_number(values[key])}']
+            for key, name in gauges.items():
+                lines += [f'# TYPE {prefix}_{name} gauge', f'{prefix}_{name} {_number(values[key])}']
+        with self._lock:
+            for metric in (self._request_duration, self._request_queries,
+                           self._request_query_time, self._query_duration, self._query_rows,
+                           self._slow_queries, self._serialization):
+                lines += metric.render()
+        return '\n'.join(lines) + '\n'
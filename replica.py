@@ -0,0 +1,191 @@
+"""Read-only copy of the database for heavy read routes.
+
+The statistics and export routes scan whole tables. Pointing them at a copy
+taken with SQLite's online backup API keeps those scans off the primary
+file that add_player/update_player write to. The copy is refreshed every
+refresh_interval seconds. If it is ever more than max_staleness seconds
+old, reads go back to the primary until it is refreshed, so no response is
+built from older data than that.
+
+Each refresh backs up into a temporary file and os.replace()s it over the
+copy. Connections still reading the previous copy keep it until they are
+returned, and the replaced file is deleted once the last one closes. The
+file's mtime records when its snapshot was taken. Processes sharing a copy
+(serve.py workers) pick up one another's refreshes instead of each making
+their own.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from database import Database
+
+# Seconds between refreshes
+REFRESH_INTERVAL = 10.0
+# Oldest snapshot reads are served from, in seconds
+MAX_STALENESS = 30.0
+
+
+class Replica:
+    """Snapshot copy of db at path (default: <database file>.replica)"""
+
+    def __init__(self, db, path=None, refresh_interval=REFRESH_INTERVAL,
+                 max_staleness=MAX_STALENESS, pool_size=5):
+        self.db = db
+        self.path = path or f'{db.db_name}.replica'
+        self.refresh_interval = refresh_interval
+        self.max_staleness = max_staleness
+        self.pool_size = pool_size
+        self._lock = threading.Condition(threading.Lock())
+        # Serializes refreshes, which may take a while, apart from _lock
+        self._refresh_lock = threading.Lock()
+        self._reader = None  # read-only Database on the copy
+        self._taken_at = None  # time.time() the copy's snapshot was taken
+        self._inode = None
+        self._pid = os.getpid()
+        self._thread = None
+        self._closed = False
+        self._stats = {'refreshes': 0, 'unchanged': 0, 'reopens': 0, 'failures': 0,
+                       'refresh_time': 0.0, 'replica_reads': 0, 'primary_reads': 0}
+
+    def reader(self):
+        """Database for a heavy read: the copy if it is fresh enough, else the primary"""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited over a fork: the thread and connections stay behind
+                self._pid = os.getpid()
+                self._thread = None
+                self._reader = self._taken_at = self._inode = None
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='replica-refresh',
+                                                daemon=True)
+                self._thread.start()
+        # Without waiting for a refresh that is already under way
+        if self._age() > self.max_staleness and self._refresh_lock.acquire(blocking=False):
+            try:
+                self._reopen_if_newer()
+            finally:
+                self._refresh_lock.release()
+        with self._lock:
+            if self._reader is not None and self._age() <= self.max_staleness:
+                self._stats['replica_reads'] += 1
+                return self._reader
+            self._stats['primary_reads'] += 1
+            return self.db
+
+    def _age(self):
+        return float('inf') if self._taken_at is None else time.time() - self._taken_at
+
+    def _reopen_if_newer(self):
+        """Switch to a copy another process made since ours; True if the copy is current"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        if self._taken_at is not None and stat.st_mtime <= self._taken_at:
+            return False
+        if stat.st_ino == self._inode:
+            # Our own copy, found to be up to date by another process
+            with self._lock:
+                self._taken_at = stat.st_mtime
+        else:
+            self._open(stat)
+        return time.time() - stat.st_mtime < self.refresh_interval
+
+    def _open(self, stat):
+        # stat is taken before opening, so the copy opened is never older
+        # than the one it describes
+        reader = Database(self.path, pool_size=self.pool_size, read_only=True,
+                          connection_factory=self.db.pool.factory)
+        with self._lock:
+            previous, self._reader = self._reader, reader
+            self._taken_at = stat.st_mtime
+            self._inode = stat.st_ino
+            self._stats['reopens'] += 1
+        if previous is not None:
+            previous.close()
+
+    def refresh(self):
+        """Bring the copy up to date with the primary.
+
+        A copy another process took within the last refresh_interval seconds
+        is used as it is.
+        """
+        with self._refresh_lock:
+            if self._reopen_if_newer():
+                return
+            started = time.time()
+            versions = self.db.get_table_versions()
+            if self._reader is not None and self._reader.get_table_versions() == versions:
+                # Nothing was written since the copy was taken, so it is
+                # current as of now
+                if os.stat(self.path).st_ino == self._inode:
+                    os.utime(self.path, (started, started))
+                with self._lock:
+                    self._taken_at = started
+                    self._stats['unchanged'] += 1
+                return
+            temporary = f'{self.path}.{os.getpid()}.tmp'
+            source = self.db.get_connection()
+            try:
+                target = sqlite3.connect(temporary)
+                try:
+                    source.backup(target)
+                    # The copy is never written, so it needs no WAL files
+                    target.execute('PRAGMA journal_mode = DELETE')
+                finally:
+                    target.close()
+                os.utime(temporary, (started, started))
+                os.replace(temporary, self.path)
+            except BaseException:
+                try:
+                    os.unlink(temporary)
+                except OSError:
+                    pass
+                raise
+            finally:
+                source.close()
+            self._open(os.stat(self.path))
+            with self._lock:
+                self._stats['refreshes'] += 1
+                self._stats['refresh_time'] += time.time() - started
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if self._age() < self.refresh_interval:
+                    self._lock.wait(self.refresh_interval - self._age())
+                    continue
+            try:
+                self.refresh()
+            except (sqlite3.Error, OSError):
+                with self._lock:
+                    self._stats['failures'] += 1
+                    self._lock.wait(self.refresh_interval)
+
+    def close(self):
+        """Stop refreshing and close the copy's connections"""
+        with self._lock:
+            self._closed = True
+            self._lock.notify()
+            thread, reader = self._thread, self._reader
+            self._reader = None
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join()
+        if reader is not None:
+            reader.close()
+
+    def stats(self):
+        """Refresh counters, read routing and the copy's age in seconds"""
+        with self._lock:
+            stats = dict(self._stats)
+            available = self._reader is not None
+            stats['available'] = int(available)
+            stats['age'] = round(self._age(), 3) if available else 0.0
+            stats['refresh_interval'] = self.refresh_interval
+            stats['max_staleness'] = self.max_staleness
+            stats['path'] = self.path
+        return stats
@@ -0,0 +1,126 @@
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_NON_ASCII = re.compile(r'[^\x00-\x7f]')
+_EXPONENT = re.compile(rb'\d[eE]')
+
+
+def rows_to_dicts(rows):
+    """Convert sqlite3.Row objects to dicts keyed by their column names.
+
+    The column names are read once from the first row, so every row costs a
+    single dict(zip(...)) regardless of how many columns it has.
+    """
+    if not rows:
+        return []
+    keys = rows[0].keys()
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def rows_to_columns(rows):
+    """Row-major compact form: {"columns": [...], "rows": [[...], ...]}.
+
+    Column names are sent once instead of once per row.
+    """
+    if not rows:
+        return {'columns': [], 'rows': []}
+    return {'columns': rows[0].keys(), 'rows': [list(row) for row in rows]}
+
+
+def rows_to_arrays(rows):
+    """Column-major form: {column: [value per row], ...}"""
+    if not rows:
+        return {}
+    return {key: list(values) for key, values in zip(rows[0].keys(), zip(*rows))}
+
+
+def row_to_dict(row):
+    """Convert a single sqlite3.Row (or None) to a dict"""
+    if row is None:
+        return None
+    return dict(zip(row.keys(), row))
+
+
+def _escape_non_ascii(match):
+    code = ord(match.group())
+    if code < 0x10000:
+        return f'\\u{code:04x}'
+    code -= 0x10000
+    return f'\\u{0xd800 | (code >> 10):04x}\\u{0xdc00 | (code & 0x3ff):04x}'
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that uses orjson when it is installed.
+
+    The output is byte-for-byte what the default provider produces (sorted
+    keys, ASCII-only, compact or 2-space indented) for the values the API
+    returns: strings, ints, None and floats in ordinary ranges. Anything
+    orjson would format differently (NaN/Infinity, or options other than
+    the ones Flask itself uses) goes through the standard library instead.
+    """
+
+    def _orjson_options(self, kwargs):
+        if orjson is None or not self.sort_keys:
+            return None
+        indent = kwargs.pop('indent', None)
+        separators = kwargs.pop('separators', None)
+        kwargs.pop('default', None)
+        kwargs.pop('ensure_ascii', None)
+        if kwargs:
+            return None
+        options = orjson.OPT_SORT_KEYS
+        if indent == 2:
+            return options | orjson.OPT_INDENT_2
+        if indent is None and separators == (',', ':'):
+            return options
+        return None
+
+    def _dumps_bytes(self, obj, **kwargs):
+        options = self._orjson_options(dict(kwargs))
+        if options is not None:
+            try:
+                data = orjson.dumps(obj, default=self.default, option=options)
+            except TypeError:
+                # e.g. integers wider than 64 bits
+                data = None
+            if data is not None and self._matches_stdlib(obj, data):
+                if self.ensure_ascii and not data.isascii():
+                    data = _NON_ASCII.sub(_escape_non_ascii, data.decode()).encode()
+                return data
+        return super().dumps(obj, **kwargs).encode()
+
+    @staticmethod
+    def _matches_stdlib(obj, data):
+        # orjson writes NaN/Infinity as null, and exponents as 1e16 rather
+        # than 1e+16. Both are rare enough to just check for.
+        if b'null' in data and _has_non_finite(obj):
+            return False
+        return _EXPONENT.search(data) is None
+
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, **kwargs).decode()
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            dump_args = {'indent': 2}
+        else:
+            dump_args = {'separators': (',', ':')}
+        return self._app.response_class(self._dumps_bytes(obj, **dump_args) + b'\n',
+                                         mimetype=self.mimetype)
+
+
+def _has_non_finite(obj):
+    if isinstance(obj, float):
+        return obj != obj or obj in (float('inf'), float('-inf'))
+    if isinstance(obj, dict):
+        return any(_has_non_finite(value) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
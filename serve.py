@@ -0,0 +1,303 @@
+"""Pre-fork production launcher for the Player Management System.
+
+Usage:
+    python serve.py [--host 127.0.0.1] [--port 8000] [--workers N] [--db sports_management.db]
+                    [--max-requests 0] [--max-requests-jitter 0] [--graceful-timeout 30]
+                    [--metrics] [--slow-query-ms 100]
+                    [--replica] [--replica-refresh 10] [--replica-max-staleness 30]
+
+The master process binds the listening socket and forks --workers processes
+(default: one per core) that accept on it. The master never imports the app
+or opens the database itself: each worker imports app.py after the fork, so
+it owns its connection pool outright.
+
+Signals sent to the master:
+    SIGHUP          graceful reload - start a fresh set of workers running the
+                    current code, then drain and stop the old ones
+    SIGTERM/SIGINT  graceful shutdown - stop accepting, finish in-flight
+                    requests, exit
+
+A worker that has served --max-requests requests (plus up to
+--max-requests-jitter more, so they don't all restart together) exits after
+finishing them and is replaced.
+"""
+import argparse
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+
+# Idle keep-alive connections are dropped after this many seconds, which also
+# bounds how long a draining worker waits for them
+KEEPALIVE_TIMEOUT = 5
+
+# Replacement workers are started no faster than this after a failed start
+RESPAWN_BACKOFF = 1.0
+
+
+def log(message):
+    print(f'[serve {os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+def run_worker(listener, host, port, max_requests):
+    """Serve requests on the inherited socket until told to stop; never returns"""
+    status = 0
+    try:
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGCHLD):
+            signal.signal(signum, signal.SIG_DFL)
+
+        # Imported after the fork: every worker opens its own database handles
+        import app as application
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class RequestHandler(WSGIRequestHandler):
+            timeout = KEEPALIVE_TIMEOUT
+
+            def log_request(self, *args, **kwargs):
+                pass
+
+        served = 0
+        lock = threading.Lock()
+        server = None
+
+        def stop():
+            def shut_down():
+                # Change streams never finish on their own and would hold the
+                # drain open; ended, their clients reconnect and resume
+                application.change_feed.close()
+                server.shutdown()
+            threading.Thread(target=shut_down, daemon=True).start()
+
+        def wsgi_app(environ, start_response):
+            nonlocal served
+            with lock:
+                served += 1
+                recycle = max_requests and served == max_requests
+            if recycle:
+                log(f'served {served} requests, recycling')
+                stop()
+            return application.app.wsgi_app(environ, start_response)
+
+        server = make_server(host, port, wsgi_app, threaded=True,
+                             request_handler=RequestHandler, fd=listener.fileno())
+        # Let server_close() wait for in-flight requests instead of killing them
+        server.daemon_threads = False
+        listener.close()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop())
+        log('worker ready')
+        server.serve_forever()
+        # os._exit() below skips atexit, so flush queued writes explicitly
+        application.shutdown()
+    except BaseException as e:
+        log(f'worker failed: {e!r}')
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Never fall back into the master's code
+        os._exit(status)
+
+
+def preflight():
+    """Create/migrate the schema and check query plans in a throwaway child.
+
+    Doing this once before forking workers keeps them from racing to run the
+    same migrations, and a child keeps the master free of database handles
+    and of imported app code (which a reload would otherwise not pick up).
+    """
+    pid = os.fork()
+    if pid == 0:
+        status = 0
+        try:
+            from database import Database
+            db = Database(os.environ.get('SPORTS_MANAGEMENT_DB', 'sports_management.db'))
+            db.verify_query_plans()
+            db.close()
+        except BaseException as e:
+            log(f'preflight failed: {e}')
+            status = 1
+        finally:
+            os._exit(status)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status) == 0
+
+
+class Master:
+    def __init__(self, listener, host, port, workers, max_requests, max_requests_jitter,
+                 graceful_timeout):
+        self.listener = listener
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.generation = 0
+        self.workers = {}  # pid -> generation
+        self.stopping = {}  # pid -> time SIGTERM was sent
+        self.reload_requested = False
+        self.shutdown_requested = False
+        self.last_failure = 0.0
+        # Signal handlers only set flags; the wakeup pipe interrupts the wait
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        os.set_blocking(self.wakeup_write, False)
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._on_reload)
+        signal.signal(signal.SIGTERM, self._on_shutdown)
+        signal.signal(signal.SIGINT, self._on_shutdown)
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+        signal.set_wakeup_fd(self.wakeup_write)
+        if not preflight():
+            return 1
+        log(f'listening on http://{self.host}:{self.port} with {self.num_workers} workers')
+        while True:
+            self._wait(1.0)
+            self._reap()
+            if self.shutdown_requested:
+                for pid in self.workers:
+                    self._stop_worker(pid)
+                self._kill_stragglers()
+                if not self.workers:
+                    log('shut down')
+                    return 0
+                continue
+            if self.reload_requested:
+                self.reload_requested = False
+                self._reload()
+            self._spawn_missing()
+            self._kill_stragglers()
+
+    def _wait(self, timeout):
+        try:
+            select.select([self.wakeup_read], [], [], timeout)
+            while os.read(self.wakeup_read, 512):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _on_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _on_shutdown(self, signum, frame):
+        self.shutdown_requested = True
+
+    def _reload(self):
+        log('reloading')
+        if not preflight():
+            log('reload aborted, keeping the current workers')
+            return
+        self.generation += 1
+        self._spawn_missing()
+        for pid, generation in list(self.workers.items()):
+            if generation < self.generation:
+                self._stop_worker(pid)
+
+    def _spawn_missing(self):
+        current = sum(1 for pid, generation in self.workers.items()
+                      if generation == self.generation and pid not in self.stopping)
+        if current < self.num_workers and time.monotonic() - self.last_failure < RESPAWN_BACKOFF:
+            return
+        for _ in range(self.num_workers - current):
+            self._spawn()
+
+    def _spawn(self):
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        pid = os.fork()
+        if pid == 0:
+            os.close(self.wakeup_read)
+            os.close(self.wakeup_write)
+            run_worker(self.listener, self.host, self.port, max_requests)
+        self.workers[pid] = self.generation
+
+    def _stop_worker(self, pid):
+        if pid not in self.stopping:
+            self.stopping[pid] = time.monotonic()
+            self._signal(pid, signal.SIGTERM)
+
+    def _kill_stragglers(self):
+        now = time.monotonic()
+        for pid, since in self.stopping.items():
+            if now - since > self.graceful_timeout:
+                log(f'worker {pid} did not stop in {self.graceful_timeout:g}s, killing it')
+                self._signal(pid, signal.SIGKILL)
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.workers.pop(pid, None)
+            expected = self.stopping.pop(pid, None) is not None
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0 and not expected:
+                log(f'worker {pid} exited with status {code}')
+                self.last_failure = time.monotonic()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--db', help='database file (default: $SPORTS_MANAGEMENT_DB or '
+                                     'sports_management.db)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='serve request and SQL timings at /metrics (per worker)')
+    parser.add_argument('--slow-query-ms', type=float,
+                        help='log statements at least this slow (default 100, needs --metrics)')
+    parser.add_argument('--replica', action='store_true',
+                        help='serve statistics and exports from a periodically refreshed copy')
+    parser.add_argument('--replica-refresh', type=float,
+                        help='seconds between replica refreshes (default 10)')
+    parser.add_argument('--replica-max-staleness', type=float,
+                        help='read from the primary when the replica is older than this '
+                             '(default 30)')
+    parser.add_argument('--max-requests', type=int, default=0,
+                        help='recycle a worker after this many requests (0: never)')
+    parser.add_argument('--max-requests-jitter', type=int, default=0)
+    parser.add_argument('--graceful-timeout', type=float, default=30.0,
+                        help='seconds a stopping worker gets to finish its requests')
+    args = parser.parse_args()
+    if args.db:
+        os.environ['SPORTS_MANAGEMENT_DB'] = args.db
+    if args.metrics:
+        os.environ['SPORTS_MANAGEMENT_METRICS'] = '1'
+    if args.slow_query_ms is not None:
+        os.environ['SPORTS_MANAGEMENT_SLOW_QUERY_MS'] = str(args.slow_query_ms)
+    if args.replica:
+        os.environ['SPORTS_MANAGEMENT_REPLICA'] = '1'
+    if args.replica_refresh is not None:
+        os.environ['SPORTS_MANAGEMENT_REPLICA_REFRESH'] = str(args.replica_refresh)
+    if args.replica_max_staleness is not None:
+        os.environ['SPORTS_MANAGEMENT_REPLICA_MAX_STALENESS'] = str(args.replica_max_staleness)
+
+    listener = socket.create_server((args.host, args.port), backlog=2048)
+    listener.set_inheritable(True)
+    master = Master(listener, args.host, listener.getsockname()[1], args.workers,
+                    args.max_requests, args.max_requests_jitter, args.graceful_timeout)
+    return master.run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,6 +2,12 @@
 let currentTeams = [];
 let currentPlayers = [];
 
+// Live updates (see LIVE UPDATES below)
+let changeFeed = null;
+let changeFeedReady = false;
+let pendingChanges = [];
+let summaryRefreshTimer = null;
+
 // Navigation
 document.addEventListener('DOMContentLoaded', function() {
     // Setup navigation
@@ -39,10 +45,10 @@ document.addEventListener('DOMContentLoaded', function() {
     document.getElementById('teamForm').addEventListener('submit', handleTeamSubmit);
     document.getElementById('playerForm').addEventListener('submit', handlePlayerSubmit);
 
-    // Initial load
+    // Initial load; the teams and players lists are loaded once the change
+    // feed is connected, so no edit can slip in between
     loadDashboard();
-    loadTeams();
-    loadPlayers();
+    connectChangeFeed();
 });
 
 // Section Navigation
@@ -63,9 +69,9 @@ function showSection(sectionId) {
     if (sectionId === 'dashboard') {
         loadDashboard();
     } else if (sectionId === 'teams') {
-        loadTeams();
+        if (!changeFeedReady) loadTeams();
     } else if (sectionId === 'players') {
-        loadPlayers();
+        if (!changeFeedReady) loadPlayers();
     } else if (sectionId === 'rankings') {
         loadRankings();
     } else if (sectionId === 'statistics') {
@@ -89,22 +95,15 @@ function showStatsTab(tabId) {
 // DASHBOARD
 async function loadDashboard() {
     try {
-        const [teams, players] = await Promise.all([
-            fetch('/api/teams').then(r => r.json()),
-            fetch('/api/players').then(r => r.json())
-        ]);
-
-        const totalGoals = players.reduce((sum, p) => sum + (p.goals || 0), 0);
-        const totalAssists = players.reduce((sum, p) => sum + (p.assists || 0), 0);
+        // Counts, totals and top players in one small response
+        const summary = await fetch('/api/dashboard?top=5').then(r => r.json());
 
-        document.getElementById('totalTeams').textContent = teams.length;
-        document.getElementById('totalPlayers').textContent = players.length;
-        document.getElementById('totalGoals').textContent = totalGoals;
-        document.getElementById('totalAssists').textContent = totalAssists;
+        document.getElementById('totalTeams').textContent = summary.total_teams;
+        document.getElementById('totalPlayers').textContent = summary.total_players;
+        document.getElementById('totalGoals').textContent = summary.total_goals;
+        document.getElementById('totalAssists').textContent = summary.total_assists;
 
-        // Load top players
-        const topPlayers = await fetch('/api/players/top/5').then(r => r.json());
-        displayTopPlayers(topPlayers);
+        displayTopPlayers(summary.top_players);
     } catch (error) {
         console.error('Error loading dashboard:', error);
     }
@@ -168,8 +167,12 @@ function displayTeams(teams) {
         return;
     }
 
-    tbody.innerHTML = teams.map(team => `
-        <tr>
+    tbody.innerHTML = teams.map(teamRow).join('');
+}
+
+function teamRow(team) {
+    return `
+        <tr data-id="${team.team_id}">
             <td>${team.team_id}</td>
             <td><strong>${team.team_name}</strong></td>
             <td>${team.coach_name || '-'}</td>
@@ -181,7 +184,7 @@ function displayTeams(teams) {
                 <button class="btn-danger" onclick="deleteTeam(${team.team_id})">Delete</button>
             </td>
         </tr>
-    `).join('');
+    `;
 }
 
 // PLAYERS
@@ -204,8 +207,12 @@ function displayPlayers(players) {
         return;
     }
 
-    tbody.innerHTML = players.map(player => `
-        <tr>
+    tbody.innerHTML = players.map(playerRow).join('');
+}
+
+function playerRow(player) {
+    return `
+        <tr data-id="${player.player_id}">
             <td>${player.player_id}</td>
             <td><strong>${player.first_name} ${player.last_name}</strong></td>
             <td>${player.team_name || 'No Team'}</td>
@@ -221,7 +228,7 @@ function displayPlayers(players) {
                 <button class="btn-danger" onclick="deletePlayer(${player.player_id})">Delete</button>
             </td>
         </tr>
-    `).join('');
+    `;
 }
 
 async function searchPlayers(searchTerm) {
@@ -324,7 +331,170 @@ function displayTeamStats(stats) {
     `).join('');
 }
 
+// LIVE UPDATES
+// /api/changes/stream pushes every changed row. The teams and players tables
+// are patched in place; only the small aggregate views (dashboard, rankings,
+// statistics) are re-fetched, and only while they are on screen.
+function connectChangeFeed() {
+    if (!window.EventSource) {
+        loadTeams();
+        loadPlayers();
+        return;
+    }
+    changeFeed = new EventSource('/api/changes/stream');
+    changeFeed.addEventListener('ready', () => {
+        // A reconnect resumes from the last event seen, so only the first
+        // connection needs to load the lists
+        if (!changeFeedReady) syncLists();
+    });
+    changeFeed.addEventListener('reset', () => {
+        // Too far behind to catch up; start over from fresh lists
+        changeFeedReady = false;
+        syncLists();
+    });
+    changeFeed.addEventListener('change', e => queueChange(JSON.parse(e.data)));
+    changeFeed.addEventListener('reload', e => queueChange(JSON.parse(e.data)));
+    changeFeed.addEventListener('error', () => {
+        // The browser retries a dropped connection by itself and resumes
+        // where it stopped. A feed it gave up on (the server refused the
+        // stream) falls back to re-fetching after each edit.
+        if (changeFeed.readyState === EventSource.CLOSED) {
+            changeFeedReady = false;
+            loadTeams();
+            loadPlayers();
+        }
+    });
+}
+
+async function syncLists() {
+    pendingChanges = [];
+    await Promise.all([loadTeams(), loadPlayers()]);
+    changeFeedReady = true;
+    // Changes that arrived while loading; re-applying one the lists already
+    // include is harmless, since every change carries the whole row
+    pendingChanges.splice(0).forEach(applyChange);
+}
+
+function queueChange(change) {
+    if (changeFeedReady) {
+        applyChange(change);
+    } else {
+        pendingChanges.push(change);
+    }
+}
+
+function applyChange(change) {
+    // match_stats writes come with a players change of their own
+    if (change.table !== 'players' && change.table !== 'teams') return;
+    if (change.id === undefined) {
+        // A bulk write touched an unknown set of rows
+        loadPlayers();
+        if (change.table === 'teams') loadTeams();
+    } else if (change.table === 'players') {
+        patchPlayer(change.id, change.row);
+    } else if (change.table === 'teams') {
+        patchTeam(change.id, change.row);
+    }
+    scheduleSummaryRefresh();
+}
+
+// Without a live change feed, re-fetch what a write changed
+function refreshAfterWrite(...loaders) {
+    if (!changeFeedReady) loaders.forEach(load => load());
+}
+
+function scheduleSummaryRefresh() {
+    clearTimeout(summaryRefreshTimer);
+    summaryRefreshTimer = setTimeout(() => {
+        const active = document.querySelector('.content-section.active');
+        if (!active) return;
+        if (active.id === 'dashboard') {
+            loadDashboard();
+        } else if (active.id === 'rankings') {
+            loadRankings();
+        } else if (active.id === 'statistics') {
+            loadStatistics();
+        }
+    }, 500);
+}
+
+function patchTeam(teamId, team) {
+    currentTeams = currentTeams.filter(t => t.team_id !== teamId);
+    const position = team ? insertSorted(currentTeams, team,
+        (a, b) => a.team_name < b.team_name ? -1 : a.team_name > b.team_name ? 1 : 0) : -1;
+    patchRow('teamsTableBody', teamId, team && teamRow(team), position, currentTeams, displayTeams);
+
+    // Players show their team's name
+    currentPlayers.filter(p => p.team_id === teamId).forEach(player => {
+        patchPlayer(player.player_id, {...player, team_name: team ? team.team_name : null});
+    });
+}
+
+function patchPlayer(playerId, player) {
+    currentPlayers = currentPlayers.filter(p => p.player_id !== playerId);
+    const position = player ? insertSorted(currentPlayers, player,
+        (a, b) => b.ranking - a.ranking) : -1;
+
+    const search = document.getElementById('playerSearch');
+    if (search && search.value.trim() !== '') {
+        // The table shows search results: update or drop rows already in it
+        const row = document.querySelector(`#playersTableBody tr[data-id="${playerId}"]`);
+        if (row && player) {
+            row.outerHTML = playerRow(player);
+        } else if (row) {
+            row.remove();
+        }
+        return;
+    }
+    patchRow('playersTableBody', playerId, player && playerRow(player), position,
+             currentPlayers, displayPlayers);
+}
+
+// Insert item into an already sorted array; returns its index
+function insertSorted(items, item, compare) {
+    let position = items.findIndex(other => compare(item, other) < 0);
+    if (position === -1) position = items.length;
+    items.splice(position, 0, item);
+    return position;
+}
+
+// Replace, move or remove one table row, leaving the others untouched
+function patchRow(tbodyId, id, html, position, items, redraw) {
+    const tbody = document.getElementById(tbodyId);
+    const existing = tbody.querySelector(`tr[data-id="${id}"]`);
+    if (existing) existing.remove();
+    if (!tbody.querySelector('tr[data-id]')) {
+        // Was or becomes empty: let the full render handle the empty state
+        redraw(items);
+        return;
+    }
+    if (html) {
+        const template = document.createElement('tbody');
+        template.innerHTML = html.trim();
+        tbody.insertBefore(template.firstElementChild, tbody.children[position] || null);
+    }
+}
+
 // TEAM MODAL
+// GETs several API paths in one round trip (/api/batch); resolves to their
+// bodies in the same order, or rejects if any of them failed
+async function fetchBatch(paths) {
+    const response = await fetch('/api/batch', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({requests: paths})
+    });
+    const result = await response.json();
+    if (!response.ok) {
+        throw new Error(result.error);
+    }
+    const failed = result.responses.find(r => r.status !== 200);
+    if (failed) {
+        throw new Error(`${failed.path}: ${failed.body.error}`);
+    }
+    return result.responses.map(r => r.body);
+}
+
 function showTeamModal() {
     document.getElementById('teamModalTitle').textContent = 'Add Team';
     document.getElementById('teamForm').reset();
@@ -384,8 +554,7 @@ async function handleTeamSubmit(e) {
         if (result.success) {
             showNotification(result.message, 'success');
             closeTeamModal();
-            loadTeams();
-            loadPlayers(); // Refresh to update team names
+            refreshAfterWrite(loadTeams, loadPlayers); // Players show team names
         } else {
             showNotification(result.message, 'error');
         }
@@ -409,8 +578,7 @@ async function deleteTeam(teamId) {
         
         if (result.success) {
             showNotification(result.message, 'success');
-            loadTeams();
-            loadPlayers(); // Refresh to update team names
+            refreshAfterWrite(loadTeams, loadPlayers); // Players show team names
         } else {
             showNotification(result.message, 'error');
         }
@@ -436,9 +604,9 @@ function closePlayerModal() {
     document.getElementById('playerModal').style.display = 'none';
 }
 
-async function loadTeamsDropdown() {
+async function loadTeamsDropdown(teams) {
     try {
-        const teams = await fetch('/api/teams').then(r => r.json());
+        teams = teams || await fetch('/api/teams').then(r => r.json());
         const select = document.getElementById('playerTeam');
         
         select.innerHTML = '<option value="">Select Team</option>';
@@ -455,9 +623,9 @@ async function loadTeamsDropdown() {
 
 async function editPlayer(playerId) {
     try {
-        const player = await fetch(`/api/players/${playerId}`).then(r => r.json());
+        const [player, teams] = await fetchBatch([`/api/players/${playerId}`, '/api/teams']);
         
-        await loadTeamsDropdown();
+        await loadTeamsDropdown(teams);
         
         document.getElementById('playerModalTitle').textContent = 'Edit Player';
         document.getElementById('playerId').value = player.player_id;
@@ -517,8 +685,7 @@ async function handlePlayerSubmit(e) {
         if (result.success) {
             showNotification(result.message, 'success');
             closePlayerModal();
-            loadPlayers();
-            loadDashboard(); // Refresh dashboard stats
+            refreshAfterWrite(loadPlayers, loadDashboard);
         } else {
             showNotification(result.message, 'error');
         }
@@ -542,8 +709,7 @@ async function deletePlayer(playerId) {
         
         if (result.success) {
             showNotification(result.message, 'success');
-            loadPlayers();
-            loadDashboard(); // Refresh dashboard stats
+            refreshAfterWrite(loadPlayers, loadDashboard);
         } else {
             showNotification(result.message, 'error');
         }
@@ -599,10 +765,7 @@ async function loadSampleData() {
         
         if (result.success) {
             showNotification(result.message, 'success');
-            // Reload all data
-            loadDashboard();
-            loadTeams();
-            loadPlayers();
+            refreshAfterWrite(loadDashboard, loadTeams, loadPlayers);
         } else {
             showNotification(result.message, 'error');
         }
@@ -626,10 +789,7 @@ async function clearAllData() {
         
         if (result.success) {
             showNotification(result.message, 'success');
-            // Reload all data
-            loadDashboard();
-            loadTeams();
-            loadPlayers();
+            refreshAfterWrite(loadDashboard, loadTeams, loadPlayers);
         } else {
             showNotification(result.message, 'error');
         }
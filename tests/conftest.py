@@ -0,0 +1,56 @@
+"""Shared fixtures and helpers for the test suite"""
+import os
+
+import pytest
+
+from database import Database
+
+PLAYER_COLUMNS = ('first_name', 'last_name', 'team_id', 'position', 'jersey_number', 'age',
+                  'height', 'weight', 'ranking', 'goals', 'assists', 'matches_played')
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def teams(db):
+    return [db.add_team(f'Team {i}', 'Coach', 1900 + i, 'City', 'Stadium')['id'] for i in range(3)]
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app module, on its own database for the whole session"""
+    os.environ['SPORTS_MANAGEMENT_DB'] = str(tmp_path_factory.mktemp('app') / 'app.db')
+    import app
+    yield app
+    app.shutdown()
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def add_player(db, team_id, ranking, first_name='Harry', last_name='Kane', goals=0):
+    return db.add_player(first_name, last_name, team_id, 'Forward', 9, 25, 185.0, 80.0,
+                         ranking, goals, 0, 1)['id']
+
+
+def player_values(db, player_id, **changes):
+    row = db.get_player_by_id(player_id)
+    return {name: changes.get(name, row[name]) for name in PLAYER_COLUMNS}
+
+
+def all_pages(fetch, limit):
+    rows, cursor, pages = [], None, 0
+    while True:
+        page, cursor = fetch(limit, cursor)
+        rows.extend(row['player_id'] for row in page)
+        pages += 1
+        assert pages < 100
+        if cursor is None:
+            return rows
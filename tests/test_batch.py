@@ -0,0 +1,50 @@
+import threading
+
+from conftest import add_player
+
+
+def test_lookup_by_ids_keeps_order_and_skips_unknown(db, teams):
+    players = [add_player(db, teams[0], i) for i in range(3)]
+    wanted = [players[2], 9999, players[0]]
+    assert [row['player_id'] for row in db.get_players_by_ids(wanted)] == [players[2], players[0]]
+    assert [row['team_id'] for row in db.get_teams_by_ids([teams[1], 9999, teams[0]])] == [
+        teams[1], teams[0]]
+    assert db.get_players_by_ids([]) == []
+
+
+def test_lookup_by_ids_spans_parameter_batches(db, teams):
+    players = [add_player(db, teams[0], i) for i in range(1200)]
+    wanted = players[::-1] + [0]
+    assert [row['player_id'] for row in db.get_players_by_ids(wanted)] == players[::-1]
+
+
+def test_batch_reads_one_snapshot(client, app_module, monkeypatch):
+    run_subrequest = app_module.run_subrequest
+    calls = []
+
+    def write_between(path):
+        if calls:
+            # Another request's write commits between the two sub-requests
+            writer = threading.Thread(target=app_module.db.add_team,
+                                      args=('Snapshot FC', 'Coach', 1992, 'City', 'Ground'))
+            writer.start()
+            writer.join()
+            app_module.response_cache.clear()
+        calls.append(path)
+        return run_subrequest(path)
+
+    monkeypatch.setattr(app_module, 'run_subrequest', write_between)
+    response = client.post('/api/batch', json={'requests': ['/api/teams', '/api/teams']})
+    assert response.status_code == 200
+    first, second = response.get_json()['responses']
+    assert first['status'] == second['status'] == 200
+    assert first['body'] == second['body']
+    assert 'Snapshot FC' not in [team['team_name'] for team in second['body']]
+    assert 'Snapshot FC' in [team['team_name'] for team in client.get('/api/teams').get_json()]
+
+
+def test_batch_rejects_bad_requests(client, app_module):
+    assert client.post('/api/batch', json={'requests': 'api/teams'}).status_code == 400
+    assert client.post('/api/batch', json={'requests': ['api/teams']}).status_code == 400
+    paths = ['/api/teams'] * (app_module.MAX_BATCH_REQUESTS + 1)
+    assert client.post('/api/batch', json={'requests': paths}).status_code == 400
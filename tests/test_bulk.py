@@ -0,0 +1,76 @@
+import io
+
+import pytest
+
+import bulk
+from conftest import add_player
+
+
+def test_bulk_upsert_players_reports_bad_rows(db, teams):
+    existing = add_player(db, teams[0], 3)
+    records = [
+        {'first_name': 'Bukayo', 'last_name': 'Saka', 'team_id': teams[1], 'ranking': 8},
+        {'first_name': 'No', 'team_id': teams[1]},
+        {'player_id': existing, 'first_name': 'Harry', 'last_name': 'Kane', 'goals': 30},
+        {'first_name': 'Bad', 'last_name': 'Age', 'age': 'old'},
+        ValueError('Invalid JSON'),
+    ]
+    rows = list(bulk.rows(enumerate(records, start=1), 'players'))
+    # Passes validation but violates NOT NULL, so the chunk is replayed row by row
+    rows.append((6, (None, None, 'Nobody', teams[0], '', 0, 0, 0.0, 0.0, 0, 0, 0, 0)))
+    result = db.bulk_upsert_players(rows, chunk_size=3)
+    assert result['upserted'] == 2
+    assert result['failed'] == 4
+    assert [error['row'] for error in result['errors']] == [2, 4, 5, 6]
+    assert not result['success']
+    assert db.get_player_by_id(existing)['goals'] == 30
+    assert [row['last_name'] for row in db.search_players('saka')] == ['Saka']
+    assert db.check_team_stats() == []
+
+
+def test_bulk_upsert_teams_reports_duplicate_names(db, teams):
+    records = [
+        {'team_name': 'New Team', 'founded_year': 2001},
+        {'team_id': teams[1], 'team_name': 'Team 0'},
+        {'team_id': teams[2], 'team_name': 'Renamed'},
+    ]
+    result = db.bulk_upsert_teams(bulk.rows(enumerate(records, start=1), 'teams'))
+    assert result['upserted'] == 2
+    assert [error['row'] for error in result['errors']] == [2]
+    assert db.get_team_by_id(teams[1])['team_name'] == 'Team 1'
+    assert db.get_team_by_id(teams[2])['team_name'] == 'Renamed'
+
+
+@pytest.mark.parametrize('fmt, body', [
+    ('json', b'[{"team_name": "A"}, 3, {"team_name": "B"}, {"team_na'),
+    ('ndjson', b'{"team_name": "A"}\n3\n{"team_name": "B"}\n{"team_na\n'),
+])
+def test_iter_records_reports_bad_rows(monkeypatch, fmt, body):
+    # Records straddle read boundaries
+    monkeypatch.setattr(bulk, 'CHUNK_SIZE', 5)
+    records = list(bulk.iter_records(io.BytesIO(body), fmt))
+    assert [row_number for row_number, record in records] == [1, 2, 3, 4]
+    assert [record['team_name'] for row_number, record in records
+            if not isinstance(record, Exception)] == ['A', 'B']
+    assert isinstance(records[1][1], ValueError) and isinstance(records[3][1], ValueError)
+
+
+def test_rows_validates_and_applies_defaults():
+    records = [
+        {'first_name': 'Harry', 'last_name': 'Kane', 'age': '31', 'height': 188},
+        {'first_name': 'Harry'},
+        {'first_name': 'Harry', 'last_name': 'Kane', 'goals': 1.5},
+        {'team_name': 'Spurs', 'founded_year': '1882.0'},
+    ]
+    rows = list(bulk.rows(enumerate(records[:3], start=1), 'players'))
+    assert rows[0] == (1, (None, 'Harry', 'Kane', None, '', 0, 31, 188.0, 0.0, 0, 0, 0, 0))
+    assert str(rows[1][1]) == 'last_name is required'
+    assert str(rows[2][1]) == 'goals must be of type int'
+    assert list(bulk.rows([(1, records[3])], 'teams')) == [(1, (None, 'Spurs', '', 1882, '', ''))]
+
+
+def test_csv_empty_cells_use_defaults():
+    body = b'\xef\xbb\xbffirst_name,last_name,goals\nHarry,Kane,\nBukayo,Saka,7,extra\n'
+    records = list(bulk.iter_records(io.BytesIO(body), 'csv'))
+    assert records[0] == (1, {'first_name': 'Harry', 'last_name': 'Kane'})
+    assert isinstance(records[1][1], ValueError)
@@ -0,0 +1,54 @@
+from conftest import add_player, player_values
+
+
+def test_nothing_is_recorded_before_start(db, teams):
+    tracker = db.track_changes('players')
+    add_player(db, teams[0], 1)
+    assert tracker.changed_since(0) == (set(), True)
+
+
+def test_changed_since_collects_ids_per_version(db, teams):
+    tracker = db.track_changes('players')
+    tracker.start()
+    version = db.get_table_versions()['players']
+    first = add_player(db, teams[0], 1)
+    second = add_player(db, teams[0], 2)
+    assert tracker.changed_since(version) == ({first, second}, True)
+    tracker.forget(version + 1)
+    assert tracker.changed_since(version + 1) == ({second}, True)
+    # A version that was never recorded, as if another process wrote it
+    assert tracker.changed_since(version, version + 3) == ({second}, False)
+
+
+def test_catch_up_rereads_changed_rows(db, teams):
+    players = [add_player(db, teams[0], i) for i in range(20)]
+    tracker = db.track_changes('players')
+    tracker.start()
+    version = db.get_table_versions()['players']
+    db.update_player(players[3], **player_values(db, players[3], ranking=99))
+    db.delete_player(players[4])
+    read_at, ids, rows = tracker.catch_up(version, len(players), db.get_leaderboard_scores)
+    assert read_at == version + 2
+    assert ids == {players[3], players[4]}
+    assert [row[:2] for row in rows] == [(players[3], 99)]
+
+
+def test_catch_up_gives_up_on_large_or_unknown_changes(db, teams):
+    players = [add_player(db, teams[0], i) for i in range(20)]
+    tracker = db.track_changes('players')
+    tracker.start()
+    version = db.get_table_versions()['players']
+    for player_id in players[:3]:
+        db.update_player(player_id, **player_values(db, player_id, ranking=50))
+    # Re-reading 3 of 20 rows is more than RELOAD_FRACTION of them
+    assert tracker.catch_up(version, len(players), db.get_leaderboard_scores) is None
+    tracker.forget(db.get_table_versions()['players'])
+    version = db.get_table_versions()['players']
+    db.apply_stat_deltas({players[5]: (1, 0, 0)})
+    conn = db.get_connection()
+    conn.execute('UPDATE players SET ranking = 1')
+    conn.record_change('players', 'update')
+    conn.commit()
+    conn.close()
+    assert tracker.changed_since(version)[0] is None
+    assert tracker.catch_up(version, 1000, db.get_leaderboard_scores) is None
@@ -0,0 +1,74 @@
+import json
+import threading
+
+import pytest
+
+import bulk
+import changes
+from conftest import add_player, player_values
+
+
+@pytest.fixture
+def feed(db):
+    feed = changes.ChangeFeed(db, poll_interval=0.05)
+    yield feed
+    feed.close()
+
+
+def parse_events(chunk):
+    events = []
+    for block in chunk.decode().strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if ': ' in line)
+        if 'event' in fields:
+            events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_parse_since():
+    assert changes.parse_since(None) is None
+    assert changes.parse_since('') is None
+    assert changes.parse_since('12') == 12
+    for value in ('-1', 'abc'):
+        with pytest.raises(ValueError):
+            changes.parse_since(value)
+
+
+def test_read_sends_each_changed_row_once(db, teams, feed):
+    since = feed.read(None)[0]
+    player_id = add_player(db, teams[0], 1)
+    db.update_player(player_id, **player_values(db, player_id, ranking=8))
+    gone = add_player(db, teams[0], 2)
+    db.delete_player(gone)
+    latest, events = feed.read(since)
+    assert latest == db.get_latest_change_seq()
+    rows = [(data['table'], data['id'], data['op']) for event, data, seq in events]
+    assert rows == [('players', player_id, 'update'), ('players', gone, 'delete')]
+    assert events[0][1]['row']['ranking'] == 8
+    assert events[1][1]['row'] is None
+    assert feed.read(latest) == (latest, [])
+
+
+def test_bulk_write_sends_reload(db, teams, feed):
+    since = feed.read(None)[0]
+    db.bulk_upsert_teams(bulk.rows([(1, {'team_name': 'Bulk FC'})], 'teams'))
+    latest, events = feed.read(since)
+    assert [(event, data['table']) for event, data, seq in events] == [('reload', 'teams')]
+
+
+def test_unknown_position_sends_reset(db, feed):
+    latest = feed.read(None)[0]
+    assert feed.read(latest + 100) == (latest, [('reset', {'seq': latest}, latest)])
+
+
+def test_stream_waits_for_the_next_write(db, teams, feed):
+    stream = feed.stream()
+    assert parse_events(next(stream))[0][0] == 'ready'
+    writer = threading.Timer(0.05, add_player, (db, teams[0], 3))
+    writer.start()
+    try:
+        events = parse_events(next(stream))
+    finally:
+        writer.join()
+        stream.close()
+    assert [(event, data['op']) for event, data in events] == [('change', 'insert')]
+    assert feed.stats()['open_streams'] == 0
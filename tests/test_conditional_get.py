@@ -0,0 +1,45 @@
+def test_matching_etag_is_answered_with_304(client):
+    response = client.get('/api/teams')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = client.get('/api/teams', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_write_changes_etag_and_cached_body(client):
+    first = client.get('/api/teams')
+    client.post('/api/teams', json={'team_name': 'Conditional FC', 'coach_name': 'Coach',
+                                    'founded_year': 1990, 'city': 'City', 'stadium': 'Ground'})
+    response = client.get('/api/teams', headers={'If-None-Match': first.headers['ETag']})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != first.headers['ETag']
+    assert 'Conditional FC' in [team['team_name'] for team in response.get_json()]
+
+
+def test_direct_database_write_invalidates_cache(client, app_module):
+    before = client.get('/api/teams')
+    app_module.db.add_team('Listener FC', 'Coach', 1991, 'City', 'Ground')
+    after = client.get('/api/teams')
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert 'Listener FC' in [team['team_name'] for team in after.get_json()]
+
+
+def test_etag_only_depends_on_the_route_tables(client, app_module):
+    etag = client.get('/api/teams').headers['ETag']
+    app_module.db.add_player('Etag', 'Player', None, 'Forward', 9, 20, 180.0, 75.0, 1, 0, 0, 0)
+    response = client.get('/api/teams', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+
+
+def test_etag_differs_per_content_coding(client):
+    plain = client.get('/api/teams').headers['ETag']
+    gzipped = client.get('/api/teams', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['ETag'] != plain
+    assert 'Accept-Encoding' in gzipped.headers['Vary']
+    response = client.get('/api/teams', headers={'If-None-Match': plain,
+                                                  'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
@@ -0,0 +1,18 @@
+from database import Database
+
+
+def test_query_plans_on_fresh_database(db):
+    report = db.verify_query_plans()
+    assert report
+    assert not [entry for entry in report if entry['problems']]
+
+
+def test_query_plans_on_read_only_database(db):
+    read_only = Database(db.db_name, read_only=True)
+    try:
+        assert read_only.fts_enabled == db.fts_enabled
+        read_only.verify_query_plans()
+        assert read_only.search_players('harry') == []
+    finally:
+        read_only.close()
+
@@ -0,0 +1,86 @@
+import sqlite3
+import time
+
+import pytest
+
+import events
+from conftest import add_player
+
+
+@pytest.fixture
+def queue(db):
+    # Long enough that only explicit flushes write
+    queue = events.StatEventQueue(db, flush_interval=60)
+    yield queue
+    queue.close()
+
+
+def totals(db, player_id):
+    row = db.get_player_by_id(player_id)
+    return row['goals'], row['assists'], row['matches_played']
+
+
+def test_parse_deltas():
+    assert events.parse_deltas({'goals': 2}) == [(2, 0, 0)]
+    assert events.parse_deltas([{'assists': 1}, {'matches_played': 1, 'goals': -1}]) == [
+        (0, 1, 0), (-1, 0, 1)]
+    for payload in ([], [1], {'saves': 1}, {'goals': '1'}, {'goals': True}):
+        with pytest.raises(ValueError):
+            events.parse_deltas(payload)
+
+
+def test_flush_writes_summed_events(db, teams, queue):
+    first = add_player(db, teams[0], 1, goals=4)
+    second = add_player(db, teams[1], 2)
+    queue.add(first, [(1, 0, 1), (2, 1, 0)])
+    queue.add(second, [(0, 1, 1)])
+    queue.add(first, [(-1, 0, 0)])
+    assert queue.stats()['pending_players'] == 2
+    assert queue.flush() == 4
+    assert totals(db, first) == (4 + 2, 1, 1 + 1)
+    assert totals(db, second) == (0, 1, 1 + 1)
+    assert queue.stats()['pending_events'] == 0
+    assert db.check_team_stats() == []
+    assert db.check_season_stats() == []
+
+
+def test_failed_flush_is_requeued(db, teams, queue, monkeypatch):
+    player_id = add_player(db, teams[0], 1)
+    queue.add(player_id, [(1, 0, 0)])
+
+    def fail(deltas):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(db, 'apply_stat_deltas', fail)
+    with pytest.raises(sqlite3.OperationalError):
+        queue.flush()
+    queue.add(player_id, [(1, 0, 0)])
+    assert queue.stats()['pending_events'] == 2
+    monkeypatch.undo()
+    assert queue.flush() == 2
+    assert totals(db, player_id)[0] == 2
+    assert queue.stats()['failed_flushes'] == 1
+
+
+def test_close_flushes_and_rejects_new_events(db, teams):
+    player_id = add_player(db, teams[0], 1)
+    queue = events.StatEventQueue(db, flush_interval=60)
+    queue.add(player_id, [(1, 1, 1)])
+    queue.close()
+    assert totals(db, player_id) == (1, 1, 2)
+    with pytest.raises(RuntimeError):
+        queue.add(player_id, [(1, 0, 0)])
+
+
+def test_background_flush_when_queue_is_full(db, teams):
+    player_id = add_player(db, teams[0], 1)
+    queue = events.StatEventQueue(db, max_pending=3, flush_interval=60)
+    try:
+        queue.add(player_id, [(1, 0, 0)] * 3)
+        for _ in range(200):
+            if totals(db, player_id)[0] == 3:
+                break
+            time.sleep(0.01)
+        assert totals(db, player_id)[0] == 3
+    finally:
+        queue.close()
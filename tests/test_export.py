@@ -0,0 +1,45 @@
+import csv
+import io
+import json
+
+import export
+from conftest import add_player
+
+
+def test_iter_export_streams_in_batches(db, teams):
+    for i in range(7):
+        add_player(db, teams[0], i, last_name=f'Kane{i}')
+    batches = db.iter_export('players', batch_size=3)
+    columns = next(batches)
+    assert columns[:3] == ['player_id', 'first_name', 'last_name']
+    assert [len(rows) for rows in batches] == [3, 3, 1]
+    # The connection went back to the pool when the generator finished
+    assert db.pool_stats()['in_use'] == 0
+
+
+def test_ndjson_and_csv_encode_the_same_rows(db, teams):
+    for i in range(5):
+        add_player(db, teams[i % 2], i, last_name=f'Kane{i}')
+    ndjson = ''.join(export.encode(db.iter_export('players', batch_size=2), 'ndjson'))
+    records = [json.loads(line) for line in ndjson.splitlines()]
+    assert sorted(record['last_name'] for record in records) == [f'Kane{i}' for i in range(5)]
+    table = list(csv.DictReader(io.StringIO(''.join(
+        export.encode(db.iter_export('players', batch_size=2), 'csv')))))
+    assert [row['player_id'] for row in table] == [str(record['player_id']) for record in records]
+
+
+def test_csv_export_of_empty_table_has_header(db):
+    assert ''.join(export.encode(db.iter_export('players'), 'csv')).startswith('player_id,')
+
+
+def test_export_route(client):
+    client.post('/api/teams', json={'team_name': 'Export FC', 'coach_name': 'Coach',
+                                    'founded_year': 1990, 'city': 'City', 'stadium': 'Ground'})
+    response = client.get('/api/export/teams?format=csv')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.is_streamed
+    assert 'Export FC' in response.get_data(as_text=True)
+    assert response.headers['Content-Disposition'] == 'attachment; filename=teams.csv'
+    assert client.get('/api/export/nothing').status_code == 404
+    assert client.get('/api/export/teams?format=xml').status_code == 400
@@ -0,0 +1,89 @@
+import pytest
+
+from conftest import add_player, player_values
+from database import Database
+from leaderboard import Leaderboards, SortedKeyList
+
+
+@pytest.fixture
+def boards(db):
+    return Leaderboards(db)
+
+
+def ranking_board(boards):
+    return [(entry['player_id'], entry['score'], entry['position'], entry['rank'])
+            for entry in boards.top('ranking', 100)]
+
+
+def test_sorted_key_list_matches_sorted():
+    keys = list(range(0, 30000, 7))
+    board = SortedKeyList(keys[::2])
+    board.LOAD = 50
+    for key in keys[1::2]:
+        board.add(key)
+    for key in keys[::3]:
+        board.remove(key)
+    expected = sorted(set(keys) - set(keys[::3]))
+    assert len(board) == len(expected)
+    assert board.slice(0, len(board)) == expected
+    assert board.slice(100, 110) == expected[100:110]
+    assert [board.index(key) for key in expected[::500]] == list(range(0, len(expected), 500))
+    with pytest.raises(ValueError):
+        board.remove(keys[0])
+
+
+def test_positions_and_competition_ranks(db, teams, boards):
+    first = add_player(db, teams[0], 9)
+    second = add_player(db, teams[0], 7)
+    third = add_player(db, teams[1], 7)
+    unranked = add_player(db, teams[1], None)
+    assert ranking_board(boards) == [(first, 9, 1, 1), (second, 7, 2, 2), (third, 7, 3, 2),
+                                     (unranked, None, 4, 4)]
+    assert boards.lookup('ranking', third)['rank'] == 2
+    assert [entry['player_id'] for entry in boards.around('ranking', second, 1)] == [
+        first, second, third]
+    assert boards.lookup('ranking', 9999) is None
+    with pytest.raises(KeyError):
+        boards.top('saves', 10)
+
+
+def test_local_writes_are_applied_without_rebuild(db, teams, boards):
+    players = [add_player(db, teams[0], i) for i in range(40)]
+    assert boards.size('ranking') == 40
+    db.update_player(players[0], **player_values(db, players[0], ranking=100))
+    db.delete_player(players[1])
+    added = add_player(db, teams[0], 50)
+    top = boards.top('ranking', 2)
+    assert [entry['player_id'] for entry in top] == [players[0], added]
+    assert boards.size('ranking') == 40
+    assert boards.stats()['rebuilds'] == 1
+
+
+def test_other_process_writes_trigger_rebuild(db, teams, boards):
+    player_id = add_player(db, teams[0], 1)
+    assert boards.size('ranking') == 1
+    # A second Database on the same file stands in for another process
+    other = Database(db.db_name)
+    try:
+        other.update_player(player_id, **player_values(other, player_id, ranking=5))
+    finally:
+        other.close()
+    assert boards.lookup('ranking', player_id)['score'] == 5
+    assert boards.stats()['rebuilds'] == 2
+
+
+def test_leaderboard_writes_with_single_connection_pool(tmp_path):
+    db = Database(str(tmp_path / 'single.db'), pool_size=1, pool_timeout=1)
+    try:
+        team_id = db.add_team('Team', 'Coach', 1900, 'City', 'Stadium')['id']
+        boards = Leaderboards(db)
+        first = add_player(db, team_id, 5)
+        assert boards.size('ranking') == 1
+        second = add_player(db, team_id, 9)
+        db.update_player(first, **player_values(db, first, ranking=10))
+        assert [entry['player_id'] for entry in boards.top('ranking', 10)] == [first, second]
+        db.delete_player(first)
+        assert boards.lookup('ranking', first) is None
+        assert boards.lookup('ranking', second)['position'] == 1
+    finally:
+        db.close()
@@ -0,0 +1,60 @@
+import bulk
+import events
+from conftest import add_player, player_values
+
+
+def test_aggregates_stay_consistent(db, teams):
+    players = [add_player(db, teams[i % 2], i, last_name=f'Kane{i}', goals=i) for i in range(6)]
+    assert db.check_team_stats() == []
+    assert db.check_season_stats() == []
+
+    db.update_player(players[0], **player_values(db, players[0], team_id=teams[2], goals=12))
+    db.update_player(players[1], **player_values(db, players[1], team_id=None))
+    db.delete_player(players[2])
+    db.delete_team(teams[1])
+    assert db.check_team_stats() == []
+    assert db.check_season_stats() == []
+
+    matches = [
+        {'player_id': players[3], 'match_date': '2025-08-16', 'goals': 2, 'assists': 1},
+        {'player_id': players[3], 'match_date': '2026-01-03', 'goals': 1},
+        {'player_id': players[4], 'match_date': '2025-13-01'},
+        {'player_id': 9999, 'match_date': '2025-08-16'},
+    ]
+    result = db.add_match_stats(bulk.rows(enumerate(matches, start=1), 'matches'))
+    assert result['inserted'] == 2
+    assert [error['row'] for error in result['errors']] == [3, 4]
+    assert db.check_team_stats() == []
+    assert db.check_season_stats() == []
+
+    queue = events.StatEventQueue(db, flush_interval=60)
+    try:
+        queue.add(players[4], [(1, 0, 1), (2, 1, 0)])
+        queue.add(players[5], [(0, 1, 1)])
+        assert queue.flush() == 3
+    finally:
+        queue.close()
+    assert db.get_player_by_id(players[4])['goals'] == 4 + 3
+    assert db.check_team_stats() == []
+    assert db.check_season_stats() == []
+
+
+def test_reused_player_id_starts_without_history(db, teams):
+    player_id = add_player(db, teams[0], 1, goals=5)
+    db.add_match_stats(bulk.rows(enumerate([
+        {'player_id': player_id, 'match_date': '2024-09-01', 'goals': 2},
+    ], start=1), 'matches'))
+    # The match, plus the adjustment add_player recorded for this season
+    assert len(db.get_player_seasons(player_id)) == 2
+    db.delete_player(player_id)
+    assert db.get_player_seasons(player_id) == []
+    assert db.get_team_seasons(teams[0]) == []
+    assert db.check_season_stats() == []
+
+    records = [{'player_id': player_id, 'first_name': 'New', 'last_name': 'Player',
+                'team_id': teams[1]}]
+    assert db.bulk_upsert_players(bulk.rows(enumerate(records, start=1), 'players'))['success']
+    reused = db.get_player_by_id(player_id)
+    assert (reused['goals'], reused['assists'], reused['matches_played']) == (0, 0, 0)
+    assert db.get_player_seasons(player_id) == []
+    assert db.check_season_stats() == []
@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+from conftest import add_player, all_pages
+
+
+def test_cursor_pagination_round_trip(db, teams):
+    random.seed(3)
+    for i in range(47):
+        # Ties, and players without a ranking, which sort last
+        ranking = None if i % 7 == 0 else random.randint(1, 10)
+        add_player(db, teams[i % len(teams)], ranking, last_name=f'Kane{i}')
+    expected = [row['player_id'] for row in db.get_all_players()]
+    assert len(expected) == 47
+    for limit in (1, 5, 10, 47, 100):
+        assert all_pages(db.get_players_page, limit) == expected
+        assert all_pages(db.get_player_stats_page, limit) == expected
+        assert all_pages(lambda limit, cursor: db.search_players_page('har', limit, cursor),
+                         limit) == expected
+
+
+def test_invalid_cursor(db):
+    with pytest.raises(ValueError):
+        db.get_players_page(10, 'not-a-cursor')
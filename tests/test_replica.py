@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from replica import Replica
+
+
+@pytest.fixture
+def replica(db, tmp_path):
+    replica = Replica(db, path=str(tmp_path / 'copy.db'), refresh_interval=3600,
+                      max_staleness=0.5)
+    yield replica
+    replica.close()
+
+
+def team_names(database):
+    return [team['team_name'] for team in database.get_all_teams()]
+
+
+def test_reads_come_from_the_copy_until_refreshed(db, replica):
+    db.add_team('Before FC', 'Coach', 1900, 'City', 'Ground')
+    replica.refresh()
+    db.add_team('After FC', 'Coach', 1901, 'City', 'Ground')
+    reader = replica.reader()
+    assert reader is not db and reader.read_only
+    assert team_names(reader) == ['Before FC']
+
+    replica.refresh()
+    assert team_names(replica.reader()) == ['After FC', 'Before FC']
+    assert replica.stats()['refreshes'] == 2
+
+
+def test_stale_copy_falls_back_to_primary(db, replica):
+    replica.refresh()
+    assert replica.reader() is not db
+    db.add_team('Late FC', 'Coach', 1902, 'City', 'Ground')
+    time.sleep(replica.max_staleness + 0.1)
+    # The copy is older than max_staleness, so reads see the write
+    assert replica.reader() is db
+    assert replica.stats()['primary_reads'] == 1
+    assert replica.stats()['replica_reads'] == 1
@@ -0,0 +1,82 @@
+import sqlite3
+
+import pytest
+
+from conftest import add_player, all_pages
+from database import SEARCH_PLAYERS_LIKE, Database
+
+NAMES = [('Harry', 'Kane'), ('Marcus', 'Rashford'), ('Joaquín', 'Correa'),
+         ('Ronald', 'Araujo'), ('Harry', 'Maguire'), ('Bukayo', 'Saka')]
+
+
+@pytest.fixture
+def players(db, teams):
+    return {last_name: add_player(db, teams[0], 10 - i, first_name, last_name)
+            for i, (first_name, last_name) in enumerate(NAMES)}
+
+
+def like_search(db, term):
+    conn = db.get_connection()
+    try:
+        return {row['player_id'] for row in conn.execute(SEARCH_PLAYERS_LIKE,
+                                                           (f'%{term}%', f'%{term}%'))}
+    finally:
+        conn.close()
+
+
+def ids(rows):
+    return {row['player_id'] for row in rows}
+
+
+@pytest.mark.parametrize('term', ['ar', 'arr', 'Ara', 'ARA', 'rry', 'aguire', 'ka', 'kan', 'o',
+                                  'Harry', 'zzz'])
+def test_search_finds_every_substring_match(db, players, term):
+    expected = like_search(db, term)
+    assert ids(db.search_players(term)) == expected
+    assert set(all_pages(lambda limit, cursor: db.search_players_page(term, limit, cursor),
+                         2)) == expected
+
+
+def test_prefix_match_does_not_hide_substring_matches(db, players):
+    # "Araujo" starts with the term; the others contain it further in
+    assert ids(db.search_players('ar')) == {players['Kane'], players['Rashford'],
+                                            players['Araujo'], players['Maguire']}
+    assert ids(db.search_players('arr')) == {players['Kane'], players['Maguire']}
+
+
+def test_search_matches_words_across_names(db, players):
+    assert ids(db.search_players('har kan')) == {players['Kane']}
+    assert players['Kane'] in ids(db.search_players('harry ka'))
+
+
+def test_search_index_follows_renames_and_deletes(db, players):
+    player_id = players['Saka']
+    row = db.get_player_by_id(player_id)
+    db.update_player(player_id, 'Gabriel', 'Martinelli', row['team_id'], row['position'],
+                     row['jersey_number'], row['age'], row['height'], row['weight'],
+                     row['ranking'], row['goals'], row['assists'], row['matches_played'])
+    assert ids(db.search_players('saka')) == set()
+    assert ids(db.search_players('tinel')) == {player_id}
+    db.delete_player(player_id)
+    assert ids(db.search_players('tinel')) == set()
+
+
+def test_prefix_index_is_rebuilt_as_trigram(tmp_path):
+    path = str(tmp_path / 'old.db')
+    db = Database(path)
+    db.add_player('Harry', 'Kane', None, 'Forward', 9, 30, 188.0, 86.0, 5, 0, 0, 0)
+    db.close()
+    conn = sqlite3.connect(path)
+    conn.execute('DROP TABLE players_fts')
+    conn.execute("""CREATE VIRTUAL TABLE players_fts USING fts5(
+        first_name, last_name, content='players', content_rowid='player_id',
+        prefix='2 3', tokenize='unicode61 remove_diacritics 2')""")
+    conn.execute("INSERT INTO players_fts (players_fts) VALUES ('rebuild')")
+    conn.commit()
+    conn.close()
+    db = Database(path)
+    try:
+        assert db.fts_enabled
+        assert [row['last_name'] for row in db.search_players('arr')] == ['Kane']
+    finally:
+        db.close()
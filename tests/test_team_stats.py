@@ -0,0 +1,47 @@
+import bulk
+from conftest import add_player, player_values
+
+
+def team_totals(db, team_id):
+    row = next(row for row in db.get_team_stats() if row['team_id'] == team_id)
+    return row['total_players'], row['total_goals']
+
+
+def test_team_stats_follow_player_writes(db, teams):
+    players = [add_player(db, teams[i % 2], i, last_name=f'Kane{i}', goals=i) for i in range(6)]
+    assert team_totals(db, teams[0]) == (3, 0 + 2 + 4)
+    assert db.check_team_stats() == []
+
+    db.update_player(players[0], **player_values(db, players[0], team_id=teams[2], goals=12))
+    db.update_player(players[1], **player_values(db, players[1], team_id=None))
+    db.update_player(players[3], **player_values(db, players[3], goals=10))
+    db.delete_player(players[2])
+    assert team_totals(db, teams[0]) == (1, 4)
+    assert team_totals(db, teams[1]) == (2, 10 + 5)
+    assert team_totals(db, teams[2]) == (1, 12)
+    assert db.check_team_stats() == []
+
+
+def test_team_stats_follow_team_writes(db, teams):
+    add_player(db, teams[1], 1, goals=3)
+    db.update_team(teams[1], 'Renamed', 'New Coach', 1950, 'Town', 'Ground')
+    row = next(row for row in db.get_team_stats() if row['team_id'] == teams[1])
+    assert (row['team_name'], row['coach_name'], row['city']) == ('Renamed', 'New Coach', 'Town')
+    db.delete_team(teams[1])
+    assert teams[1] not in [row['team_id'] for row in db.get_team_stats()]
+    assert db.check_team_stats() == []
+
+
+def test_team_stats_follow_bulk_upserts(db, teams):
+    existing = add_player(db, teams[0], 1, goals=2)
+    records = [
+        {'player_id': existing, 'first_name': 'Harry', 'last_name': 'Kane', 'team_id': teams[1],
+         'goals': 5},
+        {'first_name': 'Bukayo', 'last_name': 'Saka', 'team_id': teams[1], 'goals': 7},
+    ]
+    db.bulk_upsert_players(bulk.rows(enumerate(records, start=1), 'players'))
+    db.bulk_upsert_teams(bulk.rows([(1, {'team_name': 'Bulk FC'})], 'teams'))
+    assert team_totals(db, teams[0]) == (0, 0)
+    assert team_totals(db, teams[1]) == (2, 12)
+    assert 'Bulk FC' in [row['team_name'] for row in db.get_team_stats()]
+    assert db.check_team_stats() == []
@@ -0,0 +1,31 @@
+from conftest import add_player
+
+
+def test_failing_write_listener_does_not_fail_the_write(db, teams):
+    def broken(changes):
+        raise RuntimeError('listener failed')
+
+    seen = []
+    db.add_write_listener(broken)
+    db.add_write_listener(seen.append)
+    player_id = add_player(db, teams[0], 1)
+    assert db.get_player_by_id(player_id) is not None
+    assert seen and seen[-1] == [('players', 'insert', [player_id])]
+
+
+def test_listeners_see_each_committed_write(db, teams):
+    seen = []
+    db.add_write_listener(lambda changes, versions: seen.append((changes, versions)),
+                          with_versions=True)
+    first = add_player(db, teams[0], 1)
+    second = add_player(db, teams[0], 2)
+    db.delete_player(first)
+    assert [changes for changes, versions in seen] == [
+        [('players', 'insert', [first])],
+        [('players', 'insert', [second])],
+        [('players', 'delete', [first])],
+    ]
+    # One version per write, in commit order
+    bumps = [versions['players'] for changes, versions in seen]
+    assert all(low == high for low, high in bumps)
+    assert [low for low, high in bumps] == sorted({low for low, high in bumps})